@@ -0,0 +1,280 @@
+"""
+Servicio HTTP sin interfaz delante del pipeline de SCOMP, para compartir
+capacidad entre asesores e integrarlo con otros sistemas (CRM).
+
+Uso:
+    python api_server.py [--host 0.0.0.0] [--port 8080] [--workers 2] [--max-pendientes 20]
+
+Endpoints:
+    POST /jobs                  Cuerpo: el PDF (application/pdf). Parámetros opcionales en la URL:
+                                pgu=0|1, pgu_monto, bono=0|1, bono_uf, cache=0|1.
+                                202 con el id del trabajo; 503 + Retry-After si la cola está llena.
+    GET  /jobs/<id>             Estado: en_cola, procesando, listo o error.
+    GET  /jobs/<id>/result      Datos del SCOMP y tablas calculadas (JSON).
+    GET  /jobs/<id>/report.pdf  Reporte PDF.
+    GET  /jobs/<id>/report.xlsx Reporte Excel.
+    GET  /health                Estado de la cola.
+    GET  /metrics               Métricas del pipeline en formato Prometheus.
+
+Si SCOMP_API_TOKEN está definido, cada request debe traer "Authorization: Bearer <token>".
+"""
+import argparse
+import hmac
+import json
+import os
+import queue
+import re
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from dotenv import load_dotenv
+
+from config.settings import (
+    API_HOST, API_PORT, API_WORKERS, API_MAX_PENDIENTES, API_MAX_PDF_BYTES, API_TOKEN, DEFAULT_PGU_AMOUNT
+)
+from services.extraction_cache import get_extraction_cache
+from services.job_queue import JobQueue
+from services.llm_usage import LLMUsage
+from services.metrics import get_metrics
+from services.pipeline import analyze_scomp_pdf, process_scomp, report_file_stem, build_pdf_report, build_excel_report
+
+RUTA_TRABAJO = re.compile(r"^/jobs/([0-9a-f]{32})(?:/(result|report\.pdf|report\.xlsx))?$")
+
+TIPOS_REPORTE = {
+    "report.pdf": ("pdf", "application/pdf"),
+    "report.xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def parse_job_params(consulta):
+    """
+    Parámetros de cálculo desde la query string ({nombre: [valores]}).
+    Lanza ValueError si alguno no es válido.
+    """
+    def valor(nombre, defecto):
+        return consulta.get(nombre, [defecto])[-1]
+
+    def booleano(nombre):
+        texto = str(valor(nombre, "1")).lower()
+        if texto not in ("0", "1", "true", "false"):
+            raise ValueError(f"'{nombre}' debe ser 0 o 1.")
+        return texto in ("1", "true")
+
+    def numero(nombre, defecto):
+        try:
+            return float(valor(nombre, defecto))
+        except ValueError:
+            raise ValueError(f"'{nombre}' debe ser un número.")
+
+    params = {
+        'include_pgu': booleano("pgu"),
+        'pgu_amount': numero("pgu_monto", DEFAULT_PGU_AMOUNT),
+        'include_bono': booleano("bono"),
+        'bono_uf': numero("bono_uf", 2.5),
+    }
+    return params, booleano("cache")
+
+
+def result_to_json(resultado):
+    """
+    Resultado de process_scomp en una forma serializable: cada tabla con sus filas como dicts.
+    """
+    tablas = []
+    for item in resultado['tablas']:
+        tabla = {clave: item[clave] for clave in item if clave not in ('tabla', 'sort_key')}
+        if tabla.get('eld_info') is not None:
+            tabla['eld_info'] = tabla['eld_info'].to_dict()
+        tabla['filas'] = item['tabla'].to_dict(orient="records")
+        tablas.append(tabla)
+    return {
+        'header': resultado['header'],
+        'es_sobrevivencia': resultado['es_sobrevivencia'],
+        'beneficiarios': resultado['beneficiarios'],
+        'warnings': resultado['warnings'],
+        'tablas': tablas,
+    }
+
+
+def process_pdf_job(pdf_bytes, api_key, params, usar_cache=True):
+    """
+    Trabajo completo de un documento: extracción, análisis, cálculos y reportes.
+    """
+    uso = LLMUsage()
+    cache = get_extraction_cache() if usar_cache else None
+    raw_data, desde_cache = analyze_scomp_pdf(pdf_bytes, api_key, cache=cache, usage=uso)
+    resultado = process_scomp(raw_data, **params)
+    return {
+        'nombre': report_file_stem(resultado),
+        'desde_cache': desde_cache,
+        'uso_ia': uso.totals(),
+        'resultado': result_to_json(resultado),
+        'pdf': build_pdf_report(resultado),
+        'xlsx': build_excel_report(resultado),
+    }
+
+
+def _json_default(valor):
+    # Valores de numpy/pandas en las filas de las tablas
+    if hasattr(valor, "item"):
+        return valor.item()
+    return str(valor)
+
+
+class ScompAPIServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP que encola cada PDF recibido en `cola` (JobQueue) y atiende
+    las consultas de estado y resultados. Cada request se atiende en su hilo;
+    el trabajo pesado lo hacen los workers de la cola.
+    """
+    daemon_threads = True
+
+    def __init__(self, direccion, cola, api_key, procesar=process_pdf_job, token=API_TOKEN,
+                 max_pdf_bytes=API_MAX_PDF_BYTES):
+        super().__init__(direccion, ScompAPIHandler)
+        self.cola = cola
+        self.api_key = api_key
+        self.procesar = procesar
+        self.token = token
+        self.max_pdf_bytes = max_pdf_bytes
+
+
+class ScompAPIHandler(BaseHTTPRequestHandler):
+    server_version = "ScompAPI/1.0"
+
+    def _responder(self, estado, cuerpo, tipo="application/json", headers=None):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _json(self, estado, datos, headers=None):
+        cuerpo = json.dumps(datos, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self._responder(estado, cuerpo, "application/json; charset=utf-8", headers)
+
+    def _error(self, estado, mensaje, headers=None):
+        self._json(estado, {'error': mensaje}, headers)
+
+    def _autorizado(self):
+        if not self.server.token:
+            return True
+        recibido = self.headers.get("Authorization", "")
+        if hmac.compare_digest(recibido.encode(), f"Bearer {self.server.token}".encode()):
+            return True
+        self._error(401, "Token inválido o ausente.", {"WWW-Authenticate": "Bearer"})
+        return False
+
+    def _estado_trabajo(self, job):
+        datos = job.to_dict()
+        base = f"/jobs/{job.id}"
+        if job.estado == "listo":
+            datos['nombre'] = job.resultado['nombre']
+            datos['desde_cache'] = job.resultado['desde_cache']
+            datos['uso_ia'] = job.resultado['uso_ia']
+            datos['enlaces'] = {'resultado': f"{base}/result", 'pdf': f"{base}/report.pdf",
+                                'xlsx': f"{base}/report.xlsx"}
+        return datos
+
+    def do_POST(self):
+        if not self._autorizado():
+            return
+        url = urlsplit(self.path)
+        if url.path != "/jobs":
+            self._error(404, "Ruta desconocida.")
+            return
+
+        longitud = self.headers.get("Content-Length")
+        if longitud is None:
+            self._error(411, "Falta Content-Length.")
+            return
+        try:
+            longitud = int(longitud)
+        except ValueError:
+            longitud = -1
+        if longitud < 0:
+            self._error(400, "Content-Length inválido.")
+            return
+        if longitud > self.server.max_pdf_bytes:
+            self._error(413, f"El PDF supera el máximo de {self.server.max_pdf_bytes // (1024 * 1024)} MB.")
+            return
+        pdf_bytes = self.rfile.read(longitud)
+        if not pdf_bytes.startswith(b"%PDF"):
+            self._error(400, "El cuerpo debe ser un archivo PDF.")
+            return
+        try:
+            params, usar_cache = parse_job_params(parse_qs(url.query))
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+
+        try:
+            job = self.server.cola.submit(self.server.procesar, pdf_bytes, self.server.api_key, params, usar_cache)
+        except queue.Full:
+            self._error(503, "La cola de trabajos está llena; reintente más tarde.",
+                        {"Retry-After": str(self.server.cola.retry_after())})
+            return
+        self._json(202, self._estado_trabajo(job), {"Location": f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        if not self._autorizado():
+            return
+        ruta = urlsplit(self.path).path
+        if ruta == "/health":
+            self._json(200, self.server.cola.stats())
+            return
+        if ruta == "/metrics":
+            self._responder(200, get_metrics().to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+            return
+
+        coincidencia = RUTA_TRABAJO.match(ruta)
+        job = self.server.cola.get(coincidencia.group(1)) if coincidencia else None
+        if job is None:
+            self._error(404, "Trabajo no encontrado." if coincidencia else "Ruta desconocida.")
+            return
+        recurso = coincidencia.group(2)
+        if recurso is None:
+            self._json(200, self._estado_trabajo(job))
+            return
+        if job.estado != "listo":
+            self._error(409, f"El trabajo está en estado '{job.estado}'.")
+            return
+        if recurso == "result":
+            self._json(200, job.resultado['resultado'])
+            return
+        clave, tipo = TIPOS_REPORTE[recurso]
+        self._responder(200, job.resultado[clave], tipo, {
+            "Content-Disposition": f'attachment; filename="{job.resultado["nombre"]}.{clave}"'
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP del pipeline de SCOMP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Documentos procesándose a la vez")
+    parser.add_argument("--max-pendientes", type=int, default=API_MAX_PENDIENTES,
+                        help="Trabajos en cola antes de rechazar con 503")
+    parser.add_argument("--api-key", default=None, help="API Key de Gemini (por defecto GOOGLE_API_KEY)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = args.api_key or os.getenv("GOOGLE_API_KEY")
+    cola = JobQueue(workers=args.workers, max_pendientes=args.max_pendientes).start()
+    servidor = ScompAPIServer((args.host, args.port), cola, api_key)
+    print(f"Escuchando en http://{args.host}:{servidor.server_address[1]} "
+          f"({args.workers} workers, cola de {args.max_pendientes})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        cola.stop(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
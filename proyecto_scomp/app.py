@@ -2,15 +2,21 @@ import streamlit as st
 import pandas as pd
 import re
 import io
+import json
 import os
+import queue
+import time
 
 # Importar Módulos Refactorizados
-from config.settings import DEFAULT_PGU_AMOUNT
-from services.pdf_parser import extract_text_from_pdf
-from services.gemini_api import analyze_scomp_with_gemini
-from services.calculations import process_data_vejez, process_data_sobrevivencia
-from services.report_gen import PDFReportVejez, PDFReportSobrevivencia, create_formatted_excel_report
-from utils.helpers import clean_number, get_sort_key_vejez, get_sort_key_sobrevivencia
+from config.settings import DEFAULT_PGU_AMOUNT, APP_ANALISIS_POLL_SEGUNDOS, APP_USO_IA_TTL_SEGUNDOS
+from services.extraction_cache import build_cache_key, get_extraction_cache, hash_bytes
+from services.report_cache import deferred_report, report_cache_key
+from services.metrics import get_metrics
+from services.job_queue import get_analysis_queue
+from services.llm_usage import get_usage_ledger
+from services.pipeline import (
+    CalculationCache, analyze_scomp_job, hash_raw_data, report_file_stem, build_pdf_report, build_excel_report
+)
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(layout="wide", page_title="Generador SCOMP Pro", page_icon="🚀")
@@ -50,6 +56,136 @@ bono_uf = st.sidebar.number_input(
     disabled=not include_bono
 )
 
+# Estado del cache de extracciones
+st.sidebar.divider()
+cache_stats = get_extraction_cache().stats()
+st.sidebar.caption(
+    f"🗄️ Cache: {cache_stats['entries']} documentos · "
+    f"{cache_stats['hits']} aciertos / {cache_stats['misses']} fallos"
+)
+
+# Métricas por etapa (del proceso: se acumulan entre sesiones y reruns)
+def render_panel_metricas(metrics):
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("⏱️ Métricas por etapa"):
+        if not snapshot['etapas']:
+            st.caption("Aún no hay ejecuciones registradas.")
+            return
+        filas = []
+        for etapa, datos in snapshot['etapas'].items():
+            segundos = datos['segundos']
+            filas.append({
+                "Etapa": etapa,
+                "N": segundos['n'],
+                "p50 (s)": round(segundos['p50'], 3),
+                "p95 (s)": round(segundos['p95'], 3),
+                "Máx (s)": round(segundos['max'], 3),
+                "Errores": datos['errores'],
+            })
+        st.dataframe(pd.DataFrame(filas), hide_index=True, use_container_width=True)
+        for etapa, datos in snapshot['etapas'].items():
+            if datos['medidas']:
+                promedios = " · ".join(f"{m['media']:,.0f} {medida}" for medida, m in datos['medidas'].items())
+                st.caption(f"{etapa}: {promedios} (promedio)")
+        c1, c2 = st.columns(2)
+        c1.download_button("Prometheus", metrics.to_prometheus(), "scomp_metricas.prom", "text/plain")
+        c2.download_button("JSON", json.dumps(snapshot, indent=2, ensure_ascii=False), "scomp_metricas.json",
+                           "application/json")
+
+render_panel_metricas(get_metrics())
+
+# Consumo de la IA en los últimos 30 días (se relee cada APP_USO_IA_TTL_SEGUNDOS, no en cada rerun)
+@st.cache_data(ttl=APP_USO_IA_TTL_SEGUNDOS, show_spinner=False)
+def uso_ia_reciente(dias=30):
+    return get_usage_ledger().report("modelo", desde=time.time() - dias * 24 * 3600)
+
+uso_ia = uso_ia_reciente()
+if uso_ia:
+    st.sidebar.caption(
+        f"🤖 IA (30 días): {sum(f['documentos'] for f in uso_ia)} documentos · "
+        f"{sum(f['prompt_tokens'] + f['output_tokens'] for f in uso_ia):,} tokens · "
+        f"US$ {sum(f['costo'] for f in uso_ia):.2f}"
+    )
+
+# --- VISTA PREVIA DURANTE EL ANÁLISIS ---
+def render_vista_previa(secciones):
+    """
+    Muestra las secciones que ya llegaron (resumen del afiliado y Retiro Programado)
+    mientras Gemini sigue generando el resto.
+    """
+    header = secciones.get("header")
+    if header:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Afiliado", header.get("nombre", "N/A"))
+        col2.metric("RUT", header.get("rut", "N/A"))
+        col3.metric("Saldo Acumulado", f"{header.get('saldo_uf', '0')} UF")
+        col4.metric("Tipo Pensión", (header.get("tipo_pension") or "").upper())
+
+    rp = secciones.get("retiro_programado")
+    if rp:
+        st.caption("Retiro Programado (vista previa)")
+        if rp.get("pensiones_beneficiarios"):
+            df_rp = pd.DataFrame(rp["pensiones_beneficiarios"], columns=["Beneficiario", "Pensión UF", "Pensión $"])
+        else:
+            df_rp = pd.DataFrame([{
+                "Pensión UF": rp.get("pension_uf"),
+                "Pensión $": rp.get("pension_bruta"),
+                "Comisión %": rp.get("comision_pct"),
+            }])
+        st.dataframe(df_rp, use_container_width=True, hide_index=True)
+
+# --- SEGUIMIENTO DEL ANÁLISIS EN SEGUNDO PLANO ---
+ETAPAS_ANALISIS = {
+    "extraccion": "Extrayendo texto del PDF...",
+    "analisis": "Interpretando el SCOMP (lector local, Gemini sólo si es necesario)...",
+}
+
+
+@st.fragment(run_every=APP_ANALISIS_POLL_SEGUNDOS)
+def seguir_analisis(job_id):
+    """
+    Muestra el avance del trabajo y se refresca solo; al terminar recarga la página.
+    """
+    cola = get_analysis_queue()
+    job = cola.get(job_id)
+    if job is None or job.estado in ("listo", "error"):
+        st.rerun()
+
+    progreso = job.progreso
+    with st.status("🔍 Analizando documento...", expanded=True):
+        if job.estado == "en_cola":
+            st.write(f"En cola ({cola.position(job)} documentos antes)...")
+        etapas = list(ETAPAS_ANALISIS)
+        etapa = progreso.get("etapa")
+        for clave in etapas[:etapas.index(etapa) + 1] if etapa in etapas else []:
+            st.write(ETAPAS_ANALISIS[clave])
+
+        reporte = progreso.get("reporte_llm")
+        if reporte:
+            st.write(
+                f"Consultando a Gemini por: {', '.join(reporte['secciones_pendientes'])} · "
+                f"~{reporte['tokens_estimados']:,} tokens "
+                f"({len(reporte['paginas_omitidas'])} de {reporte['paginas_totales']} páginas omitidas)"
+            )
+            if reporte['excede_presupuesto']:
+                st.warning("⚠️ La estimación de tokens ya supera el presupuesto por documento.")
+    render_vista_previa(progreso.get("secciones", {}))
+
+
+@st.fragment(run_every=APP_ANALISIS_POLL_SEGUNDOS)
+def esperar_cupo(clave, *args):
+    """
+    Con la cola llena, reintenta encolar el análisis en cada refresco; al lograrlo recarga la página.
+    """
+    try:
+        job = get_analysis_queue().submit_once(clave, analyze_scomp_job, *args)
+    except queue.Full:
+        st.warning("⏳ Hay muchos análisis en curso; el documento se enviará apenas haya espacio.")
+        return
+    st.session_state.analysis_job = job.id
+    st.session_state.analysis_job_file = clave
+    st.rerun()
+
 # --- HEADER PRINCIPAL ---
 st.title("🚀 Generador de Reporte Previsional")
 st.markdown("### Transforma tu SCOMP en un reporte profesional en segundos.")
@@ -71,41 +207,80 @@ if uploaded_file is not None:
         st.error("⚠️ Por favor, introduce tu API Key para continuar.")
         st.stop()
 
-    # Estado de la sesión para guardar datos procesados
-    if "scomp_data" not in st.session_state or st.session_state.get("current_file") != uploaded_file.name:
+    # Estado de la sesión para guardar datos procesados (clave = contenido del PDF)
+    uploaded_bytes = uploaded_file.getvalue()
+    cache_key = build_cache_key(uploaded_bytes)
+    extraction_cache = get_extraction_cache()
+
+    if "scomp_data" not in st.session_state or st.session_state.get("current_file") != cache_key:
         st.session_state.scomp_data = None
-        st.session_state.current_file = uploaded_file.name
+        st.session_state.current_file = cache_key
 
     raw_data = st.session_state.scomp_data
 
-    # --- FASE 1: ANÁLISIS ---
+    # Cache persistente compartido entre sesiones
     if raw_data is None:
-        with st.status("🔍 Analizando documento...", expanded=True) as status:
-            st.write("Extrayendo texto del PDF...")
-            pdf_text = extract_text_from_pdf(uploaded_file)
-            
-            if not pdf_text:
-                status.update(label="Error en lectura de PDF", state="error")
-                st.stop()
-            
-            st.write("Consultando a la Inteligencia Artificial (Gemini)...")
+        raw_data = extraction_cache.get(cache_key)
+        if raw_data is not None:
+            st.session_state.scomp_data = raw_data
+            st.toast("⚡ Resultado recuperado desde cache.")
+
+    # --- FASE 1: ANÁLISIS (en segundo plano) ---
+    # El análisis corre en la cola compartida: un rerun no lo cancela ni lo repite,
+    # y si otra sesión con la misma API Key ya está analizando el mismo PDF se
+    # reutiliza ese trabajo. Sesiones con otra clave no comparten su cuota ni sus errores
+    if raw_data is None:
+        cola = get_analysis_queue()
+        job_key = f"{cache_key}:{hash_bytes(final_api_key.encode('utf-8'))[:16]}"
+        job = None
+        if st.session_state.get("analysis_job_file") == job_key:
+            job = cola.get(st.session_state.get("analysis_job"))
+        if job is None:
             try:
-                raw_data = analyze_scomp_with_gemini(pdf_text, final_api_key)
-                st.session_state.scomp_data = raw_data # Guardar en cache de sesión
-                status.update(label="¡Análisis completado!", state="complete", expanded=False)
-            except Exception as e:
-                status.update(label="Error en el análisis", state="error")
-                st.error(f"Ocurrió un error: {e}")
+                job = cola.submit_once(job_key, analyze_scomp_job, uploaded_bytes, final_api_key, extraction_cache)
+            except queue.Full:
+                esperar_cupo(job_key, uploaded_bytes, final_api_key, extraction_cache)
                 st.stop()
-    
+            st.session_state.analysis_job = job.id
+            st.session_state.analysis_job_file = job_key
+
+        if job.estado == "error":
+            st.error(f"Ocurrió un error en el análisis: {job.error}")
+            if st.button("🔁 Reintentar"):
+                st.session_state.pop("analysis_job", None)
+                st.rerun()
+            st.stop()
+
+        if job.estado != "listo":
+            seguir_analisis(job.id)
+            st.stop()
+
+        raw_data = job.resultado['raw_data']
+        st.session_state.scomp_data = raw_data
+        if job.resultado['aviso_presupuesto']:
+            st.warning(f"⚠️ {job.resultado['aviso_presupuesto']}")
+
     # --- FASE 2: PROCESAMIENTO Y VISUALIZACIÓN ---
     if raw_data:
-        header_data = raw_data.get("header", {})
-        tipo_pension = header_data.get("tipo_pension", "").upper()
-        
-        # Preparar nombre seguro para archivo
-        raw_name = header_data.get("nombre", "Afiliado")
-        clean_name = "".join(c for c in raw_name if c.isalnum() or c in (" ", "_", "-")).strip().replace(" ", "_")
+        # Cálculos memoizados por sesión: un rerun por un widget no recalcula todo,
+        # y si sólo cambian PGU/Bono se recalcula únicamente "Pensión + Bono"
+        if "calc_cache" not in st.session_state:
+            st.session_state.calc_cache = CalculationCache()
+        if st.session_state.get("raw_hash_file") != cache_key:
+            st.session_state.raw_hash = hash_raw_data(raw_data)
+            st.session_state.raw_hash_file = cache_key
+
+        try:
+            resultado = st.session_state.calc_cache.process(
+                raw_data, include_pgu, DEFAULT_PGU_AMOUNT, include_bono, bono_uf,
+                raw_hash=st.session_state.raw_hash
+            )
+        except ValueError as e:
+            st.error(f"Los datos extraídos no tienen el formato esperado: {e}")
+            st.stop()
+        header_data = resultado['header']
+        tipo_pension = (header_data.get("tipo_pension") or "").upper()
+        file_stem = report_file_stem(resultado)
         
         # Tarjetas de Resumen del Cliente
         st.divider()
@@ -116,11 +291,12 @@ if uploaded_file is not None:
         col4.metric("Tipo Pensión", tipo_pension)
 
         # === SOBREVIVENCIA ===
-        if "SOBREVIVENCIA" in tipo_pension:
-            processed_tables, beneficiarios, warnings = process_data_sobrevivencia(raw_data, header_data)
+        if resultado['es_sobrevivencia']:
+            processed_tables = resultado['tablas']
+            beneficiarios = resultado['beneficiarios']
             
-            if warnings:
-                for w in warnings: st.warning(w)
+            if resultado['warnings']:
+                for w in resultado['warnings']: st.warning(w)
 
             st.subheader("👥 Beneficiarios")
             if beneficiarios:
@@ -129,8 +305,6 @@ if uploaded_file is not None:
                     with cols[i % 3]:
                         st.info(f"**{b['nombre']}**\n\n{b['parentesco']}")
             
-            processed_tables.sort(key=get_sort_key_sobrevivencia)
-            
             st.subheader("📊 Tabla de Ofertas")
             for item in processed_tables:
                 with st.expander(f"{item['titulo']}", expanded=True):
@@ -140,44 +314,23 @@ if uploaded_file is not None:
             st.divider()
             st.subheader("📥 Descargas")
             
-            pdf = PDFReportSobrevivencia(orientation='L', unit='mm', format='A4')
-            pdf.set_header_data(header_data, beneficiarios)
-            pdf.add_page()
-            pdf.print_header_data_sobrevivencia()
-            for item in processed_tables:
-                 if not item['tabla'].empty:
-                    pdf.print_table_sobrevivencia(item['titulo'], item['tabla'], item['tipo'])
-            
-            pdf_output = pdf.output()
-            pdf_bytes = bytes(pdf_output)
-            excel_bytes = create_formatted_excel_report(header_data, processed_tables, beneficiarios)
+            # Los reportes se generan sólo al pedir la descarga (y quedan en cache)
+            pdf_data = deferred_report(
+                report_cache_key("pdf", st.session_state.raw_hash, processed_tables, ()),
+                lambda: build_pdf_report(resultado)
+            )
+            excel_data = deferred_report(
+                report_cache_key("xlsx", st.session_state.raw_hash, processed_tables, ()),
+                lambda: build_excel_report(resultado)
+            )
             
             c1, c2 = st.columns(2)
-            c1.download_button("📄 Descargar PDF Pro", pdf_bytes, f"Resultado_SCOMP_{clean_name}_Sobrevivencia.pdf", "application/pdf", use_container_width=True)
-            c2.download_button("📊 Descargar Excel", excel_bytes, f"Resultado_SCOMP_{clean_name}_Sobrevivencia.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+            c1.download_button("📄 Descargar PDF Pro", pdf_data, f"{file_stem}.pdf", "application/pdf", use_container_width=True)
+            c2.download_button("📊 Descargar Excel", excel_data, f"{file_stem}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
 
         # === VEJEZ / INVALIDEZ ===
         else:
-            # Add PGU/Bono details to header_data for the report
-            if include_pgu:
-                header_data['pgu_monto'] = DEFAULT_PGU_AMOUNT # or whatever variable you use
-            if include_bono:
-                header_data['bono_monto_uf'] = bono_uf
-
-            processed_tables = process_data_vejez(raw_data, header_data, include_pgu, DEFAULT_PGU_AMOUNT, include_bono, bono_uf)
-            
-            # Ordenar lógica
-            parent_sort_keys = {}
-            for item in processed_tables:
-                if 'linked_to_title' not in item:
-                    key = get_sort_key_vejez(item) + (0,) 
-                    item['sort_key'] = key
-                    parent_sort_keys[item['titulo']] = key
-            for item in processed_tables:
-                if 'linked_to_title' in item:
-                    parent_key = parent_sort_keys.get(item['linked_to_title'])
-                    item['sort_key'] = (parent_key[0], parent_key[1], parent_key[2], 1) if parent_key else (99,0,0,0)
-            processed_tables.sort(key=lambda x: x.get('sort_key', (100, 0, 0, 0)))
+            processed_tables = resultado['tablas']
 
             # Filtros
             st.sidebar.subheader("Filtros de Modalidad")
@@ -241,17 +394,17 @@ if uploaded_file is not None:
             st.divider()
             st.subheader("📥 Descargas")
             
-            pdf = PDFReportVejez(orientation='L', unit='mm', format='A4')
-            pdf.add_page()
-            pdf.print_header_data(header_data)
-            for item in filtered_tables:
-                 if not item['tabla'].empty: 
-                    pdf.print_table(item['titulo'], item['tabla'], item['tipo'], item['col_title_pdf'], item.get('eld_info'), header_data.get('valor_uf_float', 0.0))
-            
-            pdf_output = pdf.output()
-            pdf_bytes = bytes(pdf_output)
-            excel_bytes = create_formatted_excel_report(header_data, filtered_tables)
+            # Los reportes se generan sólo al pedir la descarga (y quedan en cache)
+            params = (include_pgu, DEFAULT_PGU_AMOUNT, include_bono, bono_uf)
+            pdf_data = deferred_report(
+                report_cache_key("pdf", st.session_state.raw_hash, filtered_tables, params),
+                lambda: build_pdf_report(resultado, filtered_tables)
+            )
+            excel_data = deferred_report(
+                report_cache_key("xlsx", st.session_state.raw_hash, filtered_tables, params),
+                lambda: build_excel_report(resultado, filtered_tables)
+            )
 
             c1, c2 = st.columns(2)
-            c1.download_button("📄 Descargar PDF Pro", pdf_bytes, f"Resultado_SCOMP_{clean_name}_Vejez_Invalidez.pdf", "application/pdf", use_container_width=True)
-            c2.download_button("📊 Descargar Excel", excel_bytes, f"Resultado_SCOMP_{clean_name}_Vejez_Invalidez.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
\ No newline at end of file
+            c1.download_button("📄 Descargar PDF Pro", pdf_data, f"{file_stem}.pdf", "application/pdf", use_container_width=True)
+            c2.download_button("📊 Descargar Excel", excel_data, f"{file_stem}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
@@ -0,0 +1,250 @@
+"""
+Procesamiento masivo de SCOMPs sin interfaz.
+
+Uso:
+    python batch_scomp.py carpeta_pdfs carpeta_salida [--workers 4] [--concurrencia 4] [--consolidado todos.xlsx]
+
+Etapas:
+    1. Extracción de texto en un pool de procesos, sólo de los PDF que no están en el cache.
+    2. Análisis (parser local -> Gemini) con concurrencia acotada en hilos.
+    3. Cálculos y reportes PDF/Excel de vuelta en el pool de procesos.
+    4. (Opcional) Un Excel consolidado con una hoja por cliente y un resumen.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from config.settings import DEFAULT_PGU_AMOUNT, PDF_BACKEND
+from services.pdf_parser import PDF_BACKENDS
+from services.extraction_cache import build_cache_key, get_extraction_cache
+from services.llm_usage import LLMUsage
+from services.metrics import get_metrics
+from services.pipeline import (
+    extract_text_from_bytes, analyze_scomp_pdf, process_scomp,
+    report_file_stem, build_pdf_report, build_excel_report, build_consolidated_excel
+)
+
+
+def _iniciar_worker():
+    # Las métricas de cada tarea vuelven al proceso principal (_en_worker): el worker
+    # no escribe el archivo de métricas ni arrastra lo heredado del proceso padre
+    metrics = get_metrics()
+    metrics.export_path = ""
+    metrics.reset()
+
+
+def _en_worker(funcion, *args):
+    """
+    Corre funcion(*args) en el pool de procesos y retorna (resultado, error, métricas),
+    con lo que registró la tarea en el registro de métricas del worker.
+    """
+    try:
+        return funcion(*args), None, get_metrics().take()
+    except Exception as e:
+        return None, e, get_metrics().take()
+
+
+def _resultado(futuro):
+    """
+    Resultado de una tarea de _en_worker, sumando sus métricas a las de este proceso.
+    """
+    resultado, error, metricas = futuro.result()
+    get_metrics().merge(metricas)
+    if error is not None:
+        raise error
+    return resultado
+
+
+def _extraer(path, backend=PDF_BACKEND):
+    inicio = time.perf_counter()
+    pdf_bytes = Path(path).read_bytes()
+    # Los documentos ya se reparten entre procesos: cada uno se extrae en serie
+    texto = extract_text_from_bytes(pdf_bytes, backend=backend, workers=1)
+    return path, pdf_bytes, texto, time.perf_counter() - inicio
+
+
+def _analizar(path, pdf_bytes, texto, api_key, usar_cache, backend=PDF_BACKEND):
+    inicio = time.perf_counter()
+    cache = get_extraction_cache() if usar_cache else None
+    uso = LLMUsage()
+    raw_data, desde_cache = analyze_scomp_pdf(pdf_bytes, api_key, cache=cache, pdf_text=texto, usage=uso,
+                                              backend=backend)
+    return path, raw_data, desde_cache, time.perf_counter() - inicio, uso.totals()
+
+
+def _generar_reportes(path, raw_data, params, output_dir):
+    inicio = time.perf_counter()
+    resultado = process_scomp(raw_data, **params)
+    t_calculo = time.perf_counter() - inicio
+
+    stem = f"{Path(path).stem}__{report_file_stem(resultado)}"
+    pdf_bytes = build_pdf_report(resultado)
+    excel_bytes = build_excel_report(resultado)
+    (Path(output_dir) / f"{stem}.pdf").write_bytes(pdf_bytes)
+    (Path(output_dir) / f"{stem}.xlsx").write_bytes(excel_bytes)
+    return path, t_calculo, time.perf_counter() - inicio - t_calculo, len(pdf_bytes) + len(excel_bytes)
+
+
+def run_batch(input_dir, output_dir, api_key, workers=None, concurrencia=4, params=None, usar_cache=True,
+              backend=PDF_BACKEND, consolidado=None):
+    """
+    Procesa todos los PDF de `input_dir` y deja los reportes en `output_dir`.
+    Con `consolidado` (ruta .xlsx) además escribe un libro con todos los clientes.
+    Las métricas por etapa de los procesos worker se suman a get_metrics() de este proceso.
+    Retorna un dict con el resumen (documentos, errores y tiempos por etapa).
+    """
+    params = params or {}
+    pdfs = sorted(str(p) for p in Path(input_dir).iterdir() if p.suffix.lower() == ".pdf")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tiempos = {'extraccion': 0.0, 'analisis': 0.0, 'calculos': 0.0, 'reportes': 0.0}
+    errores = {}
+    extracciones_ok = {}
+    ok = 0
+    aciertos_cache = 0
+    uso_ia = {'llamadas': 0, 'total_tokens': 0, 'costo': 0.0}
+    bytes_salida = 0
+    inicio = time.perf_counter()
+
+    cache = get_extraction_cache() if usar_cache else None
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker) as procesos, \
+            ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+
+        # Los documentos ya analizados pasan directo a los reportes: sólo se extraen los que faltan
+        extracciones = {}
+        reportes = {}
+        for path in pdfs:
+            raw_data = None
+            if cache is not None:
+                raw_data = cache.get(build_cache_key(Path(path).read_bytes(), pdf_backend=backend))
+            if raw_data is None:
+                extracciones[procesos.submit(_en_worker, _extraer, path, backend)] = path
+                continue
+            aciertos_cache += 1
+            reportes[procesos.submit(_en_worker, _generar_reportes, path, raw_data, params, output_dir)] = path
+            extracciones_ok[path] = raw_data
+
+        analisis = {}
+        for futuro in as_completed(extracciones):
+            path = extracciones[futuro]
+            try:
+                path, pdf_bytes, texto, t = _resultado(futuro)
+                tiempos['extraccion'] += t
+                analisis[hilos.submit(_analizar, path, pdf_bytes, texto, api_key, usar_cache, backend)] = path
+            except Exception as e:
+                errores[path] = f"Extracción: {e}"
+
+        for futuro in as_completed(analisis):
+            path = analisis[futuro]
+            try:
+                path, raw_data, desde_cache, t, totales_ia = futuro.result()
+                tiempos['analisis'] += t
+                aciertos_cache += int(desde_cache)
+                for clave in uso_ia:
+                    uso_ia[clave] += totales_ia[clave]
+                reportes[procesos.submit(_en_worker, _generar_reportes, path, raw_data, params, output_dir)] = path
+                extracciones_ok[path] = raw_data
+            except Exception as e:
+                errores[path] = f"Análisis: {e}"
+
+        for futuro in as_completed(reportes):
+            path = reportes[futuro]
+            try:
+                path, t_calculo, t_reportes, n_bytes = _resultado(futuro)
+                tiempos['calculos'] += t_calculo
+                tiempos['reportes'] += t_reportes
+                bytes_salida += n_bytes
+                ok += 1
+            except Exception as e:
+                errores[path] = f"Reportes: {e}"
+                extracciones_ok.pop(path, None)
+
+    if consolidado and extracciones_ok:
+        inicio_consolidado = time.perf_counter()
+        try:
+            build_consolidated_excel((extracciones_ok[p] for p in sorted(extracciones_ok)), destino=consolidado, **params)
+        except Exception as e:
+            errores[consolidado] = f"Consolidado: {e}"
+        tiempos['consolidado'] = time.perf_counter() - inicio_consolidado
+
+    # El export periódico puede haber quedado antes de las últimas tareas
+    metrics = get_metrics()
+    if metrics.export_path:
+        try:
+            metrics.write(metrics.export_path)
+        except OSError as e:
+            print(f"No se pudieron exportar las métricas: {e}")
+
+    total = time.perf_counter() - inicio
+    return {
+        'documentos': len(pdfs),
+        'ok': ok,
+        'errores': errores,
+        'aciertos_cache': aciertos_cache,
+        'uso_ia': uso_ia,
+        'tiempos': tiempos,
+        'bytes_salida': bytes_salida,
+        'segundos': total,
+        'docs_por_segundo': (ok / total) if total else 0.0,
+    }
+
+
+def print_summary(resumen):
+    print("\n--- Resumen ---")
+    print(f"Documentos: {resumen['documentos']} · OK: {resumen['ok']} · Errores: {len(resumen['errores'])}")
+    print(f"Aciertos de cache: {resumen['aciertos_cache']}")
+    uso_ia = resumen['uso_ia']
+    print(f"IA: {uso_ia['llamadas']} consultas · {uso_ia['total_tokens']:,} tokens · US$ {uso_ia['costo']:.4f}")
+    for etapa, segundos in resumen['tiempos'].items():
+        promedio = segundos / resumen['documentos'] if resumen['documentos'] else 0.0
+        print(f"  {etapa:<11} total {segundos:8.2f}s · promedio {promedio:6.2f}s/doc")
+    print(f"Tiempo total: {resumen['segundos']:.2f}s · {resumen['docs_por_segundo']:.2f} docs/s · "
+          f"{resumen['bytes_salida'] / 1024:.0f} KB generados")
+    for path, error in resumen['errores'].items():
+        print(f"❌ {os.path.basename(path)}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa una carpeta de SCOMPs en PDF y genera sus reportes.")
+    parser.add_argument("input_dir", help="Carpeta con los PDF de SCOMP")
+    parser.add_argument("output_dir", help="Carpeta donde se escriben los reportes PDF/Excel")
+    parser.add_argument("--api-key", default=None, help="API Key de Gemini (por defecto GOOGLE_API_KEY)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para extracción y reportes")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Consultas simultáneas a Gemini")
+    parser.add_argument("--sin-pgu", action="store_true", help="No sumar la PGU")
+    parser.add_argument("--pgu", type=float, default=DEFAULT_PGU_AMOUNT, help="Monto PGU en pesos")
+    parser.add_argument("--sin-bono", action="store_true", help="No sumar el bono")
+    parser.add_argument("--bono-uf", type=float, default=2.5, help="Monto del bono en UF")
+    parser.add_argument("--sin-cache", action="store_true", help="No usar el cache persistente de extracciones")
+    parser.add_argument("--motor-pdf", choices=sorted(PDF_BACKENDS), default=PDF_BACKEND,
+                        help="Motor de extracción de texto (pdfium es más rápido, pero sin layout de tablas)")
+    parser.add_argument("--consolidado", default=None,
+                        help="Ruta de un Excel con todos los clientes (una hoja por cliente y un resumen)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = args.api_key or os.getenv("GOOGLE_API_KEY")
+
+    params = {
+        'include_pgu': not args.sin_pgu,
+        'pgu_amount': args.pgu,
+        'include_bono': not args.sin_bono,
+        'bono_uf': args.bono_uf,
+    }
+    resumen = run_batch(
+        args.input_dir, args.output_dir, api_key,
+        workers=args.workers, concurrencia=args.concurrencia,
+        params=params, usar_cache=not args.sin_cache, backend=args.motor_pdf, consolidado=args.consolidado
+    )
+    print_summary(resumen)
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
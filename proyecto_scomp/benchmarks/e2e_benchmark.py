@@ -0,0 +1,293 @@
+"""
+Benchmark de punta a punta sobre certificados SCOMP sintéticos en PDF.
+
+Cada documento pasa por extract_text_from_pdf -> análisis -> cálculos ->
+reportes PDF/Excel, y se informan percentiles de latencia por etapa y
+documentos por segundo. El análisis usa el parser local con un sustituto de la
+IA o, con --ia replay, el cliente Gemini real (concurrencia, reintentos y
+streaming) sobre el backend de reproducción, sin red: cada documento se envía
+completo a la IA, que responde desde --grabaciones o con el JSON esperado.
+
+Uso (desde proyecto_scomp/):
+    python -m benchmarks.e2e_benchmark --documentos 40 --concurrencia 1,2,4
+    python -m benchmarks.e2e_benchmark --companias 30 --anexos 6 --latencia-ia 1.5
+    python -m benchmarks.e2e_benchmark --salida resultado.json
+    python -m benchmarks.e2e_benchmark --ia replay --latencia-replay lognormal:2,0.5 --errores-ia 503:0.05
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_pdf import make_scomp_pdf
+from config.settings import GEMINI_EXTRACCION_PARALELA, LLM_GRABACIONES_DIR
+from services.gemini_api import VALORES_VACIOS, analyze_scomp_with_gemini
+from services.llm_backends import configure_backend
+from services.llm_usage import LLMUsage
+from services.page_filter import prepare_text_for_llm
+from services.pipeline import extract_text_from_bytes, process_scomp, build_pdf_report, build_excel_report
+from services.scomp_parser import parse_scomp_text
+
+ETAPAS = ("extraccion", "analisis", "calculos", "reportes", "total")
+PERCENTILES = (50, 90, 99)
+
+
+def _rango(valor):
+    """
+    "8" -> (8, 8); "6-30" -> (6, 30).
+    """
+    minimo, _, maximo = str(valor).partition("-")
+    return int(minimo), int(maximo or minimo)
+
+
+def build_corpus(n_documentos, proporcion_sobrevivencia=0.3, companias=(6, 30), modalidades=(1, 5),
+                 beneficiarios=(1, 4), rentas_temporales=(0, 2), anexos=(0, 4), seed=0):
+    """
+    Genera `n_documentos` certificados con tamaños al azar dentro de cada rango
+    (mín, máx). Retorna una lista de (pdf_bytes, raw_data_esperado).
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n_documentos):
+        tipo = "sobrevivencia" if rng.random() < proporcion_sobrevivencia else "vejez"
+        corpus.append(make_scomp_pdf(
+            tipo,
+            n_companias=rng.randint(*companias),
+            n_modalidades=rng.randint(*modalidades),
+            n_beneficiarios=rng.randint(*beneficiarios),
+            n_rentas_temporales=rng.randint(*rentas_temporales),
+            paginas_anexo=rng.randint(*anexos),
+            seed=seed + i,
+        ))
+    return corpus
+
+
+def analyze_local(texto, esperado, latencia_ia=0.0):
+    """
+    Sustituto del análisis: parser local y, para las secciones que no pudo leer,
+    una "IA" que tarda `latencia_ia` segundos y responde con el JSON esperado.
+    Retorna (raw_data, secciones_pendientes).
+    """
+    datos, pendientes = parse_scomp_text(texto)
+    if pendientes:
+        time.sleep(latencia_ia)
+        for seccion in pendientes:
+            datos[seccion] = esperado[seccion]
+    return datos, pendientes
+
+
+def expected_responder(esperados):
+    """
+    Respaldo para el backend de reproducción: responde con el JSON esperado del
+    documento cuyo código de consulta aparece en el prompt, sólo con las claves pedidas.
+    """
+    def responder(prompt):
+        codigo = re.search(r"Código consulta: (\S+)", prompt)
+        if not codigo or codigo.group(1) not in esperados:
+            return None
+        esperado = esperados[codigo.group(1)]
+        pedidas = re.search(r"ÚNICAMENTE estas claves: ([\w, ]+)\.", prompt)
+        claves = [c.strip() for c in pedidas.group(1).split(",")] if pedidas else list(VALORES_VACIOS)
+        return json.dumps({c: esperado.get(c, VALORES_VACIOS.get(c)) for c in claves}, ensure_ascii=False)
+    return responder
+
+
+def configure_replay(esperados, opciones_ia):
+    """
+    Usa el backend de reproducción en este proceso (también como inicializador de los workers).
+    """
+    configure_backend("replay", respaldo=expected_responder(esperados), **opciones_ia)
+
+
+def analyze_replay(texto):
+    """
+    Envía el documento completo a la IA (backend de reproducción), como si el
+    parser local no hubiera podido leer ninguna sección.
+    Retorna (raw_data, secciones_pendientes, totales de LLMUsage).
+    """
+    uso = LLMUsage()
+    texto_llm, _ = prepare_text_for_llm(texto)
+    datos = analyze_scomp_with_gemini(texto_llm, "replay", parallel=GEMINI_EXTRACCION_PARALELA, usage=uso)
+    return datos, list(VALORES_VACIOS), uso.totals()
+
+
+def run_document(pdf_bytes, esperado, latencia_ia=0.0, params=None, ia="sustituto"):
+    """
+    Procesa un documento completo y retorna los segundos por etapa, páginas
+    extraídas, secciones que necesitaron la IA, tokens de IA y bytes generados.
+    """
+    tiempos = {}
+    inicio = time.perf_counter()
+    # Los documentos ya se reparten entre procesos: cada uno se extrae en serie
+    texto = extract_text_from_bytes(pdf_bytes, workers=1)
+    if not texto:
+        raise ValueError("No se pudo leer el texto del PDF.")
+    tiempos['extraccion'] = time.perf_counter() - inicio
+
+    t = time.perf_counter()
+    tokens_ia = 0
+    if ia == "replay":
+        raw_data, pendientes, totales_ia = analyze_replay(texto)
+        tokens_ia = totales_ia['total_tokens']
+    else:
+        raw_data, pendientes = analyze_local(texto, esperado, latencia_ia)
+    tiempos['analisis'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    resultado = process_scomp(raw_data, **(params or {}))
+    tiempos['calculos'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    n_bytes = len(build_pdf_report(resultado)) + len(build_excel_report(resultado))
+    tiempos['reportes'] = time.perf_counter() - t
+
+    tiempos['total'] = time.perf_counter() - inicio
+    return {
+        'tiempos': tiempos,
+        'paginas': texto.count("--- PÁGINA"),
+        'pendientes': pendientes,
+        'tokens_ia': tokens_ia,
+        'bytes_salida': n_bytes,
+    }
+
+
+def percentiles(valores, ps=PERCENTILES):
+    """
+    Percentiles con interpolación lineal entre las muestras ordenadas.
+    """
+    orden = sorted(valores)
+    if not orden:
+        return {p: 0.0 for p in ps}
+    resultado = {}
+    for p in ps:
+        posicion = (len(orden) - 1) * p / 100
+        bajo = int(posicion)
+        alto = min(bajo + 1, len(orden) - 1)
+        resultado[p] = orden[bajo] + (orden[alto] - orden[bajo]) * (posicion - bajo)
+    return resultado
+
+
+def run_e2e(corpus, concurrencia=1, latencia_ia=0.0, params=None, ia="sustituto", opciones_ia=None):
+    """
+    Procesa el corpus con `concurrencia` procesos (1 = en este proceso).
+    Con ia="replay", `opciones_ia` se entrega a configure_backend (latencia, errores, grabaciones, seed).
+    Retorna un resumen con percentiles por etapa (ms) y documentos por segundo.
+    """
+    esperados = {esperado['header']['n_scomp']: esperado for _, esperado in corpus}
+    inicio = time.perf_counter()
+    documentos = []
+    errores = []
+    if concurrencia <= 1:
+        if ia == "replay":
+            configure_replay(esperados, opciones_ia or {})
+        for pdf_bytes, esperado in corpus:
+            try:
+                documentos.append(run_document(pdf_bytes, esperado, latencia_ia, params, ia))
+            except Exception as e:
+                errores.append(str(e))
+    else:
+        argumentos = {}
+        if ia == "replay":
+            # "spawn": un fork heredaría el loop del cliente Gemini sin su hilo
+            argumentos = {'mp_context': multiprocessing.get_context("spawn"), 'initializer': configure_replay,
+                          'initargs': (esperados, opciones_ia or {})}
+        with ProcessPoolExecutor(max_workers=concurrencia, **argumentos) as pool:
+            futuros = [pool.submit(run_document, pdf_bytes, esperado, latencia_ia, params, ia)
+                       for pdf_bytes, esperado in corpus]
+            for futuro in futuros:
+                try:
+                    documentos.append(futuro.result())
+                except Exception as e:
+                    errores.append(str(e))
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'concurrencia': concurrencia,
+        'documentos': len(corpus),
+        'ok': len(documentos),
+        'errores': errores,
+        'segundos': segundos,
+        'docs_por_segundo': len(documentos) / segundos if segundos else 0.0,
+        'paginas_extraidas': sum(d['paginas'] for d in documentos),
+        'documentos_con_ia': sum(1 for d in documentos if d['pendientes']),
+        'tokens_ia': sum(d['tokens_ia'] for d in documentos),
+        'bytes_salida': sum(d['bytes_salida'] for d in documentos),
+        'etapas_ms': {
+            etapa: {f"p{p}": v * 1000 for p, v in
+                    percentiles([d['tiempos'][etapa] for d in documentos]).items()}
+            for etapa in ETAPAS
+        },
+    }
+
+
+def print_summary(resumen):
+    print(f"\n--- Concurrencia {resumen['concurrencia']} ---")
+    print(f"Documentos: {resumen['documentos']} · OK: {resumen['ok']} · Errores: {len(resumen['errores'])} · "
+          f"Con IA: {resumen['documentos_con_ia']} · Páginas extraídas: {resumen['paginas_extraidas']}")
+    if resumen['tokens_ia']:
+        print(f"Tokens de IA: {resumen['tokens_ia']:,}")
+    cabecera = "".join(f"{f'p{p}':>10}" for p in PERCENTILES)
+    print(f"  {'etapa':<11}{cabecera}  (ms)")
+    for etapa, valores in resumen['etapas_ms'].items():
+        print(f"  {etapa:<11}" + "".join(f"{v:10.1f}" for v in valores.values()))
+    print(f"Tiempo total: {resumen['segundos']:.2f}s · {resumen['docs_por_segundo']:.2f} docs/s · "
+          f"{resumen['bytes_salida'] / 1024:.0f} KB generados")
+    for error in resumen['errores'][:5]:
+        print(f"❌ {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta con SCOMPs sintéticos.")
+    parser.add_argument("--documentos", type=int, default=20)
+    parser.add_argument("--concurrencia", default="1", help="Procesos en paralelo; varios separados por coma (1,2,4)")
+    parser.add_argument("--sobrevivencia", type=float, default=0.3, help="Proporción de SCOMPs de Sobrevivencia")
+    parser.add_argument("--companias", default="6-30", help="Ofertas por modalidad (N o mín-máx)")
+    parser.add_argument("--modalidades", default="1-5", help="Modalidades de Renta Vitalicia (N o mín-máx)")
+    parser.add_argument("--beneficiarios", default="1-4", help="Beneficiarios en Sobrevivencia (N o mín-máx)")
+    parser.add_argument("--anexos", default="0-4", help="Páginas de glosario/legales al final (N o mín-máx)")
+    parser.add_argument("--latencia-ia", type=float, default=0.0,
+                        help="Segundos que tarda la IA sustituta cuando el parser local no alcanza")
+    parser.add_argument("--ia", choices=("sustituto", "replay"), default="sustituto",
+                        help="sustituto: parser local + IA simulada; replay: cliente Gemini sobre respuestas grabadas")
+    parser.add_argument("--latencia-replay", default=None,
+                        help="Latencia del replay (grabada, fija:S, uniforme:MIN,MAX, lognormal:MEDIANA,SIGMA); "
+                             "por defecto fija:--latencia-ia")
+    parser.add_argument("--errores-ia", default="", help="Errores inyectados en el replay (p. ej. 503:0.05,json:0.01)")
+    parser.add_argument("--grabaciones", default=LLM_GRABACIONES_DIR, help="Directorio de respuestas grabadas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Guardar los resúmenes en este archivo JSON")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    corpus = build_corpus(
+        args.documentos, args.sobrevivencia, _rango(args.companias), _rango(args.modalidades),
+        _rango(args.beneficiarios), anexos=_rango(args.anexos), seed=args.seed,
+    )
+    print(f"Corpus: {len(corpus)} PDFs ({sum(len(p) for p, _ in corpus) / 1024:.0f} KB) "
+          f"generados en {time.perf_counter() - inicio:.1f}s")
+
+    opciones_ia = {
+        'latencia': args.latencia_replay or f"fija:{args.latencia_ia}",
+        'errores': args.errores_ia,
+        'grabaciones': args.grabaciones,
+        'seed': args.seed,
+    }
+    resumenes = []
+    for concurrencia in (int(c) for c in args.concurrencia.split(",")):
+        resumen = run_e2e(corpus, concurrencia, args.latencia_ia, ia=args.ia, opciones_ia=opciones_ia)
+        print_summary(resumen)
+        resumenes.append(resumen)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({'argumentos': vars(args), 'resumenes': resumenes}, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.salida}")
+    return 1 if any(r['errores'] for r in resumenes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
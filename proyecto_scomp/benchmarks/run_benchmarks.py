@@ -0,0 +1,258 @@
+"""
+Microbenchmarks de cálculos y reportes sobre JSON sintéticos.
+
+Uso (desde proyecto_scomp/):
+    python -m benchmarks.run_benchmarks                      # corre y guarda en benchmarks/results/
+    python -m benchmarks.run_benchmarks --filtro excel       # sólo los que contienen "excel"
+    python -m benchmarks.run_benchmarks --comparar base.json [nuevo.json]
+
+Cada resultado se guarda como JSON con el commit, para comparar entre versiones.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime
+
+from benchmarks.synthetic import make_vejez_json, make_sobrevivencia_json, make_number_strings
+from config.settings import DEFAULT_PGU_AMOUNT
+from services.calculations import process_data_vejez, process_data_sobrevivencia
+from services.pipeline import process_scomp
+from services.report_gen import PDFReportVejez, PDFReportSobrevivencia, create_formatted_excel_report
+from utils.helpers import clean_number
+from utils.numbers import parse_numbers
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Diferencia relativa sobre la cual una comparación se marca como regresión/mejora
+UMBRAL_CAMBIO = 0.10
+
+
+def _bench_clean_number(tamanos):
+    valores = make_number_strings(tamanos['numeros'])
+    return lambda: [clean_number(v) for v in valores]
+
+
+def _bench_parse_numbers(tamanos):
+    valores = make_number_strings(tamanos['numeros'])
+    return lambda: parse_numbers(valores)
+
+
+def _bench_vejez(tamanos):
+    raw = make_vejez_json(tamanos['modalidades'], tamanos['companias'], tamanos['rentas_temporales'])
+    return lambda: process_data_vejez(raw, dict(raw['header']), True, DEFAULT_PGU_AMOUNT, True, 2.5)
+
+
+def _bench_sobrevivencia(tamanos):
+    raw = make_sobrevivencia_json(tamanos['beneficiarios'], tamanos['modalidades'], tamanos['companias'])
+    return lambda: process_data_sobrevivencia(raw, dict(raw['header']))
+
+
+def _repetir_filas(tabla, n):
+    # Tablas de `n` filas a partir de las ofertas sintéticas (sin el top 4 de los cálculos)
+    return tabla.iloc[[i % len(tabla) for i in range(n)]].reset_index(drop=True)
+
+
+def _bench_print_table(tamanos):
+    resultado = process_scomp(make_vejez_json(1, tamanos['companias'], 0))
+    item = next(t for t in resultado['tablas'] if t['tipo'] == 'RV')
+    tabla = _repetir_filas(item['tabla'], tamanos['filas_tabla'])
+
+    def correr():
+        pdf = PDFReportVejez()
+        pdf.add_page()
+        pdf.print_table(item['titulo'], tabla, item['tipo'], item['col_title_pdf'], item.get('eld_info'))
+    return correr
+
+
+def _bench_print_table_sobrevivencia(tamanos):
+    resultado = process_scomp(make_sobrevivencia_json(tamanos['beneficiarios'], 1, tamanos['companias']))
+    rp, rv = resultado['tablas'][0], resultado['tablas'][1]
+    rv_tabla = _repetir_filas(rv['tabla'], tamanos['filas_tabla'])
+
+    def correr():
+        pdf = PDFReportSobrevivencia()
+        pdf.set_header_data(resultado['header'], resultado['beneficiarios'])
+        pdf.add_page()
+        pdf.print_table_sobrevivencia(rp['titulo'], rp['tabla'], rp['tipo'])
+        pdf.print_table_sobrevivencia(rv['titulo'], rv_tabla, rv['tipo'])
+    return correr
+
+
+def _bench_excel(tamanos):
+    resultado = process_scomp(make_vejez_json(tamanos['modalidades'], tamanos['companias'], tamanos['rentas_temporales']))
+    return lambda: create_formatted_excel_report(resultado['header'], resultado['tablas'])
+
+
+def _bench_excel_sobrevivencia(tamanos):
+    resultado = process_scomp(make_sobrevivencia_json(tamanos['beneficiarios'], tamanos['modalidades'],
+                                                      tamanos['companias']))
+    return lambda: create_formatted_excel_report(resultado['header'], resultado['tablas'], resultado['beneficiarios'])
+
+
+BENCHMARKS = {
+    'clean_number': _bench_clean_number,
+    'parse_numbers': _bench_parse_numbers,
+    'process_data_vejez': _bench_vejez,
+    'process_data_sobrevivencia': _bench_sobrevivencia,
+    'pdf_print_table': _bench_print_table,
+    'pdf_print_table_sobrevivencia': _bench_print_table_sobrevivencia,
+    'excel_vejez': _bench_excel,
+    'excel_sobrevivencia': _bench_excel_sobrevivencia,
+}
+
+TAMANOS_DEFECTO = {
+    'numeros': 10000,
+    'modalidades': 3,
+    'companias': 12,
+    'rentas_temporales': 1,
+    'beneficiarios': 3,
+    'filas_tabla': 200,
+}
+
+
+def time_callable(funcion, repeticiones=5, tiempo_minimo=0.2):
+    """
+    Mide `funcion` como timeit: ajusta cuántas llamadas hace cada repetición para
+    que dure al menos `tiempo_minimo` segundos. Retorna tiempos por llamada (ms).
+    """
+    timer = timeit.Timer(funcion)
+    numero = 1
+    while True:
+        if timer.timeit(numero) >= tiempo_minimo or numero >= 10000:
+            break
+        numero *= 2
+    tiempos = [t / numero * 1000 for t in timer.repeat(repeat=repeticiones, number=numero)]
+    return {
+        'llamadas_por_repeticion': numero,
+        'min_ms': min(tiempos),
+        'mediana_ms': statistics.median(tiempos),
+        'media_ms': statistics.mean(tiempos),
+        'desv_ms': statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+    }
+
+
+def run_benchmarks(filtro=None, tamanos=None, repeticiones=5, tiempo_minimo=0.2, salida=print):
+    tamanos = {**TAMANOS_DEFECTO, **(tamanos or {})}
+    resultados = {}
+    for nombre, preparar in BENCHMARKS.items():
+        if filtro and filtro not in nombre:
+            continue
+        funcion = preparar(tamanos)
+        funcion()  # Calentamiento (fuentes, imports perezosos, caches)
+        resultados[nombre] = time_callable(funcion, repeticiones, tiempo_minimo)
+        r = resultados[nombre]
+        salida(f"{nombre:<32} min {r['min_ms']:9.3f} ms · mediana {r['mediana_ms']:9.3f} ms "
+               f"· ±{r['desv_ms']:.3f}")
+    return resultados
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin-git"
+
+
+def save_results(resultados, tamanos, directorio=RESULTADOS_DIR):
+    """
+    Guarda los resultados con metadatos (commit, fecha, Python, máquina).
+    Retorna la ruta del archivo.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    commit = _git_commit()
+    fecha = datetime.now()
+    datos = {
+        'commit': commit,
+        'fecha': fecha.isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'maquina': platform.platform(),
+        'tamanos': {**TAMANOS_DEFECTO, **(tamanos or {})},
+        'resultados': resultados,
+    }
+    ruta = os.path.join(directorio, f"{fecha:%Y%m%d_%H%M%S}_{commit}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+def compare_results(base, nuevo, umbral=UMBRAL_CAMBIO):
+    """
+    Compara dos resultados (dicts de save_results) por mediana.
+    Retorna una lista de (nombre, base_ms, nuevo_ms, razon, estado).
+    """
+    filas = []
+    for nombre, r_nuevo in nuevo['resultados'].items():
+        r_base = base['resultados'].get(nombre)
+        if r_base is None:
+            continue
+        razon = r_nuevo['mediana_ms'] / r_base['mediana_ms'] if r_base['mediana_ms'] else float('inf')
+        if razon > 1 + umbral:
+            estado = "REGRESIÓN"
+        elif razon < 1 - umbral:
+            estado = "mejora"
+        else:
+            estado = "="
+        filas.append((nombre, r_base['mediana_ms'], r_nuevo['mediana_ms'], razon, estado))
+    return filas
+
+
+def print_comparison(base, nuevo, filas):
+    print(f"Base: {base['commit']} ({base['fecha']}) · Nuevo: {nuevo['commit']} ({nuevo['fecha']})")
+    if base.get('tamanos') != nuevo.get('tamanos'):
+        print("⚠️ Los tamaños de entrada no coinciden; la comparación puede no ser válida.")
+    for nombre, base_ms, nuevo_ms, razon, estado in filas:
+        print(f"{nombre:<32} {base_ms:9.3f} ms → {nuevo_ms:9.3f} ms  x{razon:5.2f}  {estado}")
+
+
+def _cargar(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks de cálculos y reportes SCOMP.")
+    parser.add_argument("--filtro", default=None, help="Sólo benchmarks cuyo nombre contenga este texto")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--tiempo-minimo", type=float, default=0.2, help="Segundos mínimos por repetición")
+    for clave, valor in TAMANOS_DEFECTO.items():
+        parser.add_argument(f"--{clave.replace('_', '-')}", type=int, default=valor, dest=clave)
+    parser.add_argument("--no-guardar", action="store_true", help="No guardar el resultado en benchmarks/results/")
+    parser.add_argument("--comparar", nargs="+", metavar="JSON",
+                        help="Compara un resultado base con otro (o con la corrida actual si se da uno solo)")
+    args = parser.parse_args(argv)
+
+    if args.comparar and len(args.comparar) == 2:
+        base, nuevo = _cargar(args.comparar[0]), _cargar(args.comparar[1])
+        filas = compare_results(base, nuevo)
+        print_comparison(base, nuevo, filas)
+        return 1 if any(estado == "REGRESIÓN" for *_, estado in filas) else 0
+
+    tamanos = {clave: getattr(args, clave) for clave in TAMANOS_DEFECTO}
+    inicio = time.perf_counter()
+    resultados = run_benchmarks(args.filtro, tamanos, args.repeticiones, args.tiempo_minimo)
+    print(f"Total: {time.perf_counter() - inicio:.1f}s")
+
+    ruta = None
+    if not args.no_guardar:
+        ruta = save_results(resultados, tamanos)
+        print(f"Resultados guardados en {ruta}")
+
+    if args.comparar:
+        base = _cargar(args.comparar[0])
+        nuevo = {'commit': _git_commit(), 'fecha': datetime.now().isoformat(timespec='seconds'),
+                 'tamanos': tamanos, 'resultados': resultados}
+        filas = compare_results(base, nuevo)
+        print_comparison(base, nuevo, filas)
+        return 1 if any(estado == "REGRESIÓN" for *_, estado in filas) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
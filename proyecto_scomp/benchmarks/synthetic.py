@@ -0,0 +1,217 @@
+"""
+Generador de JSON sintéticos con la misma forma que la respuesta de Gemini
+(ver FORMATO JSON DE SALIDA en config/settings.py), para benchmarks y pruebas
+de carga sin usar SCOMPs reales de clientes.
+"""
+import random
+
+COMPANIAS = (
+    "4 LIFE SEGUROS DE VIDA", "BICE VIDA", "BCI SEGUROS VIDA", "CN LIFE", "CONFUTURO", "CONSORCIO VIDA",
+    "EUROAMERICA", "METLIFE", "PENTA VIDA", "PRINCIPAL", "SECURITY PREVISION", "SURA SEGUROS DE VIDA",
+)
+AFPS = ("AFP CAPITAL", "AFP CUPRUM", "AFP HABITAT", "AFP MODELO", "AFP PLANVITAL", "AFP PROVIDA", "AFP UNO")
+COMISIONES_AFP = {
+    "AFP CAPITAL": 1.44, "AFP CUPRUM": 1.44, "AFP HABITAT": 1.27, "AFP MODELO": 0.58,
+    "AFP PLANVITAL": 1.16, "AFP PROVIDA": 1.45, "AFP UNO": 0.49,
+}
+NOMBRES = ("ANA", "JUAN", "MARIA", "PEDRO", "DORILA", "LUIS", "CARMEN", "JOSE", "ROSA", "MANUEL")
+APELLIDOS = ("PEREZ", "SOTO", "ISLA", "GONZALEZ", "MUÑOZ", "ROJAS", "DIAZ", "CONTRERAS", "SILVA", "NUÑEZ")
+# Los mismos textos de PORCENTAJES_SOBREVIVENCIA, para que el parser local los reconozca
+PARENTESCOS = (
+    "Cónyuge con hijos con derecho a pensión", "Hijo", "Hijo de cónyuge con derecho a pensión",
+    "Madre o Padre de hijos de filiación no matrimonial",
+)
+
+# Modalidades de Renta Vitalicia: (porcentaje_aumento, meses_aumento, meses_garantizados)
+MODALIDADES_RV = ((0, 0, 0), (100, 12, 120), (50, 24, 0), (0, 0, 240), (100, 36, 180))
+
+
+def format_uf(valor):
+    """
+    UF como string en formato chileno ("1.234,56"), igual que en el certificado.
+    """
+    return f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _nombre(rng):
+    return f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def _rut(rng):
+    return f"{rng.randint(5, 25)}.{rng.randint(0, 999):03d}.{rng.randint(0, 999):03d}-{rng.choice('0123456789K')}"
+
+
+def _companias(n):
+    # Sobre las 12 reales se repiten con sufijo de letra ("CN LIFE B"); un sufijo
+    # numérico se confundiría con los montos al leer el texto del PDF
+    return [COMPANIAS[i % len(COMPANIAS)] + (f" {chr(ord('A') + i // len(COMPANIAS))}" if i >= len(COMPANIAS) else "")
+            for i in range(n)]
+
+
+def _header(rng, tipo_pension, valor_uf):
+    return {
+        "nombre": _nombre(rng),
+        "rut": _rut(rng),
+        "tipo_pension": tipo_pension,
+        "n_scomp": str(rng.randint(90000000000, 99999999999)),
+        "saldo_uf": format_uf(rng.uniform(800, 9000)),
+        "valor_uf_str": f"$ {format_uf(valor_uf)}",
+        "valor_uf_float": valor_uf,
+        "afp_origen": rng.choice(AFPS),
+    }
+
+
+def _titulo_rv(aumento, meses_aumento, garantizado):
+    titulo = "PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA"
+    if aumento:
+        titulo += f" CON AUMENTO TEMPORAL DEL {aumento}% POR {meses_aumento} MESES"
+    if garantizado:
+        titulo += f" {'Y' if aumento else 'CON'} PERIODO GARANTIZADO DE {garantizado} MESES"
+    if not aumento and not garantizado:
+        titulo += " SIMPLE"
+    return titulo + " SIN RETIRO DE EXCEDENTE"
+
+
+def _eld_info(rng, companias, valor_uf):
+    pension_uf = rng.uniform(8, 14)
+    monto_uf = rng.uniform(200, 900)
+    return {
+        "compania": rng.choice(companias),
+        "pension_uf": format_uf(pension_uf),
+        "pension_pesos": round(pension_uf * valor_uf),
+        "monto_uf": format_uf(monto_uf),
+        "monto_pesos": round(monto_uf * valor_uf),
+    }
+
+
+def make_vejez_json(n_modalidades=3, n_companias=8, n_rentas_temporales=1, seed=0, valor_uf=37571.86):
+    """
+    JSON sintético de un SCOMP de Vejez con `n_modalidades` modalidades de Renta
+    Vitalicia de `n_companias` ofertas cada una y `n_rentas_temporales` de RT/RVD.
+    """
+    rng = random.Random(seed)
+    header = _header(rng, "PENSIÓN DE VEJEZ", valor_uf)
+    companias = _companias(n_companias)
+
+    def ofertas(base_uf):
+        filas = []
+        for compania in companias:
+            uf = round(base_uf * rng.uniform(0.9, 1.1), 2)
+            filas.append([compania, format_uf(uf), round(uf * valor_uf)])
+        return filas
+
+    base_uf = rng.uniform(8, 25)
+    rp_uf = round(base_uf * rng.uniform(0.85, 1.0), 2)
+    rentas = []
+    for i in range(n_modalidades):
+        aumento, meses_aumento, garantizado = MODALIDADES_RV[i % len(MODALIDADES_RV)]
+        rentas.append({
+            "titulo": _titulo_rv(aumento, meses_aumento, garantizado),
+            "porcentaje_aumento": aumento,
+            "meses_aumento": meses_aumento,
+            "meses_garantizados": garantizado,
+            "ofertas": ofertas(base_uf * (1 - garantizado / 2000)),
+            "eld_info": _eld_info(rng, companias, valor_uf) if rng.random() < 0.5 else None,
+        })
+
+    temporales = []
+    for i in range(n_rentas_temporales):
+        diferido = (12, 24, 36)[i % 3]
+        temporales.append({
+            "titulo": f"PENSIÓN MENSUAL EN RENTA VITALICIA DIFERIDA DE {diferido} MESES SIN RETIRO DE EXCEDENTE",
+            "periodo_diferido_meses": diferido,
+            "factor_renta_temporal": (1.0, 1.5, 2.0)[i % 3],
+            "meses_garantizados": 0,
+            "ofertas_rvd": ofertas(base_uf * 0.95),
+            "eld_info": None,
+        })
+
+    return {
+        "header": header,
+        "beneficiarios": [],
+        "pension_referencia": [[rng.choice(companias), format_uf(base_uf * 0.8), round(base_uf * 0.8 * valor_uf)]],
+        "retiro_programado": {
+            "comision_pct": COMISIONES_AFP[header["afp_origen"]],
+            "pension_uf": format_uf(rp_uf),
+            "pension_bruta": round(rp_uf * valor_uf),
+            "eld_oferta": None,
+        },
+        "rentas_vitalicias": rentas,
+        "renta_temporal_rv_diferida": temporales,
+    }
+
+
+def make_sobrevivencia_json(n_beneficiarios=2, n_modalidades=2, n_companias=8, seed=0, valor_uf=36468.40):
+    """
+    JSON sintético de un SCOMP de Sobrevivencia con `n_beneficiarios`, y
+    `n_modalidades` de Renta Vitalicia de `n_companias` ofertas cada una.
+    """
+    rng = random.Random(seed)
+    header = _header(rng, "PENSIÓN DE SOBREVIVENCIA", valor_uf)
+    beneficiarios = [
+        {"nombre": _nombre(rng), "rut": _rut(rng), "parentesco": PARENTESCOS[0 if i == 0 else 1 + i % 3]}
+        for i in range(n_beneficiarios)
+    ]
+    # El cónyuge recibe el 60% de la pensión de referencia, cada hijo el 15%
+    porcentajes = [0.6 if i == 0 else 0.15 for i in range(n_beneficiarios)]
+    base_uf = rng.uniform(15, 35)
+
+    def por_beneficiario(total_uf):
+        return [[format_uf(total_uf * p), round(total_uf * p * valor_uf)] for p in porcentajes]
+
+    def oferta(compania, total_uf):
+        partes = por_beneficiario(total_uf)
+        return {"compania": compania, "ofertas_beneficiarios": partes,
+                "pension_total_pesos": sum(pesos for _, pesos in partes)}
+
+    companias = _companias(n_companias)
+    rentas = []
+    for i in range(n_modalidades):
+        aumento, meses_aumento, garantizado = MODALIDADES_RV[i % len(MODALIDADES_RV)]
+        rentas.append({
+            "titulo": _titulo_rv(aumento, meses_aumento, garantizado),
+            "porcentaje_aumento": aumento,
+            "meses_aumento": meses_aumento,
+            "meses_garantizados": garantizado,
+            "ofertas": [oferta(c, round(base_uf * rng.uniform(0.9, 1.1), 2)) for c in companias],
+            "eld_info": None,
+        })
+
+    rp_total = round(base_uf * rng.uniform(0.85, 1.0), 2)
+    pensiones_rp = [[b["nombre"], uf, pesos] for b, (uf, pesos) in zip(beneficiarios, por_beneficiario(rp_total))]
+    return {
+        "header": header,
+        "beneficiarios": beneficiarios,
+        "pension_referencia": [{"compania": rng.choice(companias),
+                                "ofertas_beneficiarios": por_beneficiario(base_uf * 0.8)}],
+        "retiro_programado": {
+            "comision_pct": COMISIONES_AFP[header["afp_origen"]],
+            "pension_total_uf": format_uf(rp_total),
+            "pension_total_pesos": sum(p for _, _, p in pensiones_rp),
+            "pensiones_beneficiarios": pensiones_rp,
+        },
+        "rentas_vitalicias": rentas,
+        "renta_temporal_rv_diferida": [],
+    }
+
+
+def make_number_strings(n=10000, seed=0):
+    """
+    Mezcla de valores como los que llegan a clean_number: montos "$ 1.234.567",
+    UF "14,20", enteros, floats y basura ilegible.
+    """
+    rng = random.Random(seed)
+    valores = []
+    for _ in range(n):
+        tipo = rng.random()
+        if tipo < 0.4:
+            valores.append(f"$ {rng.randint(0, 30_000_000):,}".replace(",", "."))
+        elif tipo < 0.8:
+            valores.append(format_uf(rng.uniform(0, 5000)))
+        elif tipo < 0.9:
+            valores.append(rng.randint(0, 2_000_000))
+        elif tipo < 0.97:
+            valores.append(rng.uniform(0, 100))
+        else:
+            valores.append("N/A")
+    return valores
@@ -0,0 +1,242 @@
+"""
+Certificados SCOMP sintéticos en PDF a partir de los JSON de benchmarks/synthetic.py.
+
+El texto se arma con el mismo formato que lee el parser local (ver
+services/scomp_parser.py), así un documento generado recorre el pipeline completo
+(extracción -> parser -> cálculos -> reportes) sin datos reales de clientes.
+"""
+import random
+
+from fpdf import FPDF
+
+from benchmarks.synthetic import (
+    AFPS, COMISIONES_AFP, format_uf, make_vejez_json, make_sobrevivencia_json
+)
+from config.settings import PDF_FUENTE
+from services.pdf_fonts import register_fonts
+
+# Líneas de texto por página antes de pasar a la siguiente
+LINEAS_POR_PAGINA = 55
+TAMANO_FUENTE = 8
+ALTO_LINEA = 4.5
+
+TEXTO_GLOSARIO = (
+    "GLOSARIO",
+    "Renta Vitalicia Inmediata: modalidad en que el afiliado contrata con una compañía de seguros",
+    "el pago de una renta mensual de por vida a contar de la fecha de traspaso de la prima.",
+    "Retiro Programado: modalidad en que el afiliado mantiene su saldo en la AFP y retira",
+    "anualmente la cantidad que resulta de dividir el saldo por el capital necesario.",
+    "Renta Temporal con Renta Vitalicia Diferida: el afiliado contrata una renta vitalicia que",
+    "comienza en una fecha posterior y mientras tanto recibe una renta temporal de la AFP.",
+    "Periodo garantizado: plazo en que la compañía paga el 100% de la pensión a los beneficiarios",
+    "designados aunque el afiliado fallezca.",
+    "Excedente de Libre Disposición: saldo que supera lo necesario para la pensión exigida por ley.",
+)
+TEXTO_LEGAL = (
+    "INFORMACIÓN IMPORTANTE",
+    "Este certificado se emite conforme al D.L. 3.500 y la Norma de Carácter General vigente.",
+    "Las ofertas tienen la vigencia indicada en el Artículo correspondiente del reglamento.",
+    "Si acepta una oferta debe hacerlo por escrito ante la AFP, compañía o asesor previsional.",
+    "Declaro haber recibido la información de las ofertas de pensión presentadas en este certificado.",
+    "",
+    "Firma del afiliado: ______________________",
+)
+
+
+def format_pesos(valor):
+    """
+    Pesos con separador de miles chileno ("1.234.567").
+    """
+    return f"{int(valor):,}".replace(",", ".")
+
+
+def _valores_afp(rng, afp_origen, valor_origen, variacion=0.02):
+    """
+    Valor de cada AFP para las tablas de Retiro Programado: la AFP de origen
+    lleva el del JSON y el resto una variación aleatoria.
+    """
+    return [valor_origen if afp == afp_origen else valor_origen * rng.uniform(1 - variacion, 1 + variacion)
+            for afp in AFPS]
+
+
+def _fila_afp(etiqueta, valores):
+    return " ".join([etiqueta] + valores)
+
+
+def _cabecera_afps():
+    return "AFP " + " ".join(afp.replace("AFP ", "") for afp in AFPS)
+
+
+def _lineas_header(header, es_sobrevivencia):
+    persona = "Datos del consultante" if es_sobrevivencia else "Datos del afiliado"
+    afp = "AFP del causante" if es_sobrevivencia else "AFP de origen"
+    return [
+        f"CERTIFICADO DE OFERTAS - {header['tipo_pension']}",
+        f"Código consulta: {header['n_scomp']}",
+        f"{persona}: {header['nombre']} RUT: {header['rut']}",
+        f"{afp}: {header['afp_origen']}",
+        f"Valor UF a fecha emisión: {header['valor_uf_str']}",
+        f"EL SALDO DESTINADO A PENSIÓN ES: UF {header['saldo_uf']}",
+    ]
+
+
+def _titulo_en_dos_lineas(titulo):
+    # En el certificado los títulos largos se cortan antes de "SIN/CON RETIRO DE EXCEDENTE"
+    for corte in (" SIN RETIRO DE EXCEDENTE", " CON RETIRO DE EXCEDENTE"):
+        if corte in titulo:
+            inicio, _, resto = titulo.partition(corte)
+            return [inicio, corte.strip() + resto]
+    return [titulo]
+
+
+def _lineas_vejez(raw, rng):
+    header = raw['header']
+    valor_uf = header['valor_uf_float']
+    rp = raw['retiro_programado']
+    lineas = _lineas_header(header, False)
+
+    pension_uf = _valores_afp(rng, header['afp_origen'], float(rp['pension_uf'].replace(".", "").replace(",", ".")))
+    pension_pesos = [rp['pension_bruta'] if afp == header['afp_origen'] else round(uf * valor_uf)
+                     for afp, uf in zip(AFPS, pension_uf)]
+    lineas += [
+        "MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO",
+        _cabecera_afps(),
+        _fila_afp("Pensión mensual (UF) (a)",
+                  [rp['pension_uf'] if afp == header['afp_origen'] else format_uf(uf)
+                   for afp, uf in zip(AFPS, pension_uf)]),
+        _fila_afp("Pensión mensual ($)", [format_pesos(p) for p in pension_pesos]),
+        _fila_afp("Comisión (%)", [f"{format_uf(COMISIONES_AFP[afp])}%" for afp in AFPS]),
+        "(a) Monto calculado con la comisión vigente.",
+        "PENSIÓN DE REFERENCIA GARANTIZADA POR LEY:",
+        "Compañía Pensión UF Pensión $",
+    ]
+    lineas += [f"{i} {cia} {uf} {format_pesos(pesos)}" for i, (cia, uf, pesos) in
+               enumerate(raw['pension_referencia'], 1)]
+
+    for rv in raw['rentas_vitalicias']:
+        lineas += _titulo_en_dos_lineas(rv['titulo'])
+        lineas.append("Compañía Pensión UF Pensión $")
+        lineas += [f"{i} {cia} {uf} {format_pesos(pesos)}" for i, (cia, uf, pesos) in enumerate(rv['ofertas'], 1)]
+        eld = rv.get('eld_info')
+        if eld:
+            lineas += _titulo_en_dos_lineas(rv['titulo'].replace("SIN RETIRO DE EXCEDENTE",
+                                                                 "CON RETIRO DE EXCEDENTE MÁXIMO"))
+            lineas.append("Compañía Pensión UF Pensión $ Excedente UF Excedente $")
+            lineas.append(f"1 {eld['compania']} {eld['pension_uf']} {format_pesos(eld['pension_pesos'])} "
+                          f"{eld['monto_uf']} {format_pesos(eld['monto_pesos'])}")
+
+    for rt in raw['renta_temporal_rv_diferida']:
+        diferido = rt['periodo_diferido_meses']
+        lineas += [
+            f"RENTA TEMPORAL CON RENTA VITALICIA DIFERIDA DE {diferido} MESES",
+            f"Factor de renta temporal: {format_uf(rt['factor_renta_temporal'])}",
+        ]
+        lineas += _titulo_en_dos_lineas(rt['titulo'])
+        lineas.append("Compañía Pensión UF Pensión $")
+        lineas += [f"{i} {cia} {uf} {format_pesos(pesos)}" for i, (cia, uf, pesos) in
+                   enumerate(rt['ofertas_rvd'], 1)]
+    return lineas
+
+
+def _pares(ofertas_beneficiarios):
+    return " ".join(f"{uf} {format_pesos(pesos)}" for uf, pesos in ofertas_beneficiarios)
+
+
+def _lineas_sobrevivencia(raw, rng):
+    header = raw['header']
+    valor_uf = header['valor_uf_float']
+    rp = raw['retiro_programado']
+    lineas = _lineas_header(header, True)
+
+    lineas.append("Información Beneficiarios")
+    lineas += [f"{b['nombre']} {b['rut']} {b['parentesco']}" for b in raw['beneficiarios']]
+
+    # Un factor por AFP aplicado a todos los beneficiarios, para que los totales cuadren
+    factores = _valores_afp(rng, header['afp_origen'], 1.0)
+
+    def por_afp(uf_str, pesos):
+        uf = float(uf_str.replace(".", "").replace(",", "."))
+        valores = []
+        for afp, factor in zip(AFPS, factores):
+            if afp == header['afp_origen']:
+                valores += [uf_str, format_pesos(pesos)]
+            else:
+                valores += [format_uf(uf * factor), format_pesos(round(uf * factor * valor_uf))]
+        return valores
+
+    lineas += ["MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO", _cabecera_afps()]
+    lineas += [_fila_afp(nombre, por_afp(uf, pesos)) for nombre, uf, pesos in rp['pensiones_beneficiarios']]
+    lineas.append(_fila_afp("Pensión mensual total", por_afp(rp['pension_total_uf'], rp['pension_total_pesos'])))
+    lineas.append(_fila_afp("Comisión (%)", [f"{format_uf(COMISIONES_AFP[afp])}%" for afp in AFPS]))
+
+    lineas.append("PENSIÓN DE REFERENCIA GARANTIZADA POR LEY:")
+    # Con ranking al inicio, así el parser no confunde compañías como "4 LIFE" con él
+    lineas += [f"{i} {ref['compania']} {_pares(ref['ofertas_beneficiarios'])}"
+               for i, ref in enumerate(raw['pension_referencia'], 1)]
+
+    cabecera = " ".join(f"BENEF. {i} UF BENEF. {i} $" for i in range(1, len(raw['beneficiarios']) + 1))
+    for rv in raw['rentas_vitalicias']:
+        lineas += _titulo_en_dos_lineas(rv['titulo'])
+        lineas.append(f"Compañía {cabecera} Pensión mensual total $")
+        lineas += [f"{i} {o['compania']} {_pares(o['ofertas_beneficiarios'])} {format_pesos(o['pension_total_pesos'])}"
+                   for i, o in enumerate(rv['ofertas'], 1)]
+    return lineas
+
+
+def scomp_text_lines(raw_data, seed=0):
+    """
+    Líneas de texto del certificado (sin anexos) para un JSON sintético.
+    """
+    rng = random.Random(seed)
+    if raw_data['beneficiarios']:
+        return _lineas_sobrevivencia(raw_data, rng)
+    return _lineas_vejez(raw_data, rng)
+
+
+def _paginar(lineas, encabezado, lineas_por_pagina):
+    # Cada página repite el código de consulta arriba, como en los certificados reales
+    cuerpo = lineas_por_pagina - 1
+    return [[encabezado] + lineas[i:i + cuerpo] for i in range(0, len(lineas), cuerpo)]
+
+
+def render_scomp_pdf(raw_data, paginas_anexo=2, lineas_por_pagina=LINEAS_POR_PAGINA, seed=0):
+    """
+    Genera los bytes de un certificado SCOMP en PDF con las ofertas de `raw_data`
+    seguidas de `paginas_anexo` páginas de glosario/texto legal (sin datos).
+    """
+    lineas = scomp_text_lines(raw_data, seed)
+    paginas = _paginar(lineas, f"Código consulta: {raw_data['header']['n_scomp']}", lineas_por_pagina)
+    anexos = (TEXTO_GLOSARIO, TEXTO_LEGAL)
+    paginas += [list(anexos[i % len(anexos)]) for i in range(paginas_anexo)]
+
+    pdf = FPDF(format="A4")
+    register_fonts(pdf)
+    pdf.set_auto_page_break(False)
+    pdf.set_margins(10, 10, 10)
+    ancho = pdf.w - pdf.l_margin - pdf.r_margin
+    for pagina in paginas:
+        pdf.add_page()
+        for linea in pagina:
+            # Las filas largas (muchos beneficiarios/AFP) se achican para no salir de la hoja
+            tamano = TAMANO_FUENTE
+            pdf.set_font(PDF_FUENTE, "", tamano)
+            while tamano > 4 and pdf.get_string_width(linea) > ancho:
+                tamano -= 0.5
+                pdf.set_font(PDF_FUENTE, "", tamano)
+            pdf.cell(0, ALTO_LINEA, linea, new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def make_scomp_pdf(tipo="vejez", n_companias=8, n_modalidades=3, n_beneficiarios=2, n_rentas_temporales=1,
+                   paginas_anexo=2, seed=0):
+    """
+    Atajo: genera el JSON sintético y su PDF. Retorna (pdf_bytes, raw_data).
+    `tipo` es "vejez" o "sobrevivencia".
+    """
+    if tipo == "sobrevivencia":
+        raw_data = make_sobrevivencia_json(n_beneficiarios, n_modalidades, n_companias, seed=seed)
+    elif tipo == "vejez":
+        raw_data = make_vejez_json(n_modalidades, n_companias, n_rentas_temporales, seed=seed)
+    else:
+        raise ValueError(f"Tipo de SCOMP desconocido: {tipo}")
+    return render_scomp_pdf(raw_data, paginas_anexo=paginas_anexo, seed=seed), raw_data
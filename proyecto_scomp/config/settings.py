@@ -1,4 +1,6 @@
 
+import os
+
 # === PROMPT UNIVERSAL ===
 PROMPT_EXTRACCION = """
 Eres un analista previsional experto en leer SCOMPs chilenos. Tu trabajo es leer el texto
@@ -104,6 +106,39 @@ FORMATO JSON DE SALIDA (EJEMPLO):
 }
 """
 
+# === Extracción por secciones (modo paralelo) ===
+# Claves de primer nivel del JSON, en el mismo orden de PROMPT_EXTRACCION.
+SECCIONES_SCOMP = (
+    "header", "beneficiarios", "pension_referencia",
+    "retiro_programado", "rentas_vitalicias", "renta_temporal_rv_diferida"
+)
+
+PROMPT_EXTRACCION_SECCION = """
+Eres un analista previsional experto en leer SCOMPs chilenos. Vas a recibir un FRAGMENTO del texto
+extraído de un SCOMP y debes devolver un objeto JSON que contenga ÚNICAMENTE estas claves: {CLAVES}.
+
+REGLAS IMPORTANTES:
+1. Responde SÓLO con el objeto JSON. NADA MÁS.
+2. Si un dato no se encuentra, usa `null` (para string) o `0` (para números).
+3. Los valores en pesos deben ser NÚMEROS (ej: 1775219), no strings.
+
+INSTRUCCIONES DE EXTRACCIÓN:
+
+{INSTRUCCIONES}
+
+TEXTO DEL SCOMP (FRAGMENTO):
+{TEXTO_PDF}
+"""
+
+# Si es True, el respaldo de IA divide el SCOMP por secciones y las consulta en paralelo.
+GEMINI_EXTRACCION_PARALELA = True
+
+# === Reducción de texto antes de la IA ===
+CHARS_POR_TOKEN = 4  # Estimación gruesa para español
+UMBRAL_LINEA_REPETIDA = 0.6  # Fracción de páginas en que debe repetirse un encabezado/pie
+# Subir al cambiar las reglas de services/page_filter.py: invalida los resultados guardados
+FILTRO_PAGINAS_VERSION = 1
+
 # === Diccionario de porcentajes ===
 PORCENTAJES_SOBREVIVENCIA = {
     "Cónyuge con hijos con derecho a pensión": 0.50,
@@ -115,3 +150,93 @@ PORCENTAJES_SOBREVIVENCIA = {
 
 # Configuración de PGU y Bonos por defecto
 DEFAULT_PGU_AMOUNT = 231732
+
+# === Extracción de texto del PDF ===
+# "pdfplumber" (layout fiel, requerido por el parser local) o "pdfium" (más rápido)
+PDF_BACKEND = os.getenv("SCOMP_PDF_BACKEND", "pdfplumber")
+PDF_EXTRACCION_WORKERS = min(4, os.cpu_count() or 1)
+PDF_MIN_PAGINAS_PARALELO = 4  # Bajo esto el costo de repartir supera la ganancia
+# Secciones tras las cuales la extracción perezosa se detiene al llegar a los anexos
+# (beneficiarios se ignora si el certificado no es de Sobrevivencia)
+PDF_SECCIONES_REQUERIDAS = ("header", "beneficiarios", "retiro_programado", "rentas_vitalicias")
+PDF_CORTE_ANTICIPADO = True  # Con el pool de procesos las páginas se piden en tandas de PDF_EXTRACCION_WORKERS
+
+# === Cache de cálculos en la app ===
+CALCULOS_CACHE_MAX_ENTRADAS = 16  # Por sesión: resultados de distintos PGU/Bono/documentos
+
+# === Cache de reportes generados (PDF/Excel) ===
+REPORTES_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# === Fuente de los reportes PDF ===
+# TTF Unicode embebida (subconjunto) en vez de la fuente core Arial (sólo latin-1)
+PDF_FUENTE = "DejaVu"
+PDF_FUENTE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "fonts")
+PDF_FUENTE_ARCHIVOS = {
+    "": os.path.join(PDF_FUENTE_DIR, "DejaVuSans.ttf"),
+    "B": os.path.join(PDF_FUENTE_DIR, "DejaVuSans-Bold.ttf"),
+}
+
+# === Métricas del pipeline ===
+# Límites de los histogramas (como los "le" de Prometheus)
+METRICAS_BUCKETS_SEGUNDOS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRICAS_BUCKETS_TAMANO = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+# Archivo que se reescribe con las métricas (.prom para Prometheus, si no JSON); vacío = no exportar
+METRICAS_EXPORT_PATH = os.getenv("SCOMP_METRICS_PATH", "")
+METRICAS_EXPORT_INTERVALO = 10  # Segundos mínimos entre escrituras del archivo
+
+# === Modelo de IA ===
+GEMINI_MODEL_NAME = "gemini-pro-latest"
+GEMINI_MAX_CONCURRENCIA = 4  # Consultas simultáneas por cliente
+GEMINI_MAX_REINTENTOS = 3  # Reintentos ante errores transitorios (429, 503, timeouts)
+GEMINI_TIMEOUT_SEGUNDOS = 300
+
+# === Consumo de tokens de la IA ===
+# Precio en USD por millón de tokens (entrada, salida); revisar contra la lista de precios vigente
+GEMINI_PRECIOS_POR_MILLON = {
+    "gemini-pro-latest": (1.25, 10.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+# Tokens (entrada + salida) sobre los que un documento se marca como caro
+GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO = int(os.getenv("SCOMP_PRESUPUESTO_TOKENS", "100000"))
+USO_LLM_DB_PATH = os.getenv("SCOMP_USAGE_PATH", os.path.join(".cache", "scomp_uso_llm.sqlite3"))
+
+# === Backend de la IA (grabación y reproducción) ===
+# "gemini": API real; "record": API real guardando cada respuesta; "replay": responde
+# desde las grabaciones sin red (pruebas de carga, concurrencia y CI)
+LLM_BACKEND = os.getenv("SCOMP_LLM_BACKEND", "gemini")
+LLM_GRABACIONES_DIR = os.getenv("SCOMP_LLM_GRABACIONES", os.path.join(".cache", "llm_grabaciones"))
+# Latencia del replay: "grabada", "fija:S", "uniforme:MIN,MAX" o "lognormal:MEDIANA,SIGMA" (segundos)
+LLM_REPLAY_LATENCIA = os.getenv("SCOMP_LLM_LATENCIA", "grabada")
+# Errores inyectados en el replay, p. ej. "503:0.05,429:0.02,timeout:0.01,json:0.01"
+LLM_REPLAY_ERRORES = os.getenv("SCOMP_LLM_ERRORES", "")
+LLM_REPLAY_SEED = int(os.getenv("SCOMP_LLM_SEED", "0"))
+
+# === Servicio HTTP (api_server.py) ===
+API_HOST = os.getenv("SCOMP_API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("SCOMP_API_PORT", "8080"))
+API_WORKERS = int(os.getenv("SCOMP_API_WORKERS", "2"))  # Documentos procesándose a la vez
+API_MAX_PENDIENTES = int(os.getenv("SCOMP_API_MAX_PENDIENTES", "20"))  # En cola antes de responder 503
+API_MAX_PDF_BYTES = 20 * 1024 * 1024
+API_TTL_TRABAJOS = 3600  # Segundos que se guardan los resultados de un trabajo terminado
+API_MAX_TERMINADOS = 100  # Trabajos terminados (con sus reportes en memoria) que se guardan como máximo
+# Si se define, cada request debe traer "Authorization: Bearer <token>"
+API_TOKEN = os.getenv("SCOMP_API_TOKEN", "")
+
+# === Análisis en segundo plano (app) ===
+APP_ANALISIS_WORKERS = int(os.getenv("SCOMP_APP_WORKERS", "4"))  # Análisis simultáneos entre todas las sesiones
+APP_ANALISIS_MAX_PENDIENTES = 50
+APP_ANALISIS_POLL_SEGUNDOS = 1.0  # Cada cuánto la página revisa el estado del análisis
+APP_USO_IA_TTL_SEGUNDOS = 60  # Cada cuánto se relee el consumo de la IA para la barra lateral
+
+# === Cache persistente de extracciones ===
+# La clave combina hash del PDF, hash de la configuración (prompts, modo paralelo,
+# versión del parser local, motor de extracción, corte anticipado y versión del
+# filtro de páginas) y nombre del modelo.
+CACHE_DB_PATH = os.getenv("SCOMP_CACHE_PATH", os.path.join(".cache", "scomp_extracciones.sqlite3"))
+CACHE_MAX_ENTRIES = 500
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_MAX_AGE_DAYS = 30
+# Subir al cambiar lo que entrega services/scomp_parser.py: invalida los resultados guardados
+PARSER_LOCAL_VERSION = 2
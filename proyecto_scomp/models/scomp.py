@@ -0,0 +1,307 @@
+"""
+Modelo tipado (con __slots__) de un SCOMP ya interpretado.
+
+ScompDocument.from_gemini_json valida el JSON de Gemini (o del parser local) una
+sola vez; desde ahí los cálculos y reportes trabajan con atributos en vez de
+cadenas de .get(). Las ofertas de cada modalidad se guardan por columnas
+(compañías, UF y pesos como arrays) en lugar de una lista de filas.
+"""
+from utils.numbers import parse_number, parse_numbers
+
+
+def _error(ruta, detalle):
+    return ValueError(f"JSON del SCOMP inválido en '{ruta}': {detalle}")
+
+
+def _dict(valor, ruta, vacio_permitido=True):
+    if valor is None and vacio_permitido:
+        return {}
+    if not isinstance(valor, dict):
+        raise _error(ruta, f"se esperaba un objeto y llegó {type(valor).__name__}")
+    return valor
+
+
+def _lista(valor, ruta):
+    if valor is None:
+        return []
+    if not isinstance(valor, list):
+        raise _error(ruta, f"se esperaba una lista y llegó {type(valor).__name__}")
+    return valor
+
+
+def _entero(valor, ruta, default=0):
+    if valor is None or valor == "":
+        return default
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise _error(ruta, f"se esperaba un número y llegó {valor!r}")
+    return int(parse_number(valor))
+
+
+def _texto(valor):
+    return "" if valor is None else str(valor)
+
+
+class SlotsMapping:
+    """
+    Acceso tipo dict (obj['clave'], obj.get(), 'clave' in obj) sobre los atributos
+    asignados, para que el código que trabajaba con dicts siga funcionando.
+    Un atributo sin asignar se comporta como una clave ausente.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, clave):
+        try:
+            return getattr(self, clave)
+        except AttributeError:
+            raise KeyError(clave) from None
+
+    def __setitem__(self, clave, valor):
+        setattr(self, clave, valor)
+
+    def __contains__(self, clave):
+        return clave in self.__slots__ and hasattr(self, clave)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, clave, default=None):
+        return getattr(self, clave, default) if clave in self.__slots__ else default
+
+    def keys(self):
+        return [clave for clave in self.__slots__ if hasattr(self, clave)]
+
+    def to_dict(self):
+        return {clave: getattr(self, clave) for clave in self.keys()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class EldInfo(SlotsMapping):
+    """Oferta de Excedente de Libre Disposición (sólo se asignan los campos presentes)."""
+    __slots__ = ('compania', 'monto_uf', 'monto_pesos', 'pension_resultante_uf', 'pension_resultante_pesos')
+
+    @classmethod
+    def from_json(cls, data, ruta):
+        if data is None:
+            return None
+        data = _dict(data, ruta, vacio_permitido=False)
+        eld = cls()
+        for clave in cls.__slots__:
+            if clave not in data:
+                continue
+            valor = data[clave]
+            if clave.endswith('_pesos') and isinstance(valor, str):
+                valor = parse_number(valor)
+            setattr(eld, clave, valor)
+        return eld
+
+
+class Beneficiary:
+    __slots__ = ('nombre', 'rut', 'parentesco')
+
+    def __init__(self, nombre, rut, parentesco):
+        self.nombre = nombre
+        self.rut = rut
+        self.parentesco = parentesco
+
+    @classmethod
+    def from_json(cls, data, ruta):
+        data = _dict(data, ruta, vacio_permitido=False)
+        if not data.get("nombre"):
+            raise _error(ruta, "beneficiario sin nombre")
+        return cls(_texto(data["nombre"]), _texto(data.get("rut")), _texto(data.get("parentesco")))
+
+    def to_dict(self):
+        return {'nombre': self.nombre, 'rut': self.rut, 'parentesco': self.parentesco}
+
+
+class ScompHeader:
+    __slots__ = ('nombre', 'rut', 'tipo_pension', 'n_scomp', 'saldo_uf', 'valor_uf_str', 'valor_uf_float', 'afp_origen')
+
+    @classmethod
+    def from_json(cls, data, ruta="header"):
+        data = _dict(data, ruta)
+        header = cls()
+        for clave in cls.__slots__:
+            setattr(header, clave, data.get(clave))
+        valor_uf = data.get("valor_uf_float")
+        if valor_uf is None and data.get("valor_uf_str"):
+            valor_uf = parse_number(data["valor_uf_str"])
+        header.valor_uf_float = float(parse_number(valor_uf)) if valor_uf is not None else 0.0
+        return header
+
+    @property
+    def es_sobrevivencia(self):
+        return "SOBREVIVENCIA" in (self.tipo_pension or "").upper()
+
+
+class Offer:
+    """Una fila de oferta; se arma a pedido desde las columnas de Modality."""
+    __slots__ = ('compania', 'pension_uf', 'pension_bruta', 'beneficiarios')
+
+    def __init__(self, compania, pension_uf, pension_bruta, beneficiarios=None):
+        self.compania = compania
+        self.pension_uf = pension_uf
+        self.pension_bruta = pension_bruta
+        self.beneficiarios = beneficiarios
+
+
+class Modality:
+    """
+    Modalidad de pensión con sus ofertas por columnas. En Vejez/Invalidez
+    `pension_bruta` es la pensión en pesos; en Sobrevivencia es el total mensual y
+    `beneficiarios` guarda, por oferta, los pares (UF, $) de cada beneficiario.
+    """
+    __slots__ = (
+        'tipo', 'titulo', 'porcentaje_aumento', 'meses_aumento', 'meses_garantizados',
+        'periodo_diferido_meses', 'factor_renta_temporal', 'eld_info',
+        'companias', 'pension_uf', 'pension_bruta', 'beneficiarios',
+    )
+
+    @classmethod
+    def from_json(cls, data, ruta, tipo, clave_ofertas="ofertas"):
+        data = _dict(data, ruta, vacio_permitido=False)
+        m = cls()
+        m.tipo = tipo
+        m.titulo = _texto(data.get("titulo"))
+        m.porcentaje_aumento = _entero(data.get("porcentaje_aumento"), f"{ruta}.porcentaje_aumento")
+        m.meses_aumento = _entero(data.get("meses_aumento"), f"{ruta}.meses_aumento")
+        m.meses_garantizados = _entero(data.get("meses_garantizados"), f"{ruta}.meses_garantizados")
+        m.periodo_diferido_meses = _entero(data.get("periodo_diferido_meses"), f"{ruta}.periodo_diferido_meses")
+        factor = data.get("factor_renta_temporal")
+        m.factor_renta_temporal = 1.0 if factor is None else parse_number(factor)
+        m.eld_info = EldInfo.from_json(data.get("eld_info"), f"{ruta}.eld_info")
+        m._set_ofertas(_lista(data.get(clave_ofertas), f"{ruta}.{clave_ofertas}"), f"{ruta}.{clave_ofertas}")
+        return m
+
+    @classmethod
+    def from_rows(cls, filas, ruta, tipo):
+        """Modalidad sin atributos propios (p. ej. Pensión de Referencia)."""
+        m = cls()
+        m.tipo = tipo
+        m.titulo = ""
+        m.porcentaje_aumento = m.meses_aumento = m.meses_garantizados = m.periodo_diferido_meses = 0
+        m.factor_renta_temporal = 1.0
+        m.eld_info = None
+        m._set_ofertas(_lista(filas, ruta), ruta)
+        return m
+
+    def _set_ofertas(self, ofertas, ruta):
+        if ofertas and isinstance(ofertas[0], dict):
+            # Formato Sobrevivencia
+            companias, totales, beneficiarios = [], [], []
+            for i, oferta in enumerate(ofertas):
+                oferta = _dict(oferta, f"{ruta}[{i}]", vacio_permitido=False)
+                pares = _lista(oferta.get("ofertas_beneficiarios"), f"{ruta}[{i}].ofertas_beneficiarios")
+                if any(not isinstance(p, list) or len(p) < 2 for p in pares):
+                    raise _error(f"{ruta}[{i}].ofertas_beneficiarios", "se esperaban pares [UF, $]")
+                companias.append(_texto(oferta.get("compania")))
+                totales.append(oferta.get("pension_total_pesos", 0))
+                beneficiarios.append(tuple((p[0], parse_number(p[1])) for p in pares))
+            self.companias = tuple(companias)
+            self.pension_uf = ("",) * len(companias)
+            self.pension_bruta = parse_numbers(totales)
+            self.beneficiarios = tuple(beneficiarios)
+            return
+
+        for i, fila in enumerate(ofertas):
+            if not isinstance(fila, list) or len(fila) < 3:
+                raise _error(f"{ruta}[{i}]", "se esperaba [compañía, pensión UF, pensión $]")
+        self.companias = tuple(_texto(f[0]) for f in ofertas)
+        self.pension_uf = tuple(f[1] for f in ofertas)
+        self.pension_bruta = parse_numbers([f[2] for f in ofertas])
+        self.beneficiarios = None
+
+    @property
+    def es_sobrevivencia(self):
+        return self.beneficiarios is not None
+
+    def __len__(self):
+        return len(self.companias)
+
+    def offers(self):
+        for i, compania in enumerate(self.companias):
+            beneficiarios = self.beneficiarios[i] if self.beneficiarios is not None else None
+            yield Offer(compania, self.pension_uf[i], float(self.pension_bruta[i]), beneficiarios)
+
+
+class RetiroProgramado:
+    """
+    Retiro Programado de la AFP de origen. En Sobrevivencia `beneficiarios`
+    guarda (nombre, UF, $) por beneficiario.
+    """
+    __slots__ = (
+        'comision_pct', 'pension_uf', 'pension_bruta', 'eld_oferta',
+        'pension_total_uf', 'pension_total_pesos', 'beneficiarios',
+    )
+
+    @classmethod
+    def from_json(cls, data, ruta="retiro_programado"):
+        data = _dict(data, ruta)
+        if not data:
+            return None
+        rp = cls()
+        rp.comision_pct = parse_number(data.get("comision_pct") or 0)
+        rp.pension_uf = data.get("pension_uf", "0,00")
+        rp.pension_bruta = None if data.get("pension_bruta") is None else parse_number(data["pension_bruta"])
+        rp.eld_oferta = EldInfo.from_json(data.get("eld_oferta"), f"{ruta}.eld_oferta")
+        rp.pension_total_uf = data.get("pension_total_uf", 0)
+        rp.pension_total_pesos = data.get("pension_total_pesos")
+        if "pensiones_beneficiarios" in data:
+            filas = _lista(data["pensiones_beneficiarios"], f"{ruta}.pensiones_beneficiarios")
+            for i, fila in enumerate(filas):
+                if not isinstance(fila, list) or len(fila) < 3:
+                    raise _error(f"{ruta}.pensiones_beneficiarios[{i}]", "se esperaba [nombre, UF, $]")
+            rp.beneficiarios = tuple((_texto(f[0]), parse_number(f[1]), parse_number(f[2])) for f in filas)
+        else:
+            rp.beneficiarios = None
+        return rp
+
+
+class ScompDocument:
+    __slots__ = ('header', 'beneficiarios', 'retiro_programado', 'pension_referencia',
+                 'rentas_vitalicias', 'rentas_temporales')
+
+    @classmethod
+    def from_gemini_json(cls, data):
+        """
+        Construye y valida el modelo desde el JSON de extracción. Lanza ValueError
+        indicando la ruta del primer dato con forma inesperada.
+        """
+        data = _dict(data, "$", vacio_permitido=False)
+        doc = cls()
+        doc.header = ScompHeader.from_json(data.get("header"))
+        doc.beneficiarios = tuple(
+            Beneficiary.from_json(b, f"beneficiarios[{i}]")
+            for i, b in enumerate(_lista(data.get("beneficiarios"), "beneficiarios"))
+        )
+        doc.retiro_programado = RetiroProgramado.from_json(data.get("retiro_programado"))
+
+        ref = _lista(data.get("pension_referencia"), "pension_referencia")
+        doc.pension_referencia = Modality.from_rows(ref, "pension_referencia", 'REF') if ref else None
+
+        doc.rentas_vitalicias = tuple(
+            Modality.from_json(m, f"rentas_vitalicias[{i}]", 'RV')
+            for i, m in enumerate(_lista(data.get("rentas_vitalicias"), "rentas_vitalicias"))
+        )
+        doc.rentas_temporales = tuple(
+            Modality.from_json(m, f"renta_temporal_rv_diferida[{i}]", 'RT_RVD', clave_ofertas="ofertas_rvd")
+            for i, m in enumerate(_lista(data.get("renta_temporal_rv_diferida"), "renta_temporal_rv_diferida"))
+        )
+        return doc
+
+
+class ProcessedTable(SlotsMapping):
+    """
+    Tabla lista para mostrar/exportar. Se usa igual que el dict de antes
+    (item['titulo'], item.get('eld_info'), 'linked_to_title' in item).
+    """
+    __slots__ = (
+        'titulo', 'tipo', 'tabla', 'eld_info', 'linked_to_title', 'col_title_display', 'col_title_pdf',
+        'porcentaje_aumento', 'meses_aumento', 'meses_garantizados', 'periodo_diferido_meses', 'sort_key',
+    )
+
+    def __init__(self, **campos):
+        for clave, valor in campos.items():
+            setattr(self, clave, valor)
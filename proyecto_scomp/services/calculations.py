@@ -1,401 +1,351 @@
+import numpy as np
 import pandas as pd
 from utils.helpers import clean_number
+from utils.numbers import parse_numbers, format_numbers
+from models.scomp import ScompDocument, Modality, ProcessedTable
 from config.settings import PORCENTAJES_SOBREVIVENCIA
 
-def process_data_vejez(raw_data, header_data, include_pgu=True, pgu_amount=0, include_bono=True, bono_uf=0):
+# Columnas de salida (en orden) según el tipo de tabla de Vejez/Invalidez
+COL_PENSION_BONO = "Pensión + Bono"
+COLUMNAS_VEJEZ = {
+    'RP': ['Modalidad', 'Pension_UF', 'Pension_Bruta', 'Comision_Pct', 'Descuento_Salud_7%',
+           'Descuento_Comision', 'Pension_Liquida', COL_PENSION_BONO],
+    'RT': ['Compania', 'Pension_UF', 'Pension_Bruta', 'Descuento_Salud_7%', 'Comision_Pct',
+           'Descuento_Comision', 'Pension_Liquida', COL_PENSION_BONO],
+}
+COLUMNAS_VEJEZ_DEFAULT = ['Compania', 'Pension_UF', 'Pension_Bruta', 'Descuento_Salud_7%',
+                          'Pension_Liquida', COL_PENSION_BONO]
+
+# Tipos de modalidad donde sólo se muestran las 4 mejores ofertas
+TIPOS_TOP_4 = ('RV', 'REF', 'RT_RVD')
+
+
+def _titulo_rv(modalidad):
+    # === LÓGICA DE TÍTULO RESUMIDO ===
+    parts = ["Renta Vitalicia Inmediata"]
+    if modalidad.porcentaje_aumento > 0 and modalidad.meses_aumento > 0:
+        parts.append(f"Aumento {modalidad.porcentaje_aumento}% {modalidad.meses_aumento}m")
+    if modalidad.meses_garantizados > 0:
+        parts.append(f"Garantizado {modalidad.meses_garantizados}m")
+    if len(parts) == 1:
+        parts.append("Simple")
+    return " / ".join(parts)
+
+
+def _titulo_rt(modalidad):
+    parts = ["Renta Temporal", "RVD"]
+    if modalidad.meses_garantizados > 0:
+        parts.append(f"Garantizado {modalidad.meses_garantizados}m")
+    else:
+        parts.append("Simple")
+    if modalidad.periodo_diferido_meses > 0:
+        parts.append(f"({modalidad.periodo_diferido_meses}m)")
+    return " / ".join(parts)
+
+
+def as_scomp_document(raw_data):
     """
-    Procesa los datos para SCOMP de Vejez/Invalidez.
-    Retorna una lista de tablas procesadas.
+    Acepta el JSON de extracción o un ScompDocument ya construido.
+    """
+    if isinstance(raw_data, ScompDocument):
+        return raw_data
+    return ScompDocument.from_gemini_json(raw_data)
+
+
+def _modalidades_vejez(scomp, header_data):
+    """
+    Retorna [(modalidad, titulo)] con las modalidades de Vejez/Invalidez que tienen
+    ofertas, en el orden del documento. El Retiro Programado se representa como
+    una modalidad de una fila (la AFP de origen).
     """
-    tables_data = []
-    
-    # Adaptar Retiro Programado
-    rp = raw_data.get("retiro_programado", {})
-    if rp and rp.get("pension_bruta") is not None:
+    modalidades = []
+
+    rp = scomp.retiro_programado
+    if rp and rp.pension_bruta is not None:
         afp_origen = header_data.get('afp_origen', 'AFP No Encontrada')
-        
-        rp_df_final = pd.DataFrame({
-            'Modalidad': [afp_origen],
-            'Pension_UF': [rp.get("pension_uf", "0,00")],
-            'Pension_Bruta': [clean_number(rp.get("pension_bruta", 0))], 
-            'Comision_Pct': [rp.get("comision_pct", 0) / 100.0] 
-        })
-        rp_titulo = f"Retiro Programado ({afp_origen})"
-        rp_eld_offer = rp.get("eld_oferta") 
-        tables_data.append({
-            'titulo': rp_titulo, 
-            'tipo': 'RP', 
-            'tabla': rp_df_final,
-            'eld_info': rp_eld_offer 
-        })
+        m_rp = Modality.from_rows([[afp_origen, rp.pension_uf, rp.pension_bruta]], "retiro_programado", 'RP')
+        m_rp.eld_info = rp.eld_oferta
+        modalidades.append((m_rp, f"Retiro Programado ({afp_origen})"))
 
-    # Adaptar Pensión de Referencia
-    ref_list = raw_data.get("pension_referencia", [])
-    if ref_list and isinstance(ref_list[0], list): 
-        df_ref = pd.DataFrame(ref_list, columns=['Compania', 'Pension_UF', 'Pension_Bruta_str']) 
-        if not df_ref.empty:
-            df_ref['Pension_Bruta'] = df_ref['Pension_Bruta_str'].apply(clean_number)
-            df_ref = df_ref.drop(columns=['Pension_Bruta_str'])
-            tables_data.append({
-                'titulo': "Pensión de Referencia (Garantizada por Ley)", 
-                'tipo': 'REF', 
-                'tabla': df_ref,
-                'eld_info': None
-            })
-
-    # Adaptar Rentas Vitalicias
-    rv_list = raw_data.get("rentas_vitalicias", [])
-    for modalidad in rv_list:
-        ofertas = modalidad.get("ofertas", [])
-        if ofertas and isinstance(ofertas[0], list):
-            df = pd.DataFrame(ofertas, columns=['Compania', 'Pension_UF', 'Pension_Bruta_str'])
-            if not df.empty:
-                df['Pension_Bruta'] = df['Pension_Bruta_str'].apply(clean_number)
-                df = df.drop(columns=['Pension_Bruta_str'])
-                
-                # === LÓGICA DE TÍTULO RESUMIDO ===
-                base_title = "Renta Vitalicia Inmediata"
-                parts = [base_title]
-                aumento_pct = modalidad.get("porcentaje_aumento", 0)
-                aumento_meses = modalidad.get("meses_aumento", 0)
-                garant_meses = modalidad.get("meses_garantizados", 0)
-
-                if aumento_pct > 0 and aumento_meses > 0:
-                    parts.append(f"Aumento {aumento_pct}% {aumento_meses}m")
-                if garant_meses > 0:
-                    parts.append(f"Garantizado {garant_meses}m")
-                if len(parts) == 1:
-                    parts.append("Simple")
-                
-                new_title = " / ".join(parts)
-                # === FIN LÓGICA TÍTULO ===
-
-                tables_data.append({
-                    'titulo': new_title, 
-                    'tipo': 'RV', 
-                    'tabla': df,
-                    'porcentaje_aumento': aumento_pct,
-                    'meses_aumento': aumento_meses,
-                    'meses_garantizados': garant_meses,
-                    'eld_info': modalidad.get("eld_info") 
-                })
-    
-    # Adaptar Renta Temporal / RVD
-    rtrvd_list = raw_data.get("renta_temporal_rv_diferida", [])
-    for modalidad in rtrvd_list:
-        ofertas_rvd = modalidad.get("ofertas_rvd", [])
-        if ofertas_rvd and isinstance(ofertas_rvd[0], list):
-            df = pd.DataFrame(ofertas_rvd, columns=['Compania', 'Pension_UF', 'Pension_Bruta_str'])
-            if not df.empty:
-                df['Pension_Bruta'] = df['Pension_Bruta_str'].apply(clean_number)
-                df = df.drop(columns=['Pension_Bruta_str'])
-                
-                # === LÓGICA DE TÍTULO RESUMIDO ===
-                base_title = "Renta Temporal"
-                parts = [base_title]
-                diferido_meses = modalidad.get("periodo_diferido_meses", 0)
-                garant_meses = modalidad.get("meses_garantizados", 0)
-
-                parts.append("RVD") 
-                
-                if garant_meses > 0:
-                    parts.append(f"Garantizado {garant_meses}m")
-                else:
-                    parts.append("Simple")
-                
-                if diferido_meses > 0:
-                    parts.append(f"({diferido_meses}m)")
-                
-                new_title = " / ".join(parts)
-                # === FIN LÓGICA TÍTULO ===
-                
-                tables_data.append({
-                    'titulo': new_title,
-                    'tipo': 'RT_RVD',
-                    'tabla': df,
-                    'periodo_diferido_meses': diferido_meses,
-                    'factor_renta_temporal': modalidad.get("factor_renta_temporal", 1.0),
-                    'meses_garantizados': garant_meses,
-                    'eld_info': modalidad.get("eld_info") 
-                })
-
-    # --- INICIO LÓGICA DE PROCESAMIENTO (VEJEZ) ---
-    valor_pgu = pgu_amount if include_pgu else 0
-    valor_bono = (bono_uf * header_data.get('valor_uf_float', 0)) if include_bono else 0
-    
+    ref = scomp.pension_referencia
+    if ref is not None and len(ref) and not ref.es_sobrevivencia:
+        modalidades.append((ref, "Pensión de Referencia (Garantizada por Ley)"))
+
+    for m in scomp.rentas_vitalicias:
+        if len(m) and not m.es_sobrevivencia:
+            modalidades.append((m, _titulo_rv(m)))
+
+    for m in scomp.rentas_temporales:
+        if len(m) and not m.es_sobrevivencia:
+            modalidades.append((m, _titulo_rt(m)))
+
+    return modalidades
+
+
+def _vistas_vejez(modalidades, header_data, col_title, col_title_pdf):
+    """
+    Define las tablas de salida de cada modalidad, en el orden en que se muestran.
+    Cada vista indica su factor sobre la pensión (None = montos originales), si
+    descuenta comisión AFP y los atributos de la ProcessedTable resultante.
+    """
+    vistas = []
+    afp_origen = header_data.get('afp_origen', 'AFP')
+    comunes = {'col_title_display': col_title, 'col_title_pdf': col_title_pdf}
+    for grupo, (m, titulo) in enumerate(modalidades):
+        if m.tipo == 'RT_RVD':
+            meses = m.periodo_diferido_meses
+            titulo_temporal = f"{titulo} - Renta Temporal (Mes 1-{meses}) / {afp_origen}"
+            detalle = {'periodo_diferido_meses': meses, 'meses_garantizados': m.meses_garantizados}
+            vistas.append((grupo, m.factor_renta_temporal, True, {
+                'titulo': titulo_temporal, 'tipo': 'RT', **comunes, **detalle, 'eld_info': m.eld_info,
+            }))
+            vistas.append((grupo, None, False, {
+                'titulo': f"{titulo} - Renta Vitalicia Diferida (desde mes {meses + 1})", 'tipo': 'RVD',
+                **comunes, **detalle, 'eld_info': None, 'linked_to_title': titulo_temporal,
+            }))
+
+        elif m.tipo == 'RV' and m.porcentaje_aumento > 0:
+            detalle = {'meses_aumento': m.meses_aumento, 'meses_garantizados': m.meses_garantizados}
+            vistas.append((grupo, 1 + m.porcentaje_aumento / 100.0, False, {
+                'titulo': titulo, 'tipo': 'RV_Aumentada', **comunes, **detalle, 'eld_info': m.eld_info,
+            }))
+            vistas.append((grupo, None, False, {
+                'titulo': f"Pensión Base (desde mes {m.meses_aumento + 1})", 'tipo': 'RV_Base',
+                **comunes, **detalle, 'eld_info': None, 'linked_to_title': titulo,
+            }))
+
+        else:
+            vistas.append((grupo, None, m.tipo == 'RP', {
+                'titulo': titulo, 'tipo': m.tipo, **comunes,
+                'meses_garantizados': m.meses_garantizados, 'eld_info': m.eld_info,
+            }))
+    return vistas
+
+
+def _col_title(include_pgu, include_bono):
     col_title_parts = ["Pensión"]
     if include_pgu: col_title_parts.append("PGU")
     if include_bono: col_title_parts.append("Bono")
-    col_title = " + ".join(col_title_parts)
-    col_title_pdf = "Pensión + Bono" 
+    return " + ".join(col_title_parts)
 
-    afp_commission_pct = 0.0
-    rp_item = next((item for item in tables_data if item.get('tipo') == 'RP'), None)
-    if rp_item and not rp_item['tabla'].empty:
-        if 'Comision_Pct' in rp_item['tabla'].columns:
-            afp_commission_pct = rp_item['tabla']['Comision_Pct'].iloc[0]
 
-    processed_tables = []
-    
-    for item in tables_data:
-        df = item['tabla'].copy()
-        
-        if df.empty or 'Pension_Bruta' not in df.columns:
-            continue
-            
-        if item['tipo'] == 'RV' or item['tipo'] == 'REF' or item['tipo'] == 'RT_RVD':
-             df = df.sort_values(by="Pension_Bruta", ascending=False).head(4)
-        
-        porcentaje_aumento = item.get('porcentaje_aumento', 0)
-        
-        if item['tipo'] == 'RT_RVD':
-            meses = item.get('periodo_diferido_meses', 0)
-            factor = item.get('factor_renta_temporal', 1.0)
-            
-            df_base = df.copy()
-            df_base["Descuento_Salud_7%"] = (df_base["Pension_Bruta"] * 0.07).round(0)
-            df_base["Pension_Liquida"] = df_base["Pension_Bruta"] - df_base["Descuento_Salud_7%"]
-            df_base[col_title_pdf] = (df_base["Pension_Bruta"] + valor_pgu + valor_bono).round(0)
-
-            df_temporal = df.copy()
-            df_temporal['Pension_UF_float'] = df_temporal['Pension_UF'].apply(clean_number)
-            df_temporal["Pension_Bruta"] = (df_temporal["Pension_Bruta"] * factor).round(0)
-            df_temporal["Pension_UF"] = (df_temporal["Pension_UF_float"] * factor).apply(lambda x: f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-            df_temporal["Descuento_Salud_7%"] = (df_temporal["Pension_Bruta"] * 0.07).round(0)
-            df_temporal["Comision_Pct"] = afp_commission_pct
-            df_temporal["Descuento_Comision"] = (df_temporal["Pension_Bruta"] * df_temporal["Comision_Pct"]).round(0)
-            df_temporal["Pension_Liquida"] = df_temporal["Pension_Bruta"] - df_temporal["Descuento_Salud_7%"] - df_temporal["Descuento_Comision"]
-            df_temporal[col_title_pdf] = (df_temporal["Pension_Bruta"] + valor_pgu + valor_bono).round(0)
-            
-            afp_origen = header_data.get('afp_origen', 'AFP')
-            titulo_temporal = f"{item['titulo']} - Renta Temporal (Mes 1-{meses}) / {afp_origen}"
-            titulo_base = f"{item['titulo']} - Renta Vitalicia Diferida (desde mes {meses + 1})"
-            
-            processed_tables.append({
-                'titulo': titulo_temporal, 
-                'tipo': 'RT', 
-                'tabla': df_temporal.drop(columns=['Pension_UF_float']),
-                'col_title_display': col_title,
-                'col_title_pdf': col_title_pdf,
-                'periodo_diferido_meses': meses,
-                'meses_garantizados': item.get('meses_garantizados', 0),
-                'eld_info': item.get('eld_info')
-            })
-
-            processed_tables.append({
-                'titulo': titulo_base, 
-                'tipo': 'RVD', 
-                'tabla': df_base, 
-                'col_title_display': col_title,
-                'col_title_pdf': col_title_pdf,
-                'periodo_diferido_meses': meses,
-                'meses_garantizados': item.get('meses_garantizados', 0),
-                'eld_info': None,
-                'linked_to_title': titulo_temporal
-            })
-
-        elif item['tipo'] == 'RV' and porcentaje_aumento > 0:
-            df_base = df.copy()
-            df_base["Descuento_Salud_7%"] = (df_base["Pension_Bruta"] * 0.07).round(0)
-            df_base["Pension_Liquida"] = df_base["Pension_Bruta"] - df_base["Descuento_Salud_7%"]
-            df_base[col_title_pdf] = (df_base["Pension_Bruta"] + valor_pgu + valor_bono).round(0)
-            
-            df_aumentada = df.copy()
-            factor_aumento = (1 + porcentaje_aumento / 100.0)
-            df_aumentada['Pension_UF_float'] = df_aumentada['Pension_UF'].apply(clean_number)
-            df_aumentada["Pension_Bruta"] = (df_aumentada["Pension_Bruta"] * factor_aumento).round(0)
-            df_aumentada["Pension_UF"] = (df_aumentada["Pension_UF_float"] * factor_aumento).apply(lambda x: f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-            df_aumentada["Descuento_Salud_7%"] = (df_aumentada["Pension_Bruta"] * 0.07).round(0)
-            df_aumentada["Pension_Liquida"] = df_aumentada["Pension_Bruta"] - df_aumentada["Descuento_Salud_7%"]
-            df_aumentada[col_title_pdf] = (df_aumentada["Pension_Bruta"] + valor_pgu + valor_bono).round(0)
-
-            processed_tables.append({
-                'titulo': item['titulo'], 
-                'tipo': 'RV_Aumentada', 
-                'tabla': df_aumentada.drop(columns=['Pension_UF_float']),
-                'col_title_display': col_title,
-                'col_title_pdf': col_title_pdf,
-                'meses_aumento': item.get('meses_aumento', 0),
-                'meses_garantizados': item.get('meses_garantizados', 0),
-                'eld_info': item.get('eld_info') 
-            })
-            
-            meses_aumento = item.get('meses_aumento', 0)
-            titulo_base = f"Pensión Base (desde mes {meses_aumento + 1})"
-            
-            processed_tables.append({
-                'titulo': titulo_base, 
-                'tipo': 'RV_Base', 
-                'tabla': df_base, 
-                'col_title_display': col_title,
-                'col_title_pdf': col_title_pdf,
-                'meses_aumento': item.get('meses_aumento', 0),
-                'meses_garantizados': item.get('meses_garantizados', 0),
-                'eld_info': None,
-                'linked_to_title': item['titulo'] 
-            })
+def build_tables_vejez(raw_data, header_data):
+    """
+    Parte de los cálculos de Vejez/Invalidez que no depende de PGU ni Bono.
+    Todas las ofertas se calculan juntas en una sola tabla larga (una fila por
+    oferta y vista) y al final se separan en las tablas que esperan la UI y los reportes.
+    Las tablas aún no tienen la columna "Pensión + Bono" (ver apply_pension_bono).
+    """
+    scomp = as_scomp_document(raw_data)
+    modalidades = _modalidades_vejez(scomp, header_data)
+    if not modalidades:
+        return []
 
-        else:
-            df["Descuento_Salud_7%"] = (df["Pension_Bruta"] * 0.07).round(0)
-            
-            if item['tipo'] == 'RP':
-                df["Comision_Pct"] = afp_commission_pct
-                df["Descuento_Comision"] = (df["Pension_Bruta"] * df["Comision_Pct"]).round(0)
-                df["Pension_Liquida"] = df["Pension_Bruta"] - df["Descuento_Salud_7%"] - df["Descuento_Comision"]
-            else: 
-                df["Pension_Liquida"] = df["Pension_Bruta"] - df["Descuento_Salud_7%"]
-
-
-            df[col_title_pdf] = (df["Pension_Bruta"] + valor_pgu + valor_bono).round(0)
-            
-            processed_tables.append({
-                'titulo': item['titulo'], 
-                'tipo': item['tipo'], 
-                'tabla': df, 
-                'col_title_display': col_title,
-                'col_title_pdf': col_title_pdf,
-                'meses_garantizados': item.get('meses_garantizados', 0), 
-                'eld_info': item.get('eld_info') 
-            })
+    col_title = _col_title(True, True)
+    col_title_pdf = COL_PENSION_BONO
+
+    rp = scomp.retiro_programado
+    afp_commission_pct = rp.comision_pct / 100.0 if rp and rp.pension_bruta is not None else 0.0
+
+    # --- 1. Ofertas en formato largo (top 4 en RV, REF y RT/RVD) ---
+    # Las columnas de cada modalidad ya vienen como arrays: sólo se concatenan
+    largos = [len(m) for m, _ in modalidades]
+    ofertas = pd.DataFrame({
+        'grupo': np.repeat(np.arange(len(modalidades)), largos),
+        'Compania': [c for m, _ in modalidades for c in m.companias],
+        'Pension_UF': [uf for m, _ in modalidades for uf in m.pension_uf],
+        'Pension_Bruta': np.concatenate([m.pension_bruta for m, _ in modalidades]),
+        'fila': np.concatenate([np.arange(n) for n in largos]),
+    })
+    tipos = np.array([m.tipo for m, _ in modalidades])
+    top = np.isin(tipos, TIPOS_TOP_4)[ofertas['grupo'].to_numpy()]
+    ordenadas = ofertas[top].sort_values(['grupo', 'Pension_Bruta'], ascending=[True, False], kind='stable')
+    ofertas = pd.concat([ofertas[~top], ordenadas.groupby('grupo').head(4)])
+
+    # --- 2. Una fila por oferta y vista ---
+    vistas = _vistas_vejez(modalidades, header_data, col_title, col_title_pdf)
+    ids = pd.DataFrame({
+        'grupo': [v[0] for v in vistas],
+        'factor': [v[1] for v in vistas],
+        'con_comision': [v[2] for v in vistas],
+        'vista': range(len(vistas)),
+    })
+    largo = ids.merge(ofertas, on='grupo', how='inner', sort=False).sort_values(['vista'], kind='stable')
+
+    # --- 3. Columnas derivadas en una sola pasada ---
+    escalada = largo['factor'].notna().to_numpy()
+    factor = largo['factor'].fillna(1.0).to_numpy(dtype='float64')
+    bruta = largo['Pension_Bruta'].to_numpy(dtype='float64')
+    bruta = np.where(escalada, np.round(bruta * factor), bruta)
+    largo['Pension_Bruta'] = bruta
+    if escalada.any():
+        uf = largo.loc[escalada, 'Pension_UF']
+        largo.loc[escalada, 'Pension_UF'] = format_numbers(parse_numbers(uf) * factor[escalada])
+
+    con_comision = largo['con_comision'].to_numpy(dtype=bool)
+    salud = np.round(bruta * 0.07)
+    comision = np.where(con_comision, np.round(bruta * afp_commission_pct), 0.0)
+    largo['Descuento_Salud_7%'] = salud
+    largo['Comision_Pct'] = afp_commission_pct
+    largo['Descuento_Comision'] = comision
+    largo['Pension_Liquida'] = bruta - salud - comision
+
+    # --- 4. Separar en las tablas de cada vista ---
+    processed_tables = []
+    for (vista, tabla) in largo.groupby('vista', sort=True):
+        meta = vistas[vista][3]
+        columnas = COLUMNAS_VEJEZ.get(meta['tipo'], COLUMNAS_VEJEZ_DEFAULT)[:-1]
+        tabla = tabla.rename(columns={'Compania': 'Modalidad'}) if meta['tipo'] == 'RP' else tabla
+        processed_tables.append(ProcessedTable(tabla=tabla.set_index('fila', drop=True)[columnas].rename_axis(None), **meta))
 
     return processed_tables
 
+
+def apply_pension_bono(processed_tables, header_data, include_pgu=True, pgu_amount=0, include_bono=True, bono_uf=0):
+    """
+    Agrega (o recalcula) la columna "Pensión + Bono" según los parámetros de PGU/Bono.
+    No modifica las tablas recibidas: retorna copias, así las tablas base pueden
+    quedar en cache y reutilizarse cuando sólo cambian estos parámetros.
+    """
+    valor_pgu = pgu_amount if include_pgu else 0
+    valor_bono = (bono_uf * header_data.get('valor_uf_float', 0)) if include_bono else 0
+    col_title = _col_title(include_pgu, include_bono)
+
+    resultado = []
+    for item in processed_tables:
+        nueva = ProcessedTable(**item.to_dict())
+        bruta = item['tabla']['Pension_Bruta'].to_numpy(dtype='float64')
+        nueva.tabla = item['tabla'].assign(**{COL_PENSION_BONO: np.round(bruta + valor_pgu + valor_bono)})
+        nueva.col_title_display = col_title
+        resultado.append(nueva)
+    return resultado
+
+
+def process_data_vejez(raw_data, header_data, include_pgu=True, pgu_amount=0, include_bono=True, bono_uf=0):
+    """
+    Procesa los datos para SCOMP de Vejez/Invalidez.
+    Retorna una lista de tablas procesadas.
+    """
+    processed_tables = build_tables_vejez(raw_data, header_data)
+    return apply_pension_bono(processed_tables, header_data, include_pgu, pgu_amount, include_bono, bono_uf)
+
 def process_data_sobrevivencia(raw_data, header_data):
     """
     Procesa los datos para SCOMP de Sobrevivencia.
     Retorna (processed_tables, beneficiarios_ordenados, warnings).
     """
+    scomp = as_scomp_document(raw_data)
     processed_tables = []
     warnings = []
-    
-    beneficiarios_raw = raw_data.get("beneficiarios", [])
-    if not beneficiarios_raw:
+
+    if not scomp.beneficiarios:
         warnings.append("No se encontraron beneficiarios en el SCOMP.")
         return [], [], warnings
 
     # --- 1. Ordenar beneficiarios ---
     beneficiarios_ordenados = []
     benef_hijos = []
-    
-    for b in beneficiarios_raw:
-        parentesco = b.get("parentesco", "").lower()
+
+    for b in scomp.beneficiarios:
+        parentesco = b.parentesco.lower()
         if "cónyuge" in parentesco or "conviviente" in parentesco or "madre" in parentesco or "padre" in parentesco:
-            beneficiarios_ordenados.append(b) 
+            beneficiarios_ordenados.append(b.to_dict())
         else:
-            benef_hijos.append(b) 
-    
-    beneficiarios_ordenados.extend(benef_hijos) 
-    header_data["beneficiarios_ordenados"] = beneficiarios_ordenados 
-    
+            benef_hijos.append(b.to_dict())
+
+    beneficiarios_ordenados.extend(benef_hijos)
+    header_data["beneficiarios_ordenados"] = beneficiarios_ordenados
+
     # --- 2. Calcular Pensión Base 100% ---
     pension_base_100_uf = 0.0
-    rp_data = raw_data.get("retiro_programado", {})
-    afp_commission_pct = rp_data.get("comision_pct", 0) / 100.0
-    
-    if rp_data and "pensiones_beneficiarios" in rp_data:
-        for benef_rp in rp_data["pensiones_beneficiarios"]:
-            nombre_rp = benef_rp[0]
-            uf_rp = clean_number(benef_rp[1])
+    rp = scomp.retiro_programado
+    afp_commission_pct = rp.comision_pct / 100.0 if rp else 0.0
+    pensiones_rp = rp.beneficiarios if rp and rp.beneficiarios is not None else None
+
+    if pensiones_rp is not None:
+        for nombre_rp, uf_rp, _ in pensiones_rp:
             parentesco = ""
             for b in beneficiarios_ordenados:
                 if nombre_rp.strip().upper() in b["nombre"].strip().upper():
                     parentesco = b["parentesco"]
                     break
-            
+
             porcentaje = PORCENTAJES_SOBREVIVENCIA.get(parentesco, 0)
             if porcentaje > 0:
                 pension_base_100_uf = uf_rp / porcentaje
                 header_data["Pension_Base_100_UF"] = pension_base_100_uf
                 break
-    
+
     if pension_base_100_uf == 0:
         warnings.append("No se pudo calcular la Pensión Base 100% desde Retiro Programado.")
 
     # --- 3. Procesar Tabla de Retiro Programado ---
-    if rp_data and "pensiones_beneficiarios" in rp_data:
-        rp_rows = []
-        for benef_rp in rp_data["pensiones_beneficiarios"]:
-            nombre = benef_rp[0]
-            uf = clean_number(benef_rp[1])
-            bruta = clean_number(benef_rp[2])
-            
-            salud = round(bruta * 0.07)
-            comision = round(bruta * afp_commission_pct)
-            
-            liquida = bruta - salud - comision
-            rp_rows.append([nombre, f"{uf:,.2f}", bruta, salud, comision, liquida])
-
-        df_rp = pd.DataFrame(rp_rows, columns=["Beneficiario", "Pension_UF", "Pension_Bruta", "Dscto_Salud_7%", "Dscto_Comision", "Pension_Liquida"])
-        
-        total_bruto = df_rp["Pension_Bruta"].sum()
-        total_salud = df_rp["Dscto_Salud_7%"].sum()
-        total_comision = df_rp["Dscto_Comision"].sum()
-        total_liquido = df_rp["Pension_Liquida"].sum()
-        total_uf = clean_number(rp_data.get("pension_total_uf", 0))
-        
-        df_rp.loc['Total'] = ["Pensión mensual total", f"{total_uf:,.2f}", total_bruto, total_salud, total_comision, total_liquido]
-        
-        processed_tables.append({
-            'titulo': f"Retiro Programado ({header_data.get('afp_origen', 'AFP')})",
-            'tipo': 'RP_SOBREVIVENCIA',
-            'tabla': df_rp,
-            'meses_garantizados': 0
+    if pensiones_rp is not None:
+        uf = np.array([p[1] for p in pensiones_rp], dtype='float64')
+        bruta = np.array([p[2] for p in pensiones_rp], dtype='float64')
+        salud = np.round(bruta * 0.07).astype('int64')
+        comision = np.round(bruta * afp_commission_pct).astype('int64')
+
+        df_rp = pd.DataFrame({
+            "Beneficiario": [p[0] for p in pensiones_rp],
+            "Pension_UF": format_numbers(uf, chileno=False),
+            "Pension_Bruta": bruta,
+            "Dscto_Salud_7%": salud,
+            "Dscto_Comision": comision,
+            "Pension_Liquida": bruta - salud - comision,
         })
 
+        total_uf = clean_number(rp.pension_total_uf)
+        df_rp.loc['Total'] = [
+            "Pensión mensual total", f"{total_uf:,.2f}", df_rp["Pension_Bruta"].sum(),
+            df_rp["Dscto_Salud_7%"].sum(), df_rp["Dscto_Comision"].sum(), df_rp["Pension_Liquida"].sum()
+        ]
+
+        processed_tables.append(ProcessedTable(
+            titulo=f"Retiro Programado ({header_data.get('afp_origen', 'AFP')})",
+            tipo='RP_SOBREVIVENCIA',
+            tabla=df_rp,
+            meses_garantizados=0,
+        ))
+
     # --- 4. Generar nombres de columna para RV ---
     cols_base = ["Compañía"]
     for i in range(len(beneficiarios_ordenados)):
         cols_base.extend([f"Benef. {i+1} UF", f"Benef. {i+1} $"])
     cols_rv = cols_base + ["Total Bruto", "Total Líquido"]
-    
+    num_pares = len(beneficiarios_ordenados)
+
     # --- 5. Procesar Tablas de Renta Vitalicia ---
-    rv_list = raw_data.get("rentas_vitalicias", [])
-    for modalidad in rv_list:
-        ofertas = modalidad.get("ofertas", [])
-        if not ofertas or not isinstance(ofertas[0], dict):
-            continue 
+    for modalidad in scomp.rentas_vitalicias:
+        if not len(modalidad) or not modalidad.es_sobrevivencia:
+            continue
 
         # === LÓGICA DE TÍTULO RESUMIDO (Sobrevivencia) ===
-        base_title = "Renta Vitalicia Inmediata"
-        parts = [base_title]
-        garant_meses = modalidad.get("meses_garantizados", 0)
-        
+        parts = ["Renta Vitalicia Inmediata"]
+        garant_meses = modalidad.meses_garantizados
         if garant_meses > 0:
             parts.append(f"Garantizado {garant_meses}m")
         else:
             parts.append("Simple")
-        
         new_title = " / ".join(parts)
         # === FIN LÓGICA TÍTULO ===
 
-        rv_rows = []
-        for oferta in ofertas:
-            row = [oferta["compania"]]
-            total_bruto = clean_number(oferta.get("pension_total_pesos", 0))
-            
-            for benef_oferta in oferta.get("ofertas_beneficiarios", []):
-                row.append(benef_oferta[0]) # UF (string)
-                row.append(clean_number(benef_oferta[1])) # Pesos (num)
-            
-            num_esperado = len(cols_rv)
-            num_actual = len(row) + 2 # +2 for Total Bruto/Liquido
-            
-            if num_actual > num_esperado:
-                row = row[:num_esperado-2]
-            elif num_actual < num_esperado:
-                row.extend([None] * (num_esperado - num_actual))
-            
-            row.append(total_bruto)
-            row.append(round(total_bruto * 0.93)) # Total Líquido (Bruto - 7% Salud)
-            rv_rows.append(row)
-        
-        if rv_rows:
-            df_rv = pd.DataFrame(rv_rows, columns=cols_rv).head(4) 
-            processed_tables.append({
-                'titulo': new_title, 
-                'tipo': 'RV_SOBREVIVENCIA',
-                'tabla': df_rv,
-                'meses_garantizados': garant_meses
-            })
+        # Sólo se muestran las 4 primeras ofertas
+        n = min(len(modalidad), 4)
+        columnas = {"Compañía": list(modalidad.companias[:n])}
+        for j in range(num_pares):
+            pares = [b[j] if j < len(b) else (None, None) for b in modalidad.beneficiarios[:n]]
+            columnas[f"Benef. {j+1} UF"] = [p[0] for p in pares]
+            columnas[f"Benef. {j+1} $"] = [p[1] for p in pares]
+        total_bruto = modalidad.pension_bruta[:n]
+        columnas["Total Bruto"] = total_bruto
+        columnas["Total Líquido"] = np.round(total_bruto * 0.93).astype('int64')  # Bruto - 7% Salud
+
+        processed_tables.append(ProcessedTable(
+            titulo=new_title,
+            tipo='RV_SOBREVIVENCIA',
+            tabla=pd.DataFrame(columnas, columns=cols_rv),
+            meses_garantizados=garant_meses,
+        ))
 
     return processed_tables, beneficiarios_ordenados, warnings
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import (
+    PROMPT_EXTRACCION, PROMPT_EXTRACCION_SECCION, GEMINI_EXTRACCION_PARALELA, GEMINI_MODEL_NAME,
+    PARSER_LOCAL_VERSION, PDF_BACKEND, PDF_CORTE_ANTICIPADO, FILTRO_PAGINAS_VERSION, CACHE_DB_PATH, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_MAX_AGE_DAYS
+)
+
+
+def hash_bytes(data):
+    """
+    Retorna el hash SHA-256 (hex) de un bloque de bytes.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def build_cache_key(pdf_bytes, prompt=PROMPT_EXTRACCION, model_name=GEMINI_MODEL_NAME,
+                    section_prompt=PROMPT_EXTRACCION_SECCION, paralela=GEMINI_EXTRACCION_PARALELA,
+                    parser_version=PARSER_LOCAL_VERSION, pdf_backend=PDF_BACKEND,
+                    corte_anticipado=PDF_CORTE_ANTICIPADO, filtro_version=FILTRO_PAGINAS_VERSION):
+    """
+    Construye la clave de cache de una extracción.
+    Cambiar el PDF, cualquiera de los prompts, el modo paralelo, la versión del
+    parser local, el motor de extracción de texto, el corte anticipado, la versión
+    del filtro de páginas o el modelo invalida la entrada.
+    """
+    configuracion = "\n".join((
+        prompt, section_prompt, f"paralela={paralela}", f"parser={parser_version}",
+        f"motor_pdf={pdf_backend}", f"corte={corte_anticipado}", f"filtro={filtro_version}",
+    ))
+    prompt_hash = hash_bytes(configuracion.encode("utf-8"))[:16]
+    return f"{hash_bytes(pdf_bytes)}:{prompt_hash}:{model_name}"
+
+
+class ExtractionCache:
+    """
+    Cache persistente (SQLite) de los JSON devueltos por la IA.
+    Se comparte entre sesiones y procesos; expulsa por antigüedad, por cantidad
+    de entradas y por tamaño total (la menos usada recientemente primero).
+    """
+
+    def __init__(self, db_path=CACHE_DB_PATH, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extracciones (
+                clave TEXT PRIMARY KEY,
+                datos TEXT NOT NULL,
+                tamano INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL,
+                accesos INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Retorna el JSON guardado para `key` o None si no existe o expiró.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT datos, creado FROM extracciones WHERE clave = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                datos, creado = row
+                if now - creado > self.max_age_seconds:
+                    self._conn.execute("DELETE FROM extracciones WHERE clave = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                    self.misses += 1
+                    return None
+
+                self._conn.execute(
+                    "UPDATE extracciones SET ultimo_acceso = ?, accesos = accesos + 1 WHERE clave = ?",
+                    (now, key)
+                )
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(datos)
+            except (sqlite3.Error, json.JSONDecodeError) as e:
+                print(f"Error al leer cache de extracciones: {e}")
+                self.misses += 1
+                return None
+
+    def set(self, key, data):
+        """
+        Guarda el JSON `data` bajo `key` y aplica la política de expulsión.
+        """
+        datos = json.dumps(data, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extracciones (clave, datos, tamano, creado, ultimo_acceso, accesos) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, datos, len(datos.encode("utf-8")), now, now)
+                )
+                self._evict(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error al escribir cache de extracciones: {e}")
+
+    def _evict(self, now):
+        cursor = self._conn.execute(
+            "DELETE FROM extracciones WHERE creado < ?", (now - self.max_age_seconds,)
+        )
+        self.evictions += max(cursor.rowcount, 0)
+
+        rows = self._conn.execute(
+            "SELECT clave, tamano FROM extracciones ORDER BY ultimo_acceso DESC"
+        ).fetchall()
+        total_bytes = 0
+        to_delete = []
+        for i, (clave, tamano) in enumerate(rows):
+            total_bytes += tamano
+            if i >= self.max_entries or total_bytes > self.max_bytes:
+                to_delete.append((clave,))
+
+        if to_delete:
+            self._conn.executemany("DELETE FROM extracciones WHERE clave = ?", to_delete)
+            self.evictions += len(to_delete)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extracciones")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Retorna contadores de uso del cache (hits, misses, expulsiones, tamaño).
+        """
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM extracciones"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total) if total else 0.0,
+            'entries': entries,
+            'bytes': total_bytes,
+        }
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """
+    Retorna la instancia de cache compartida por todo el proceso.
+    """
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = ExtractionCache()
+        return _cache_instance
@@ -1,39 +1,317 @@
-import google.generativeai as genai
+import asyncio
+import copy
 import json
-from config.settings import PROMPT_EXTRACCION
+import re
+import threading
+import time
+from config.settings import (
+    PROMPT_EXTRACCION, PROMPT_EXTRACCION_SECCION, GEMINI_MODEL_NAME, SECCIONES_SCOMP,
+    GEMINI_MAX_CONCURRENCIA, GEMINI_MAX_REINTENTOS, GEMINI_TIMEOUT_SEGUNDOS
+)
+from services.llm_backends import backend_version, build_model, current_backend
+from services.page_filter import split_pages, estimate_tokens
+from skills.gemini_integration.gemini_client import AsyncGeminiClient
+from utils.helpers import normalize_text
+from utils.json_stream import IncrementalJSONParser
 
-def analyze_scomp_with_gemini(text, api_key):
+GENERATION_CONFIG = {
+    "temperature": 0.0,
+    "response_mime_type": "application/json",
+}
+
+# Grupos de secciones que se consultan juntas en el modo paralelo
+GRUPOS_SECCIONES = {
+    "header": ("header", "beneficiarios"),
+    "retiro_programado": ("pension_referencia", "retiro_programado"),
+    "rentas_vitalicias": ("rentas_vitalicias",),
+    "renta_temporal_rv_diferida": ("renta_temporal_rv_diferida",),
+}
+
+# Títulos (normalizados) que marcan el inicio de cada grupo dentro del texto
+TITULOS_GRUPO = (
+    ("header", "INFORMACION BENEFICIARIOS"),
+    ("header", "INFORMACION DE BENEFICIARIOS"),
+    ("retiro_programado", "MONTO DE PENSION MENSUAL DURANTE EL PRIMER ANO"),
+    ("retiro_programado", "PENSION DE REFERENCIA GARANTIZADA"),
+    ("retiro_programado", "EXCEDENTE DE LIBRE DISPOSICION"),
+    ("rentas_vitalicias", "RENTA VITALICIA INMEDIATA"),
+    ("renta_temporal_rv_diferida", "RENTA TEMPORAL"),
+    ("renta_temporal_rv_diferida", "RENTA VITALICIA DIFERIDA"),
+)
+
+VALORES_VACIOS = {
+    "header": {},
+    "beneficiarios": [],
+    "pension_referencia": [],
+    "retiro_programado": {},
+    "rentas_vitalicias": [],
+    "renta_temporal_rv_diferida": [],
+}
+
+
+def _valores_vacios(secciones):
+    # Copias nuevas: si la IA omite una sección, el valor que se entrega no puede ser
+    # el mismo objeto para todos los documentos
+    return {c: copy.deepcopy(VALORES_VACIOS[c]) for c in secciones}
+
+
+def _instrucciones_por_seccion():
     """
-    Envía el texto extraído del SCOMP a la API de Google Gemini para obtener un JSON estructurado.
+    Separa el bloque "INSTRUCCIONES DE EXTRACCIÓN" de PROMPT_EXTRACCION en
+    un dict {clave_json: texto_instruccion}, para reutilizarlo en sub-prompts.
+    """
+    inicio = PROMPT_EXTRACCION.index("INSTRUCCIONES DE EXTRACCIÓN:") + len("INSTRUCCIONES DE EXTRACCIÓN:")
+    fin = PROMPT_EXTRACCION.index("TEXTO DEL SCOMP:")
+    bloque = PROMPT_EXTRACCION[inicio:fin]
+
+    partes = re.split(r'(?m)^(?=\d\.\s+\*\*)', bloque)
+    instrucciones = {}
+    for parte in partes:
+        m = re.match(r'\d\.\s+\*\*([A-Z_]+)', parte)
+        if m:
+            instrucciones[m.group(1).lower()] = parte.strip()
+    return instrucciones
+
+
+INSTRUCCIONES_SECCION = _instrucciones_por_seccion()
+
+
+def split_scomp_sections(text):
+    """
+    Divide el texto del SCOMP (con marcas "--- PÁGINA n ---") en fragmentos por
+    grupo de secciones. Una página sin títulos continúa la última sección vista.
+    La primera página (datos del afiliado) se antepone como contexto a todos los grupos.
+    Retorna {grupo: texto}; los grupos sin páginas no aparecen.
+    """
+    paginas = split_pages(text) or [(1, "")]
+
+    paginas_por_grupo = {grupo: [] for grupo in GRUPOS_SECCIONES}
+    paginas_por_grupo["header"].append(paginas[0])
+    grupo_actual = None
+
+    for numero, contenido in paginas:
+        norm = normalize_text(contenido)
+        encontrados = []
+        for grupo, titulo in TITULOS_GRUPO:
+            pos = norm.rfind(titulo)
+            if pos >= 0:
+                encontrados.append((pos, grupo))
+
+        grupos_pagina = {grupo for _, grupo in encontrados}
+        primer_titulo = min(encontrados)[0] if encontrados else len(norm)
+        inicio_linea = norm.rfind("\n", 0, primer_titulo) + 1
+        if grupo_actual and (not encontrados or norm[:inicio_linea].strip()):
+            # La página empieza continuando la sección que venía de la anterior
+            grupos_pagina.add(grupo_actual)
+        for grupo in grupos_pagina:
+            if (numero, contenido) not in paginas_por_grupo[grupo]:
+                paginas_por_grupo[grupo].append((numero, contenido))
+        if encontrados:
+            grupo_actual = max(encontrados)[1]
+
+    portada = f"--- PÁGINA {paginas[0][0]} ---\n\n{paginas[0][1]}"
+    fragmentos = {}
+    for grupo, paginas_grupo in paginas_por_grupo.items():
+        if grupo != "header" and not paginas_grupo:
+            continue
+        textos = [f"--- PÁGINA {n} ---\n\n{c}" for n, c in paginas_grupo]
+        if grupo != "header" and paginas_grupo[0][0] != paginas[0][0]:
+            textos.insert(0, portada)
+        fragmentos[grupo] = "\n\n".join(textos)
+    return fragmentos
+
+
+def build_section_prompt(claves, text):
+    """
+    Arma un sub-prompt que pide sólo las `claves` indicadas sobre `text`.
+    """
+    instrucciones = "\n\n".join(INSTRUCCIONES_SECCION[c] for c in claves if c in INSTRUCCIONES_SECCION)
+    return (
+        PROMPT_EXTRACCION_SECCION
+        .replace("{CLAVES}", ", ".join(claves))
+        .replace("{INSTRUCCIONES}", instrucciones)
+        .replace("{TEXTO_PDF}", text)
+    )
+
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def get_gemini_client(api_key, model_name=GEMINI_MODEL_NAME):
+    """
+    Cliente Gemini compartido por proceso (uno por API key y modelo), para
+    reutilizar la conexión entre documentos en vez de crear un modelo por consulta.
+    Según LLM_BACKEND el modelo puede grabar sus respuestas o reproducirlas sin red;
+    tras configure_backend se crea un cliente nuevo con la nueva configuración.
+    """
+    with _clientes_lock:
+        clave = (api_key, model_name, backend_version())
+        if clave not in _clientes:
+            opciones = dict(
+                api_key=api_key,
+                model_name=model_name,
+                max_concurrency=GEMINI_MAX_CONCURRENCIA,
+                max_retries=GEMINI_MAX_REINTENTOS,
+            )
+            if current_backend() == "replay":
+                # Sin red: no se configura genai ni hace falta una API key real
+                _clientes[clave] = AsyncGeminiClient(**opciones, model=build_model(None, model_name))
+            else:
+                _clientes[clave] = AsyncGeminiClient(**opciones)
+                _clientes[clave].model = build_model(_clientes[clave].model, model_name)
+        return _clientes[clave]
+
+
+def _parse_json_response(texto):
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError:
+        # En caso de error, podríamos retornar el texto crudo para debug o lanzar error
+        raise ValueError(f"La IA no devolvió un JSON válido. Respuesta: {texto[:200]}...")
+
+
+def _registrar_uso(usage, modelo, prompt, texto, meta, inicio, ok=True):
+    """
+    Agrega la consulta a `usage` (LLMUsage) con sus tokens y latencia. Si la
+    respuesta no trae usage_metadata, los tokens se estiman por caracteres.
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(meta, "prompt_token_count", None)
+    estimado = prompt_tokens is None
+    if estimado:
+        prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(texto or "")
+    else:
+        output_tokens = getattr(meta, "candidates_token_count", 0) or 0
+    usage.add(modelo, prompt_tokens, output_tokens, time.perf_counter() - inicio, ok=ok, estimado=estimado)
+
+
+async def _generate_json_async(prompt, api_key, usage=None):
+    client = get_gemini_client(api_key)
+    inicio = time.perf_counter()
+    try:
+        response = await client.generate_content_async(
+            prompt,
+            generation_config=GENERATION_CONFIG,
+            request_options={"timeout": GEMINI_TIMEOUT_SEGUNDOS}
+        )
+    except Exception:
+        _registrar_uso(usage, client.model_name, prompt, "", None, inicio, ok=False)
+        raise
+    _registrar_uso(usage, client.model_name, prompt, response.text, getattr(response, "usage_metadata", None), inicio)
+    return _parse_json_response(response.text)
+
+
+def _generate_json(prompt, api_key, usage=None):
+    return get_gemini_client(api_key).run(_generate_json_async(prompt, api_key, usage=usage))
+
+
+async def _iter_sections_parallel(text, api_key, secciones, usage=None):
+    """
+    Lanza una consulta por grupo de secciones y entrega (claves, respuesta) a
+    medida que cada una termina.
+    """
+    fragmentos = split_scomp_sections(text)
+    tareas = []
+    for grupo, claves_grupo in GRUPOS_SECCIONES.items():
+        claves = [c for c in claves_grupo if c in secciones]
+        if claves and grupo in fragmentos:
+            tareas.append((claves, build_section_prompt(claves, fragmentos[grupo])))
+
+    async def consultar(claves, prompt):
+        return claves, await _generate_json_async(prompt, api_key, usage=usage)
+
+    # La concurrencia real la limita el cliente compartido
+    for futuro in asyncio.as_completed([consultar(claves, prompt) for claves, prompt in tareas]):
+        yield await futuro
+
+
+async def _analyze_sections_parallel(text, api_key, secciones, usage=None):
+    resultado = _valores_vacios(secciones)
+    async for claves, respuesta in _iter_sections_parallel(text, api_key, secciones, usage):
+        for clave in claves:
+            if clave in respuesta:
+                resultado[clave] = respuesta[clave]
+    return resultado
+
+
+def _build_prompt(text, secciones=None):
+    if secciones:
+        return build_section_prompt(list(secciones), text)
+    return PROMPT_EXTRACCION.replace("{TEXTO_PDF}", text)
+
+
+async def analyze_scomp_with_gemini_async(text, api_key, parallel=False, secciones=None, usage=None):
+    """
+    Versión async de analyze_scomp_with_gemini, para procesar varios documentos
+    concurrentemente sobre el mismo cliente.
     """
     if not api_key:
         raise ValueError("API Key no proporcionada.")
 
+    if parallel:
+        return await _analyze_sections_parallel(text, api_key, list(secciones or SECCIONES_SCOMP), usage)
+
+    return await _generate_json_async(_build_prompt(text, secciones), api_key, usage=usage)
+
+
+def _analyze_progressive(text, api_key, parallel, secciones, on_section, usage=None):
+    """
+    Igual que analyze_scomp_with_gemini, pero llama on_section(clave, valor) en el
+    hilo que llama apenas cada sección está lista: en modo paralelo al terminar su
+    consulta; si no, leyendo la respuesta en streaming con un parser JSON incremental.
+    """
+    client = get_gemini_client(api_key)
+
+    if parallel:
+        secciones = list(secciones or SECCIONES_SCOMP)
+        resultado = _valores_vacios(secciones)
+        for claves, respuesta in client.iterate(_iter_sections_parallel(text, api_key, secciones, usage)):
+            for clave in claves:
+                if clave in respuesta:
+                    resultado[clave] = respuesta[clave]
+                    on_section(clave, respuesta[clave])
+        return resultado
+
+    parser = IncrementalJSONParser()
+    prompt = _build_prompt(text, secciones)
+    uso_stream = {}
+    recibido = []
+    inicio = time.perf_counter()
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro-latest') # O el modelo más reciente/estable
-        
-        prompt_completo = PROMPT_EXTRACCION.replace("{TEXTO_PDF}", text)
-        
-        generation_config = {
-            "temperature": 0.0,
-            "response_mime_type": "application/json",
-        }
-        
-        request_options = {"timeout": 300}
-        
-        response = model.generate_content(
-            prompt_completo, 
-            generation_config=generation_config,
-            request_options=request_options
+        trozos = client.stream_blocking(
+            prompt,
+            generation_config=GENERATION_CONFIG,
+            request_options={"timeout": GEMINI_TIMEOUT_SEGUNDOS},
+            usage=uso_stream,
         )
-        
-        try:
-            json_response = json.loads(response.text)
-            return json_response
-        except json.JSONDecodeError:
-            # En caso de error, podríamos retornar el texto crudo para debug o lanzar error
-            raise ValueError(f"La IA no devolvió un JSON válido. Respuesta: {response.text[:200]}...")
-            
-    except Exception as e:
-        raise e
+        for trozo in trozos:
+            recibido.append(trozo)
+            for clave, valor in parser.feed(trozo).items():
+                on_section(clave, valor)
+    except Exception:
+        _registrar_uso(usage, client.model_name, prompt, "".join(recibido), uso_stream.get("usage_metadata"),
+                       inicio, ok=False)
+        raise
+    _registrar_uso(usage, client.model_name, prompt, "".join(recibido), uso_stream.get("usage_metadata"), inicio)
+    return parser.result()
+
+
+def analyze_scomp_with_gemini(text, api_key, parallel=False, secciones=None, on_section=None, usage=None):
+    """
+    Envía el texto extraído del SCOMP a la API de Google Gemini para obtener un JSON estructurado.
+    Con `parallel=True` divide el documento por secciones y hace las consultas en paralelo.
+    `secciones` limita la respuesta a esas claves de primer nivel (por defecto, todas).
+    Con `on_section(clave, valor)` se reciben las secciones a medida que se completan.
+    Con `usage` (LLMUsage) se registran los tokens y la latencia de cada consulta.
+    """
+    if not api_key:
+        raise ValueError("API Key no proporcionada.")
+
+    if on_section is not None:
+        return _analyze_progressive(text, api_key, parallel, secciones, on_section, usage)
+
+    return get_gemini_client(api_key).run(
+        analyze_scomp_with_gemini_async(text, api_key, parallel=parallel, secciones=secciones, usage=usage)
+    )
@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from config.settings import (
+    API_WORKERS, API_MAX_PENDIENTES, API_TTL_TRABAJOS, API_MAX_TERMINADOS, APP_ANALISIS_WORKERS,
+    APP_ANALISIS_MAX_PENDIENTES
+)
+
+ESTADOS = ("en_cola", "procesando", "listo", "error")
+
+_local = threading.local()
+
+
+class Job:
+    """
+    Un trabajo de la cola: la función a ejecutar, su estado, su avance
+    (lo que la función publica con update_progress) y su resultado.
+    """
+
+    def __init__(self, funcion, args, kwargs, clave=None):
+        self.id = uuid.uuid4().hex
+        self.clave = clave
+        self.progreso = {}
+        self.estado = "en_cola"
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self._llamada = (funcion, args, kwargs)
+        self._fin = threading.Event()
+
+    def wait(self, timeout=None):
+        """
+        Espera a que el trabajo termine (bien o con error). Retorna False si se cumplió el timeout.
+        """
+        return self._fin.wait(timeout)
+
+    def to_dict(self):
+        """
+        Estado serializable (sin el resultado).
+        """
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'error': self.error,
+            'creado': self.creado,
+            'iniciado': self.iniciado,
+            'terminado': self.terminado,
+            'segundos': (self.terminado or time.time()) - self.iniciado if self.iniciado else None,
+        }
+
+
+class JobQueue:
+    """
+    Cola acotada de trabajos con un pool fijo de hilos. Cuando hay `max_pendientes`
+    trabajos esperando, submit lanza queue.Full para que quien llama aplique
+    back-pressure (p. ej. responder 503). Los trabajos terminados se guardan
+    `ttl` segundos para que se pueda consultar su resultado, y a lo más
+    `max_terminados` (se descartan los más antiguos).
+    """
+
+    def __init__(self, workers=API_WORKERS, max_pendientes=API_MAX_PENDIENTES, ttl=API_TTL_TRABAJOS,
+                 max_terminados=API_MAX_TERMINADOS):
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.ttl = ttl
+        self.max_terminados = max_terminados
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._trabajos = OrderedDict()
+        self._por_clave = {}
+        self._lock = threading.Lock()
+        self._duraciones = []
+        self._hilos = []
+
+    def start(self):
+        with self._lock:
+            if self._hilos:
+                return self
+            for i in range(self.workers):
+                hilo = threading.Thread(target=self._worker, name=f"scomp-worker-{i}", daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Detiene los workers después de los trabajos ya encolados.
+        """
+        with self._lock:
+            hilos, self._hilos = self._hilos, []
+        for _ in hilos:
+            self._cola.put(None)
+        for hilo in hilos:
+            hilo.join(timeout)
+
+    def submit(self, funcion, *args, **kwargs):
+        """
+        Encola funcion(*args, **kwargs) y retorna el Job. Lanza queue.Full si la cola está llena.
+        """
+        job = Job(funcion, args, kwargs)
+        with self._lock:
+            self._expirar()
+            self._cola.put_nowait(job)
+            self._trabajos[job.id] = job
+        return job
+
+    def submit_once(self, clave, funcion, *args, **kwargs):
+        """
+        Como submit, pero si ya hay un trabajo con la misma `clave` en cola, en curso
+        o terminado bien (y aún guardado), retorna ese en vez de repetir el trabajo.
+        """
+        with self._lock:
+            self._expirar()
+            existente = self._trabajos.get(self._por_clave.get(clave))
+            if existente is not None and existente.estado != "error":
+                return existente
+            job = Job(funcion, args, kwargs, clave=clave)
+            self._cola.put_nowait(job)
+            self._trabajos[job.id] = job
+            self._por_clave[clave] = job.id
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._expirar()
+            return self._trabajos.get(job_id)
+
+    def position(self, job):
+        """
+        Trabajos en cola antes de `job` (0 si ya empezó o es el siguiente).
+        """
+        with self._lock:
+            if job.estado != "en_cola":
+                return 0
+            return sum(1 for j in self._trabajos.values() if j.estado == "en_cola" and j.creado < job.creado)
+
+    def stats(self):
+        with self._lock:
+            self._expirar()
+            por_estado = {estado: 0 for estado in ESTADOS}
+            for job in self._trabajos.values():
+                por_estado[job.estado] += 1
+            duraciones = list(self._duraciones)
+        return {
+            'workers': self.workers,
+            'capacidad': self.max_pendientes,
+            'pendientes': self._cola.qsize(),
+            'trabajos': por_estado,
+            'segundos_promedio': sum(duraciones) / len(duraciones) if duraciones else None,
+        }
+
+    def retry_after(self):
+        """
+        Segundos estimados hasta que se libere un lugar en la cola (para el header Retry-After).
+        """
+        promedio = self.stats()['segundos_promedio'] or 1.0
+        return max(1, round(promedio * max(1, self._cola.qsize()) / max(1, self.workers)))
+
+    def _worker(self):
+        while True:
+            job = self._cola.get()
+            if job is None:
+                return
+            funcion, args, kwargs = job._llamada
+            job._llamada = None  # No retener el PDF más de lo necesario
+            job.iniciado = time.time()
+            job.estado = "procesando"
+            _local.job = job
+            try:
+                job.resultado = funcion(*args, **kwargs)
+                job.estado = "listo"
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                job.estado = "error"
+            finally:
+                _local.job = None
+            job.terminado = time.time()
+            with self._lock:
+                self._duraciones = (self._duraciones + [job.terminado - job.iniciado])[-50:]
+                self._expirar()
+            job._fin.set()
+
+    def _expirar(self):
+        # Se llama con el lock tomado
+        limite = time.time() - self.ttl
+        terminados = sorted((j for j in self._trabajos.values() if j.terminado), key=lambda j: j.terminado)
+        sobrantes = len(terminados) - self.max_terminados
+        expirados = [j.id for n, j in enumerate(terminados) if n < sobrantes or j.terminado < limite]
+        for job_id in expirados:
+            job = self._trabajos.pop(job_id)
+            if self._por_clave.get(job.clave) == job_id:
+                del self._por_clave[job.clave]
+
+
+def update_progress(**datos):
+    """
+    Publica el avance del trabajo que se está ejecutando en este hilo (job.progreso).
+    Fuera de un worker de la cola no hace nada.
+    """
+    job = getattr(_local, "job", None)
+    if job is not None:
+        job.progreso = {**job.progreso, **datos}
+
+
+_analysis_queue = None
+_analysis_queue_lock = threading.Lock()
+
+
+def get_analysis_queue():
+    """
+    Cola de análisis en segundo plano compartida por todas las sesiones de la app.
+    """
+    global _analysis_queue
+    with _analysis_queue_lock:
+        if _analysis_queue is None:
+            _analysis_queue = JobQueue(workers=APP_ANALISIS_WORKERS, max_pendientes=APP_ANALISIS_MAX_PENDIENTES).start()
+        return _analysis_queue
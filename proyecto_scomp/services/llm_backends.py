@@ -0,0 +1,315 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as google_exceptions
+
+from config.settings import (
+    LLM_BACKEND, LLM_GRABACIONES_DIR, LLM_REPLAY_LATENCIA, LLM_REPLAY_ERRORES, LLM_REPLAY_SEED
+)
+from services.page_filter import estimate_tokens
+
+BACKENDS = ("gemini", "record", "replay")
+
+# Errores que se pueden inyectar en el replay. "json" entrega una respuesta truncada.
+ERRORES_INYECTABLES = {
+    "429": google_exceptions.TooManyRequests,
+    "500": google_exceptions.InternalServerError,
+    "503": google_exceptions.ServiceUnavailable,
+    "timeout": google_exceptions.DeadlineExceeded,
+    "json": None,
+}
+
+# Caracteres por trozo al reproducir una respuesta en streaming
+CARACTERES_POR_TROZO = 400
+
+
+def prompt_hash(prompt, model_name):
+    """
+    Clave de una grabación: hash del modelo y el prompt exacto.
+    """
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """
+    Respuestas grabadas de la IA, un archivo JSON por prompt (<hash>.json), para
+    poder versionarlas o copiarlas entre máquinas.
+    """
+
+    def __init__(self, directorio=LLM_GRABACIONES_DIR):
+        self.directorio = directorio
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def get(self, clave):
+        try:
+            with open(self._ruta(clave), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, clave, registro):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(registro, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, ruta)
+
+    def __len__(self):
+        if not os.path.isdir(self.directorio):
+            return 0
+        return sum(1 for nombre in os.listdir(self.directorio) if nombre.endswith(".json"))
+
+
+class LatencyModel:
+    """
+    Distribución de la latencia simulada, a partir de un texto como los de
+    LLM_REPLAY_LATENCIA: "grabada", "fija:S", "uniforme:MIN,MAX" o "lognormal:MEDIANA,SIGMA".
+    """
+
+    def __init__(self, spec="grabada", seed=0):
+        nombre, _, parametros = spec.partition(":")
+        try:
+            valores = [float(v) for v in parametros.split(",")] if parametros else []
+        except ValueError:
+            raise ValueError(f"Parámetros de latencia inválidos: {spec}")
+        esperados = {"grabada": 0, "fija": 1, "uniforme": 2, "lognormal": 2}
+        if nombre not in esperados or len(valores) != esperados[nombre]:
+            raise ValueError(f"Latencia desconocida: {spec}. Opciones: grabada, fija:S, uniforme:MIN,MAX, "
+                             "lognormal:MEDIANA,SIGMA")
+        self.nombre = nombre
+        self.valores = valores
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, grabada=None):
+        """
+        Segundos de espera para una consulta; `grabada` es la latencia medida al grabarla.
+        """
+        if self.nombre == "grabada":
+            return grabada or 0.0
+        if self.nombre == "fija":
+            return self.valores[0]
+        with self._lock:
+            if self.nombre == "uniforme":
+                return self._rng.uniform(*self.valores)
+            mediana, sigma = self.valores
+            return self._rng.lognormvariate(math.log(mediana), sigma)
+
+
+def parse_error_rates(spec):
+    """
+    "503:0.05,json:0.01" -> {"503": 0.05, "json": 0.01}.
+    """
+    tasas = {}
+    for parte in filter(None, (p.strip() for p in (spec or "").split(","))):
+        tipo, _, tasa = parte.partition(":")
+        if tipo not in ERRORES_INYECTABLES:
+            raise ValueError(f"Error inyectable desconocido: {tipo}. Opciones: {', '.join(ERRORES_INYECTABLES)}")
+        try:
+            tasas[tipo] = float(tasa)
+        except ValueError:
+            raise ValueError(f"Tasa de error inválida: {parte}")
+    if sum(tasas.values()) > 1:
+        raise ValueError("La suma de las tasas de error no puede superar 1.")
+    return tasas
+
+
+def _usage_metadata(prompt_tokens, output_tokens):
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+class ReplayModel:
+    """
+    Reemplazo local de genai.GenerativeModel: responde desde un ResponseStore,
+    esperando una latencia sorteada de `latencia` (LatencyModel) e inyectando
+    errores según `errores` ({tipo: probabilidad}). Si un prompt no está grabado
+    se usa `respaldo(prompt)` (texto de la respuesta) o se lanza ValueError.
+    Con la misma semilla, la secuencia de latencias y errores es reproducible.
+    """
+
+    def __init__(self, store, model_name, latencia=None, errores=None, respaldo=None, seed=0):
+        self.store = store
+        self.model_name = model_name
+        self.latencia = latencia or LatencyModel(seed=seed)
+        self.errores = errores or {}
+        self.respaldo = respaldo
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.estadisticas = {'consultas': 0, 'grabadas': 0, 'respaldo': 0, 'errores': {}}
+
+    def _buscar(self, prompt):
+        registro = self.store.get(prompt_hash(prompt, self.model_name))
+        if registro is not None:
+            return registro, 'grabadas'
+        texto = self.respaldo(prompt) if self.respaldo else None
+        if texto is None:
+            raise ValueError(f"No hay respuesta grabada para el prompt {prompt_hash(prompt, self.model_name)[:12]} "
+                             f"({self.store.directorio}).")
+        return {'texto': texto, 'prompt_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(texto)}, \
+            'respaldo'
+
+    def _sortear_error(self):
+        with self._lock:
+            sorteo = self._rng.random()
+        acumulado = 0.0
+        for tipo, tasa in self.errores.items():
+            acumulado += tasa
+            if sorteo < acumulado:
+                return tipo
+        return None
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None, stream=False):
+        registro, origen = self._buscar(prompt)
+        error = self._sortear_error()
+        demora = self.latencia.sample(registro.get('latencia'))
+        timeout = (request_options or {}).get("timeout")
+        with self._lock:
+            self.estadisticas['consultas'] += 1
+            self.estadisticas[origen] += 1
+            if error:
+                self.estadisticas['errores'][error] = self.estadisticas['errores'].get(error, 0) + 1
+
+        if error == "timeout" or (timeout and demora > timeout):
+            await asyncio.sleep(timeout if timeout and timeout < demora else demora)
+            raise google_exceptions.DeadlineExceeded("Timeout simulado")
+        if error and error != "json":
+            # Las respuestas de cuota o sobrecarga llegan rápido
+            raise ERRORES_INYECTABLES[error](f"Error {error} simulado")
+
+        texto = registro['texto']
+        if error == "json":
+            texto = texto[:len(texto) // 2]
+        meta = _usage_metadata(registro['prompt_tokens'], registro['output_tokens'])
+        if stream:
+            return self._stream(texto, meta, demora)
+        await asyncio.sleep(demora)
+        return SimpleNamespace(text=texto, usage_metadata=meta)
+
+    async def _stream(self, texto, meta, demora):
+        trozos = [texto[i:i + CARACTERES_POR_TROZO] for i in range(0, len(texto), CARACTERES_POR_TROZO)] or [""]
+        for i, trozo in enumerate(trozos):
+            await asyncio.sleep(demora / len(trozos))
+            ultimo = i == len(trozos) - 1
+            yield SimpleNamespace(text=trozo, parts=[trozo] if trozo else [], usage_metadata=meta if ultimo else None)
+
+
+class RecordingModel:
+    """
+    Envuelve el modelo real y guarda cada respuesta exitosa (texto, tokens y
+    latencia) en el ResponseStore, para reproducirla luego con ReplayModel.
+    """
+
+    def __init__(self, modelo, store, model_name):
+        self.modelo = modelo
+        self.store = store
+        self.model_name = model_name
+
+    def _guardar(self, prompt, texto, meta, inicio):
+        self.store.put(prompt_hash(prompt, self.model_name), {
+            'modelo': self.model_name,
+            'texto': texto,
+            'prompt_tokens': getattr(meta, "prompt_token_count", None) or estimate_tokens(prompt),
+            'output_tokens': getattr(meta, "candidates_token_count", None) or estimate_tokens(texto),
+            'latencia': time.perf_counter() - inicio,
+            'grabado': time.time(),
+        })
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None, stream=False):
+        inicio = time.perf_counter()
+        respuesta = await self.modelo.generate_content_async(
+            prompt, generation_config=generation_config, request_options=request_options, stream=stream
+        )
+        if stream:
+            return self._stream(prompt, respuesta, inicio)
+        self._guardar(prompt, respuesta.text, getattr(respuesta, "usage_metadata", None), inicio)
+        return respuesta
+
+    async def _stream(self, prompt, respuesta, inicio):
+        recibido = []
+        meta = None
+        async for chunk in respuesta:
+            meta = getattr(chunk, "usage_metadata", None) or meta
+            if chunk.parts:
+                recibido.append(chunk.text)
+            yield chunk
+        self._guardar(prompt, "".join(recibido), meta, inicio)
+
+
+_configuracion = None
+_configuracion_version = 0
+_configuracion_lock = threading.Lock()
+
+
+def configure_backend(backend, **opciones):
+    """
+    Elige el backend de la IA para los clientes que se creen desde ahora en este
+    proceso (en vez de LLM_BACKEND). Opciones: grabaciones, latencia, errores,
+    respaldo y seed. Cambia backend_version(), con lo que get_gemini_client deja
+    de entregar los clientes creados con la configuración anterior.
+    """
+    global _configuracion, _configuracion_version
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de IA desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    with _configuracion_lock:
+        _configuracion = (backend, opciones)
+        _configuracion_version += 1
+
+
+def backend_version():
+    """
+    Número que cambia con cada llamada a configure_backend.
+    """
+    with _configuracion_lock:
+        return _configuracion_version
+
+
+def current_backend():
+    """
+    Backend vigente: el de configure_backend o, si no se llamó, LLM_BACKEND.
+    """
+    with _configuracion_lock:
+        backend = _configuracion[0] if _configuracion else LLM_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de IA desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    return backend
+
+
+def build_model(modelo, model_name):
+    """
+    Retorna el modelo que usará el cliente según el backend configurado:
+    el mismo `modelo`, uno que graba sus respuestas o uno que las reproduce
+    (en ese caso `modelo` no se usa y puede ser None).
+    """
+    with _configuracion_lock:
+        backend, opciones = _configuracion or (LLM_BACKEND, {})
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de IA desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    if backend == "gemini":
+        return modelo
+
+    store = ResponseStore(opciones.get('grabaciones', LLM_GRABACIONES_DIR))
+    if backend == "record":
+        return RecordingModel(modelo, store, model_name)
+    seed = opciones.get('seed', LLM_REPLAY_SEED)
+    return ReplayModel(
+        store,
+        model_name,
+        latencia=LatencyModel(opciones.get('latencia', LLM_REPLAY_LATENCIA), seed=seed),
+        errores=parse_error_rates(opciones.get('errores', LLM_REPLAY_ERRORES)),
+        respaldo=opciones.get('respaldo'),
+        seed=seed,
+    )
@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import (
+    GEMINI_PRECIOS_POR_MILLON, GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO, USO_LLM_DB_PATH
+)
+
+# Columnas por las que se pueden agrupar los reportes de consumo
+AGRUPACIONES = {
+    "dia": "date(creado, 'unixepoch', 'localtime')",
+    "modelo": "modelo",
+    "tipo_documento": "tipo_documento",
+    "documento": "documento",
+}
+
+
+def estimate_cost(modelo, prompt_tokens, output_tokens):
+    """
+    Costo en USD según GEMINI_PRECIOS_POR_MILLON (0 si el modelo no tiene precio).
+    """
+    entrada, salida = GEMINI_PRECIOS_POR_MILLON.get(modelo, (0.0, 0.0))
+    return (prompt_tokens * entrada + output_tokens * salida) / 1_000_000
+
+
+class LLMUsage:
+    """
+    Llamadas a la IA hechas para un documento. Se entrega a analyze_scomp_with_gemini,
+    que agrega una entrada por consulta (también las de modo paralelo). Es seguro
+    entre hilos: las consultas terminan en el loop del cliente.
+    """
+
+    def __init__(self):
+        self.llamadas = []
+        self._lock = threading.Lock()
+
+    def add(self, modelo, prompt_tokens, output_tokens, latencia, ok=True, estimado=False):
+        """
+        Registra una consulta. `estimado` indica que la respuesta no traía el
+        conteo de tokens y se usó la estimación por caracteres.
+        """
+        with self._lock:
+            self.llamadas.append({
+                'modelo': modelo,
+                'prompt_tokens': int(prompt_tokens),
+                'output_tokens': int(output_tokens),
+                'latencia': latencia,
+                'costo': estimate_cost(modelo, prompt_tokens, output_tokens),
+                'ok': ok,
+                'estimado': estimado,
+            })
+
+    def totals(self):
+        with self._lock:
+            llamadas = list(self.llamadas)
+        prompt_tokens = sum(l['prompt_tokens'] for l in llamadas)
+        output_tokens = sum(l['output_tokens'] for l in llamadas)
+        return {
+            'llamadas': len(llamadas),
+            'errores': sum(1 for l in llamadas if not l['ok']),
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': prompt_tokens + output_tokens,
+            'latencia_max': max((l['latencia'] for l in llamadas), default=0.0),
+            'costo': sum(l['costo'] for l in llamadas),
+        }
+
+
+def budget_warning(total_tokens, presupuesto=None):
+    """
+    Mensaje de advertencia si `total_tokens` supera el presupuesto por documento
+    (por defecto GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO), o None.
+    """
+    if presupuesto is None:
+        presupuesto = GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO
+    if presupuesto and total_tokens > presupuesto:
+        return (f"El documento usó {total_tokens:,} tokens de IA, sobre el presupuesto de "
+                f"{presupuesto:,} por documento.")
+    return None
+
+
+class UsageLedger:
+    """
+    Registro persistente (SQLite) de cada consulta a la IA, por documento, para
+    reportes de consumo por día, modelo o tipo de documento.
+    """
+
+    def __init__(self, db_path=USO_LLM_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llamadas_llm (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                documento TEXT NOT NULL,
+                tipo_documento TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                latencia REAL NOT NULL,
+                costo REAL NOT NULL,
+                ok INTEGER NOT NULL,
+                estimado INTEGER NOT NULL,
+                creado REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llamadas_llm_creado ON llamadas_llm (creado)")
+        self._conn.commit()
+
+    def record(self, documento, tipo_documento, usage, creado=None):
+        """
+        Guarda las llamadas de `usage` (LLMUsage) asociadas a `documento`.
+        """
+        creado = creado or time.time()
+        filas = [
+            (documento, tipo_documento, l['modelo'], l['prompt_tokens'], l['output_tokens'], l['latencia'],
+             l['costo'], int(l['ok']), int(l['estimado']), creado)
+            for l in usage.llamadas
+        ]
+        if not filas:
+            return
+        with self._lock:
+            try:
+                self._conn.executemany(
+                    "INSERT INTO llamadas_llm (documento, tipo_documento, modelo, prompt_tokens, output_tokens, "
+                    "latencia, costo, ok, estimado, creado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    filas
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error al registrar el consumo de IA: {e}")
+
+    def report(self, agrupar="dia", desde=None):
+        """
+        Consumo agregado por `agrupar` ("dia", "modelo", "tipo_documento" o "documento"),
+        opcionalmente sólo desde el timestamp `desde`. Retorna una lista de dicts.
+        """
+        if agrupar not in AGRUPACIONES:
+            raise ValueError(f"Agrupación desconocida: {agrupar}. Opciones: {', '.join(AGRUPACIONES)}")
+        consulta = (
+            f"SELECT {AGRUPACIONES[agrupar]} AS grupo, COUNT(*), COUNT(DISTINCT documento), "
+            "SUM(prompt_tokens), SUM(output_tokens), SUM(costo), AVG(latencia), MAX(latencia), SUM(1 - ok) "
+            "FROM llamadas_llm WHERE creado >= ? GROUP BY grupo ORDER BY grupo"
+        )
+        with self._lock:
+            filas = self._conn.execute(consulta, (desde or 0,)).fetchall()
+        claves = ('grupo', 'llamadas', 'documentos', 'prompt_tokens', 'output_tokens', 'costo',
+                  'latencia_media', 'latencia_max', 'errores')
+        return [dict(zip(claves, fila)) for fila in filas]
+
+    def document_usage(self, documento):
+        """
+        Totales de un documento (todas sus llamadas registradas).
+        """
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(output_tokens), 0), "
+                "COALESCE(SUM(costo), 0) FROM llamadas_llm WHERE documento = ?",
+                (documento,)
+            ).fetchone()
+        llamadas, prompt_tokens, output_tokens, costo = fila
+        return {
+            'llamadas': llamadas,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': prompt_tokens + output_tokens,
+            'costo': costo,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llamadas_llm")
+            self._conn.commit()
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger():
+    """
+    Retorna el registro de consumo compartido por todo el proceso.
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
+
+
+def record_document_usage(documento, tipo_documento, usage, ledger=None):
+    """
+    Persiste el consumo de un documento y revisa el presupuesto de tokens.
+    Retorna el mensaje de advertencia (o None).
+    """
+    if not usage.llamadas:
+        return None
+    (ledger or get_usage_ledger()).record(documento, tipo_documento, usage)
+    aviso = budget_warning(usage.totals()['total_tokens'])
+    if aviso:
+        print(f"⚠️ {aviso} ({documento[:16]})")
+    return aviso
@@ -0,0 +1,270 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config.settings import (
+    METRICAS_BUCKETS_SEGUNDOS, METRICAS_BUCKETS_TAMANO, METRICAS_EXPORT_PATH, METRICAS_EXPORT_INTERVALO
+)
+
+# Etapas instrumentadas, en el orden en que se muestran
+ETAPAS = ("extraccion", "parser_local", "gemini", "calculos", "reporte_pdf", "reporte_excel")
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    Histograma acumulado al estilo Prometheus: cuenta cuántas observaciones caen
+    bajo cada límite (`le`), más la suma, el total y el máximo.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, valor):
+        self.counts[bisect.bisect_left(self.buckets, valor)] += 1
+        self.sum += valor
+        self.count += 1
+        self.max = max(self.max, valor)
+
+    def merge(self, otro):
+        """
+        Suma las observaciones de `otro` (mismos límites) a este histograma.
+        """
+        if otro.buckets != self.buckets:
+            raise ValueError("No se pueden sumar histogramas con distintos buckets.")
+        self.counts = [a + b for a, b in zip(self.counts, otro.counts)]
+        self.sum += otro.sum
+        self.count += otro.count
+        self.max = max(self.max, otro.max)
+
+    def cumulative(self):
+        """
+        Lista de (le, observaciones <= le), terminando en (inf, total).
+        """
+        acumulado = 0
+        resultado = []
+        for le, n in zip(self.buckets + (math.inf,), self.counts):
+            acumulado += n
+            resultado.append((le, acumulado))
+        return resultado
+
+    def quantile(self, q):
+        """
+        Estima el cuantil `q` (0-1) interpolando dentro del bucket, como
+        histogram_quantile de Prometheus. Sobre el último límite retorna el máximo.
+        """
+        if not self.count:
+            return 0.0
+        rango = q * self.count
+        inferior = 0.0
+        anterior = 0
+        for le, acumulado in self.cumulative():
+            if acumulado >= rango:
+                if math.isinf(le):
+                    return self.max
+                superior = min(le, self.max)
+                if acumulado == anterior:
+                    return superior
+                return inferior + (superior - inferior) * (rango - anterior) / (acumulado - anterior)
+            inferior, anterior = le, acumulado
+        return self.max
+
+    def to_dict(self):
+        return {
+            'n': self.count,
+            'suma': self.sum,
+            'media': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': {_formato_le(le): n for le, n in self.cumulative()},
+        }
+
+
+def _formato_le(le):
+    return "+Inf" if math.isinf(le) else f"{le:g}"
+
+
+class MetricsRegistry:
+    """
+    Métricas por etapa del pipeline dentro del proceso: un histograma de duración
+    y uno por cada medida de tamaño (páginas, caracteres, filas, bytes), más
+    el conteo de errores. Es seguro entre hilos.
+    """
+
+    def __init__(self, buckets_segundos=METRICAS_BUCKETS_SEGUNDOS, buckets_tamano=METRICAS_BUCKETS_TAMANO,
+                 export_path=METRICAS_EXPORT_PATH, export_intervalo=METRICAS_EXPORT_INTERVALO):
+        self.buckets_segundos = buckets_segundos
+        self.buckets_tamano = buckets_tamano
+        self.export_path = export_path
+        self.export_intervalo = export_intervalo
+        self._lock = threading.Lock()
+        self._ultimo_export = 0.0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._duraciones = {}
+            self._medidas = {}
+            self._errores = {}
+
+    def observe(self, etapa, segundos, error=False, **medidas):
+        """
+        Registra una ejecución de `etapa`. Las medidas son números (p. ej. paginas=3).
+        """
+        with self._lock:
+            if etapa not in self._duraciones:
+                self._duraciones[etapa] = Histogram(self.buckets_segundos)
+                self._errores[etapa] = 0
+            self._duraciones[etapa].observe(segundos)
+            if error:
+                self._errores[etapa] += 1
+            for medida, valor in medidas.items():
+                if valor is None:
+                    continue
+                clave = (etapa, medida)
+                if clave not in self._medidas:
+                    self._medidas[clave] = Histogram(self.buckets_tamano)
+                self._medidas[clave].observe(valor)
+        self._maybe_export()
+
+    def take(self):
+        """
+        Retorna lo acumulado hasta ahora y deja el registro vacío. Sirve para
+        llevar las métricas de un proceso worker al principal (ver merge).
+        """
+        with self._lock:
+            estado = {'duraciones': self._duraciones, 'medidas': self._medidas, 'errores': self._errores}
+            self._duraciones = {}
+            self._medidas = {}
+            self._errores = {}
+        return estado
+
+    def merge(self, estado):
+        """
+        Suma a este registro lo retornado por take() en otro registro (o proceso).
+        """
+        with self._lock:
+            for etapa, histograma in estado['duraciones'].items():
+                if etapa not in self._duraciones:
+                    self._duraciones[etapa] = Histogram(self.buckets_segundos)
+                    self._errores[etapa] = 0
+                self._duraciones[etapa].merge(histograma)
+                self._errores[etapa] += estado['errores'].get(etapa, 0)
+            for clave, histograma in estado['medidas'].items():
+                if clave not in self._medidas:
+                    self._medidas[clave] = Histogram(self.buckets_tamano)
+                self._medidas[clave].merge(histograma)
+        self._maybe_export()
+
+    @contextmanager
+    def stage(self, etapa):
+        """
+        Mide el bloque como una ejecución de `etapa`. Entrega un dict donde el
+        bloque deja sus medidas de tamaño; si el bloque lanza, cuenta como error.
+        """
+        medidas = {}
+        inicio = time.perf_counter()
+        try:
+            yield medidas
+        except BaseException:
+            self.observe(etapa, time.perf_counter() - inicio, error=True, **medidas)
+            raise
+        self.observe(etapa, time.perf_counter() - inicio, **medidas)
+
+    def _etapas_ordenadas(self):
+        return sorted(self._duraciones, key=lambda e: (ETAPAS.index(e) if e in ETAPAS else len(ETAPAS), e))
+
+    def snapshot(self):
+        """
+        Estado actual como dict serializable: por etapa, la duración (segundos),
+        los errores y cada medida de tamaño.
+        """
+        with self._lock:
+            etapas = {}
+            for etapa in self._etapas_ordenadas():
+                etapas[etapa] = {
+                    'segundos': self._duraciones[etapa].to_dict(),
+                    'errores': self._errores[etapa],
+                    'medidas': {medida: h.to_dict() for (e, medida), h in sorted(self._medidas.items()) if e == etapa},
+                }
+            return {'generado': time.time(), 'etapas': etapas}
+
+    def to_prometheus(self):
+        """
+        Formato de texto de Prometheus (exposition format 0.0.4).
+        """
+        lineas = []
+
+        def histograma(nombre, ayuda, series):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} histogram")
+            for etiquetas, h in series:
+                for le, n in h.cumulative():
+                    lineas.append(f'{nombre}_bucket{{{etiquetas},le="{_formato_le(le)}"}} {n}')
+                lineas.append(f"{nombre}_sum{{{etiquetas}}} {h.sum:g}")
+                lineas.append(f"{nombre}_count{{{etiquetas}}} {h.count}")
+
+        with self._lock:
+            etapas = self._etapas_ordenadas()
+            histograma("scomp_etapa_segundos", "Duración de cada etapa del pipeline",
+                       [(f'etapa="{e}"', self._duraciones[e]) for e in etapas])
+            lineas.append("# HELP scomp_etapa_errores_total Ejecuciones de la etapa que terminaron con error")
+            lineas.append("# TYPE scomp_etapa_errores_total counter")
+            for e in etapas:
+                lineas.append(f'scomp_etapa_errores_total{{etapa="{e}"}} {self._errores[e]}')
+            for medida in sorted({m for _, m in self._medidas}):
+                series = [(f'etapa="{e}"', h) for (e, m), h in sorted(self._medidas.items()) if m == medida]
+                histograma(f"scomp_etapa_{medida}", f"Tamaño ({medida}) procesado por ejecución", series)
+        return "\n".join(lineas) + "\n"
+
+    def write(self, ruta):
+        """
+        Escribe las métricas en `ruta` (.prom/.txt: texto Prometheus; si no, JSON).
+        Se escribe a un temporal y se reemplaza, para no dejar archivos a medias.
+        """
+        if ruta.endswith((".prom", ".txt")):
+            contenido = self.to_prometheus()
+        else:
+            contenido = json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _maybe_export(self):
+        if not self.export_path:
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultimo_export < self.export_intervalo:
+                return
+            self._ultimo_export = ahora
+        try:
+            self.write(self.export_path)
+        except OSError as e:
+            print(f"No se pudieron exportar las métricas: {e}")
+
+
+def get_metrics():
+    """
+    Instancia compartida por el proceso.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
@@ -0,0 +1,175 @@
+import math
+import re
+from collections import Counter
+
+from config.settings import CHARS_POR_TOKEN, UMBRAL_LINEA_REPETIDA
+from utils.helpers import normalize_text
+
+RE_MARCA_PAGINA = re.compile(r'--- PÁGINA (\d+) ---')
+RE_MONTO = re.compile(r'\d,\d{2}\b|\d\.\d{3}\b')
+RE_REFERENCIA_LEGAL = re.compile(r'D\.?\s?L\.?\s*(?:N[°º]\s*)?3\.500', re.IGNORECASE)
+
+# Datos del afiliado: la página se conserva siempre
+CLAVES_HEADER = ("DATOS DEL AFILIADO", "DATOS DEL CONSULTANTE", "CODIGO CONSULTA", "SALDO DESTINADO")
+# Títulos de secciones con ofertas
+CLAVES_DATOS = (
+    "VALOR UF", "BENEFICIARIO", "PENSION DE REFERENCIA", "PENSION MENSUAL",
+    "RENTA VITALICIA", "RENTA TEMPORAL", "RETIRO PROGRAMADO", "EXCEDENTE",
+)
+CLAVES_GLOSARIO = ("GLOSARIO", "DEFINICIONES", "SIGNIFICADO DE LOS TERMINOS")
+CLAVES_LEGAL = (
+    "D.L. 3.500", "DL 3.500", "DECRETO LEY", "NORMA DE CARACTER GENERAL", "ARTICULO",
+    "DECLARO HABER", "FIRMA DEL AFILIADO", "INFORMACION IMPORTANTE",
+)
+
+# Títulos (normalizados) que indican qué secciones del JSON aparecen en una página
+TITULOS_SECCION = (
+    ("beneficiarios", "INFORMACION BENEFICIARIOS"),
+    ("beneficiarios", "INFORMACION DE BENEFICIARIOS"),
+    ("retiro_programado", "MONTO DE PENSION MENSUAL DURANTE EL PRIMER ANO"),
+    ("pension_referencia", "PENSION DE REFERENCIA GARANTIZADA"),
+    ("rentas_vitalicias", "RENTA VITALICIA INMEDIATA"),
+    ("renta_temporal_rv_diferida", "RENTA TEMPORAL"),
+    ("renta_temporal_rv_diferida", "RENTA VITALICIA DIFERIDA"),
+)
+
+# Cantidad de líneas al inicio/fin de cada página donde se buscan encabezados y pies
+LINEAS_BORDE = 3
+
+
+def split_pages(text):
+    """
+    Separa el texto de extract_text_from_pdf en una lista de (numero_pagina, contenido).
+    """
+    partes = RE_MARCA_PAGINA.split(text)
+    paginas = [(int(partes[i]), partes[i + 1].strip()) for i in range(1, len(partes) - 1, 2)]
+    if not paginas and text.strip():
+        paginas = [(1, text.strip())]
+    return paginas
+
+
+def join_pages(paginas):
+    return "".join(f"\n\n--- PÁGINA {n} ---\n\n{c}" for n, c in paginas)
+
+
+def classify_page(contenido, numero=None):
+    """
+    Clasifica una página como 'datos', 'glosario', 'legal', 'portada' u 'otra'.
+    Las páginas de glosario/legales mencionan las modalidades, así que sólo se
+    descartan si además no tienen filas con montos.
+    """
+    norm = normalize_text(contenido)
+    lineas_con_montos = sum(
+        1 for l in RE_REFERENCIA_LEGAL.sub("", contenido).splitlines() if RE_MONTO.search(l)
+    )
+    if any(clave in norm for clave in CLAVES_HEADER):
+        return "datos"
+    if lineas_con_montos < 2:
+        if any(clave in norm for clave in CLAVES_GLOSARIO):
+            return "glosario"
+        if any(clave in norm for clave in CLAVES_LEGAL):
+            return "legal"
+    if lineas_con_montos or any(clave in norm for clave in CLAVES_DATOS):
+        return "datos"
+    if numero == 1:
+        return "portada"
+    return "otra"
+
+
+def detect_sections(contenido):
+    """
+    Retorna el conjunto de secciones (claves del JSON) cuyos títulos aparecen en la página.
+    Las páginas de glosario/legales no cuentan aunque mencionen las modalidades.
+    """
+    if classify_page(contenido) in ("glosario", "legal"):
+        return set()
+    norm = normalize_text(contenido)
+    secciones = {seccion for seccion, titulo in TITULOS_SECCION if titulo in norm}
+    if any(clave in norm for clave in CLAVES_HEADER):
+        secciones.add("header")
+    return secciones
+
+
+def _clave_linea(linea):
+    # Los números cambian entre páginas ("Página 3 de 12"), el resto se repite
+    return re.sub(r'\d+', '#', linea.strip())
+
+
+def remove_repeated_lines(paginas):
+    """
+    Elimina encabezados/pies de página repetidos: líneas (en los bordes de la página)
+    que aparecen en al menos UMBRAL_LINEA_REPETIDA de las páginas. Se conserva la
+    primera aparición. Retorna (paginas, lineas_eliminadas).
+    """
+    if len(paginas) < 3:
+        return paginas, 0
+
+    conteo = Counter()
+    for _, contenido in paginas:
+        lineas = [l for l in contenido.splitlines() if l.strip()]
+        bordes = lineas[:LINEAS_BORDE] + lineas[-LINEAS_BORDE:]
+        conteo.update({_clave_linea(l) for l in bordes})
+
+    minimo = max(2, math.ceil(len(paginas) * UMBRAL_LINEA_REPETIDA))
+    repetidas = {clave for clave, n in conteo.items() if n >= minimo}
+    if not repetidas:
+        return paginas, 0
+
+    vistas = set()
+    eliminadas = 0
+    resultado = []
+    for numero, contenido in paginas:
+        lineas = contenido.splitlines()
+        no_vacias = [i for i, l in enumerate(lineas) if l.strip()]
+        bordes = set(no_vacias[:LINEAS_BORDE] + no_vacias[-LINEAS_BORDE:])
+        conservadas = []
+        for i, linea in enumerate(lineas):
+            clave = _clave_linea(linea)
+            if i in bordes and clave in repetidas:
+                if clave in vistas:
+                    eliminadas += 1
+                    continue
+                vistas.add(clave)
+            conservadas.append(linea)
+        resultado.append((numero, "\n".join(conservadas).strip()))
+    return resultado, eliminadas
+
+
+def estimate_tokens(text):
+    """
+    Estimación rápida de tokens (aprox. CHARS_POR_TOKEN caracteres por token).
+    """
+    return math.ceil(len(text) / CHARS_POR_TOKEN) if text else 0
+
+
+def prepare_text_for_llm(text):
+    """
+    Reduce el texto antes de enviarlo a la IA: omite páginas de glosario, legales y
+    portadas sin datos, y quita encabezados/pies repetidos.
+    Retorna (texto_reducido, reporte).
+    """
+    paginas = split_pages(text)
+    conservadas = []
+    omitidas = []
+    for numero, contenido in paginas:
+        tipo = classify_page(contenido, numero)
+        if tipo in ("glosario", "legal", "portada"):
+            omitidas.append((numero, tipo))
+        else:
+            conservadas.append((numero, contenido))
+
+    # Nunca dejar el documento vacío por una mala clasificación
+    if not conservadas:
+        conservadas, omitidas = paginas, []
+
+    conservadas, lineas_eliminadas = remove_repeated_lines(conservadas)
+    texto_reducido = join_pages(conservadas)
+
+    reporte = {
+        'paginas_totales': len(paginas),
+        'paginas_omitidas': omitidas,
+        'lineas_repetidas_eliminadas': lineas_eliminadas,
+        'tokens_estimados_original': estimate_tokens(text),
+        'tokens_estimados': estimate_tokens(texto_reducido),
+    }
+    return texto_reducido, reporte
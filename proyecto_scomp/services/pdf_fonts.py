@@ -0,0 +1,71 @@
+import io
+import threading
+
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.fonts import TTFFont, SubsetMap
+
+from config.settings import PDF_FUENTE, PDF_FUENTE_ARCHIVOS
+
+# Fuentes ya leídas en este proceso: {(familia, estilo): (TTFFont plantilla, bytes del archivo)}
+_plantillas = {}
+_plantillas_lock = threading.Lock()
+
+# Estado que fpdf2 modifica mientras arma un documento: no se comparte entre reportes
+_SLOTS_POR_DOCUMENTO = ("i", "ttfont", "subset", "missing_glyphs", "biggest_size_pt", "_hbfont")
+
+
+def _cargar_plantilla(familia, estilo, ruta):
+    """
+    Lee la TTF una sola vez (cmap, anchos de glifos, descriptor) usando un FPDF
+    desechable. Retorna (plantilla, bytes_del_archivo).
+    """
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    pdf = FPDF()
+    pdf.add_font(familia, estilo, ruta)
+    return pdf.fonts[f"{familia.lower()}{estilo}"], datos
+
+
+def _get_plantilla(familia, estilo, ruta):
+    clave = (familia, estilo)
+    with _plantillas_lock:
+        if clave not in _plantillas:
+            _plantillas[clave] = _cargar_plantilla(familia, estilo, ruta)
+        return _plantillas[clave]
+
+
+def _clonar(plantilla, datos, pdf):
+    """
+    Copia liviana de la fuente para un documento: comparte las métricas ya leídas
+    y sólo crea de nuevo lo que fpdf2 modifica. Al generar el PDF el subconjunto
+    de glifos se arma sobre `ttfont`, por eso cada documento abre el suyo (perezoso,
+    desde los bytes en memoria).
+    Usa internos de fpdf2 (TTFFont.__slots__, SubsetMap): por eso la versión
+    está fijada en requirements.txt; revisar esta función al actualizarla.
+    """
+    fuente = TTFFont.__new__(TTFFont)
+    for slot in TTFFont.__slots__:
+        if slot not in _SLOTS_POR_DOCUMENTO and hasattr(plantilla, slot):
+            setattr(fuente, slot, getattr(plantilla, slot))
+    fuente.i = len(pdf.fonts) + 1
+    fuente.ttfont = ttLib.TTFont(io.BytesIO(datos), recalcTimestamp=False, lazy=True)
+    fuente.missing_glyphs = []
+    fuente.biggest_size_pt = 0
+    fuente._hbfont = None
+    fuente.subset = SubsetMap(fuente)
+    return fuente
+
+
+def register_fonts(pdf, familia=PDF_FUENTE, archivos=None):
+    """
+    Registra la fuente de los reportes en `pdf` reutilizando las métricas leídas
+    por el proceso. Equivale a pdf.add_font(familia, estilo, ruta) por cada estilo.
+    """
+    archivos = archivos or PDF_FUENTE_ARCHIVOS
+    for estilo, ruta in archivos.items():
+        fontkey = f"{familia.lower()}{estilo}"
+        if fontkey in pdf.fonts:
+            continue
+        plantilla, datos = _get_plantilla(familia, estilo, ruta)
+        pdf.fonts[fontkey] = _clonar(plantilla, datos, pdf)
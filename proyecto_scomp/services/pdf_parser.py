@@ -1,23 +1,214 @@
 import pdfplumber
 import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_text_from_pdf(pdf_file):
+from config.settings import PDF_BACKEND, PDF_EXTRACCION_WORKERS, PDF_MIN_PAGINAS_PARALELO
+from services.metrics import get_metrics
+from services.page_filter import classify_page, detect_sections
+from utils.helpers import normalize_text
+
+
+# --- Backends de extracción ---
+# Cada backend abre el PDF desde bytes y extrae una lista de páginas (numeradas desde 1)
+# o las entrega de a una con iter_pages.
+# Deben ser instanciables sin argumentos y estar definidos a nivel de módulo: a los
+# procesos hijos se les envía la clase, que se recrea allí.
+
+class PdfplumberBackend:
     """
-    Extrae el texto completo de un archivo PDF usando pdfplumber.
-    Concatenas las páginas con un separador.
+    Extracción con análisis de layout (respeta filas/columnas de las tablas). Es el
+    formato que espera el parser local.
     """
-    full_text = ""
-    try:
+
+    def page_count(self, pdf_bytes):
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            return len(pdf.pages)
+
+    def extract_pages(self, pdf_bytes, numeros):
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            return [(n, pdf.pages[n - 1].extract_text(x_tolerance=2) or "") for n in numeros]
+
+    def iter_pages(self, pdf_bytes):
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            for page in pdf.pages:
+                texto = page.extract_text(x_tolerance=2) or ""
+                # Libera los objetos de layout de la página ya procesada
+                page.close()
+                yield page.page_number, texto
+
+
+class PdfiumBackend:
+    """
+    Extracción rápida con pypdfium2 (texto en orden de lectura, sin análisis de
+    layout). Útil cuando no se necesita fidelidad de tablas.
+    """
+
+    def page_count(self, pdf_bytes):
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def extract_pages(self, pdf_bytes, numeros):
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            paginas = []
+            for n in numeros:
+                texto = pdf[n - 1].get_textpage().get_text_bounded()
+                paginas.append((n, texto.replace("\r\n", "\n").strip()))
+            return paginas
+        finally:
+            pdf.close()
+
+    def iter_pages(self, pdf_bytes):
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            for i in range(len(pdf)):
+                texto = pdf[i].get_textpage().get_text_bounded()
+                yield i + 1, texto.replace("\r\n", "\n").strip()
+        finally:
+            pdf.close()
+
+
+PDF_BACKENDS = {
+    "pdfplumber": PdfplumberBackend,
+    "pdfium": PdfiumBackend,
+}
+
+
+def register_backend(nombre, backend_cls):
+    """
+    Registra un backend adicional: una clase con page_count, extract_pages e
+    iter_pages (esta última la usa la extracción perezosa).
+    """
+    PDF_BACKENDS[nombre] = backend_cls
+
+
+def _extraer_paginas(backend_cls, pdf_bytes, numeros):
+    # Se recibe la clase y no el nombre: un backend registrado en tiempo de
+    # ejecución no existe en el PDF_BACKENDS de un proceso recién creado
+    return backend_cls().extract_pages(pdf_bytes, numeros)
+
+
+# --- Pools de procesos compartidos (uno por tamaño) ---
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pool_lock:
+        if workers not in _pools:
+            # spawn: la app y el cliente Gemini tienen hilos, y fork con hilos no es seguro
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pools[workers]
+
+
+def _leer_bytes(pdf_file):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, 'read'):
         # Asegurarse de leer desde el principio si es un objeto BytesIO reutilizado
         if hasattr(pdf_file, 'seek'):
             pdf_file.seek(0)
-            
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text(x_tolerance=2)
-                if text:
-                    full_text += f"\n\n--- PÁGINA {page.page_number} ---\n\n{text}"
-        return full_text
+        return pdf_file.read()
+    with open(pdf_file, "rb") as f:
+        return f.read()
+
+
+def _unir_paginas(paginas):
+    return "".join(f"\n\n--- PÁGINA {n} ---\n\n{texto}" for n, texto in paginas if texto)
+
+
+def iter_pdf_pages(pdf_file, backend=PDF_BACKEND):
+    """
+    Generador de (numero_pagina, texto): extrae cada página sólo cuando se pide,
+    así quien consume puede detenerse antes del final del documento.
+    """
+    yield from PDF_BACKENDS[backend]().iter_pages(_leer_bytes(pdf_file))
+
+
+def _iter_pdf_pages_parallel(backend_cls, pdf_bytes, total, workers):
+    """
+    Como iter_pdf_pages, pero extrae en el pool de a `workers` páginas a la vez.
+    Cada tanda se pide recién cuando se consumió la anterior, así el corte
+    anticipado sigue evitando extraer los anexos (a lo más se pierde una tanda).
+    """
+    pool = _get_pool(workers)
+    for inicio in range(1, total + 1, workers):
+        tanda = range(inicio, min(inicio + workers, total + 1))
+        futuros = [pool.submit(_extraer_paginas, backend_cls, pdf_bytes, [n]) for n in tanda]
+        for futuro in futuros:
+            yield from futuro.result()
+
+
+def iter_pages_until_sections(paginas, requeridas):
+    """
+    Consume un iterable de (numero, texto) y deja de pedir páginas cuando ya se
+    vieron todas las secciones `requeridas` y aparece una página de anexos
+    (glosario o texto legal), que no se entrega. Las páginas con datos que siguen
+    a las requeridas (p. ej. Renta Temporal) sí se entregan.
+    """
+    requeridas = set(requeridas)
+    vistas = set()
+    for numero, texto in paginas:
+        if requeridas <= vistas and classify_page(texto, numero) in ("glosario", "legal"):
+            return
+        secciones = detect_sections(texto)
+        if "header" in secciones and "header" not in vistas and "SOBREVIVENCIA" not in normalize_text(texto):
+            # Los beneficiarios sólo se informan en Sobrevivencia
+            requeridas.discard("beneficiarios")
+        vistas |= secciones
+        yield numero, texto
+
+
+def extract_text_from_pdf(pdf_file, backend=PDF_BACKEND, workers=PDF_EXTRACCION_WORKERS, hasta_secciones=None):
+    """
+    Extrae el texto completo de un archivo PDF (ruta, bytes u objeto tipo archivo).
+    Concatena las páginas con un separador.
+    Con `workers` > 1 y documentos de PDF_MIN_PAGINAS_PARALELO páginas o más, las
+    páginas se reparten en bloques entre un pool de procesos.
+    Con `hasta_secciones` la extracción es perezosa y se detiene en los anexos una
+    vez vistas esas secciones (ver iter_pages_until_sections); en paralelo las
+    páginas se piden en tandas de `workers`.
+    """
+    try:
+        with get_metrics().stage("extraccion") as medidas:
+            pdf_bytes = _leer_bytes(pdf_file)
+            medidas['bytes'] = len(pdf_bytes)
+            backend_cls = PDF_BACKENDS[backend]
+            motor = backend_cls()
+            # La extracción perezosa en serie no necesita contar las páginas antes
+            total = motor.page_count(pdf_bytes) if (workers and workers > 1) or not hasta_secciones else None
+            paralelo = bool(total and workers > 1 and total >= PDF_MIN_PAGINAS_PARALELO)
+
+            if hasta_secciones:
+                if paralelo:
+                    pendientes = _iter_pdf_pages_parallel(backend_cls, pdf_bytes, total, workers)
+                else:
+                    pendientes = motor.iter_pages(pdf_bytes)
+                paginas = list(iter_pages_until_sections(pendientes, hasta_secciones))
+            else:
+                numeros = list(range(1, total + 1))
+
+                if paralelo:
+                    n_bloques = min(workers, total)
+                    bloques = [numeros[i::n_bloques] for i in range(n_bloques)]
+                    pool = _get_pool(workers)
+                    futuros = [pool.submit(_extraer_paginas, backend_cls, pdf_bytes, bloque) for bloque in bloques]
+                    paginas = sorted(p for futuro in futuros for p in futuro.result())
+                else:
+                    paginas = motor.extract_pages(pdf_bytes, numeros)
+
+            texto = _unir_paginas(paginas)
+            medidas['paginas'] = len(paginas)
+            medidas['caracteres'] = len(texto)
+            return texto
     except Exception as e:
         print(f"Error al leer PDF: {e}")
         return None
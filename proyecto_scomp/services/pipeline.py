@@ -0,0 +1,280 @@
+import hashlib
+import io
+import json
+from collections import OrderedDict
+
+from config.settings import (
+    DEFAULT_PGU_AMOUNT, PDF_BACKEND, PDF_EXTRACCION_WORKERS, PDF_CORTE_ANTICIPADO, PDF_SECCIONES_REQUERIDAS,
+    CALCULOS_CACHE_MAX_ENTRADAS
+)
+from services.pdf_parser import extract_text_from_pdf
+from services.scomp_parser import extract_scomp_data
+from services.extraction_cache import build_cache_key
+from services.metrics import get_metrics
+from services.job_queue import update_progress
+from services.llm_usage import LLMUsage, budget_warning, record_document_usage
+from services.calculations import build_tables_vejez, apply_pension_bono, process_data_sobrevivencia
+from models.scomp import ScompDocument
+from services.report_gen import (
+    build_pdf_vejez, build_pdf_sobrevivencia, create_formatted_excel_report, create_consolidated_excel_report
+)
+from utils.helpers import get_sort_key_sobrevivencia, sort_tables_vejez, normalize_text
+
+
+def extract_text_from_bytes(pdf_bytes, backend=PDF_BACKEND, workers=PDF_EXTRACCION_WORKERS,
+                            corte_anticipado=PDF_CORTE_ANTICIPADO):
+    """
+    Extrae el texto de un PDF recibido como bytes. Con `corte_anticipado` se deja
+    de extraer al llegar a los anexos (con `workers` > 1, pidiendo las páginas al
+    pool de procesos en tandas).
+    """
+    hasta_secciones = PDF_SECCIONES_REQUERIDAS if corte_anticipado else None
+    return extract_text_from_pdf(
+        io.BytesIO(pdf_bytes), backend=backend, workers=workers, hasta_secciones=hasta_secciones
+    )
+
+
+def analyze_scomp_pdf(pdf_bytes, api_key, cache=None, pdf_text=None, on_llm_request=None, on_section=None,
+                      usage=None, on_stage=None, backend=PDF_BACKEND):
+    """
+    Obtiene el JSON de un SCOMP: cache persistente -> extracción de texto ->
+    parser local/Gemini. Si se entrega `pdf_text`, no se vuelve a extraer
+    (`backend` debe ser el motor con que se extrajo, es parte de la clave del cache).
+    El consumo de la IA queda en `usage` (o en uno nuevo) y se registra por documento.
+    `on_stage(etapa)` se llama al empezar "extraccion" y "analisis".
+    Retorna (raw_data, desde_cache).
+    """
+    cache_key = build_cache_key(pdf_bytes, pdf_backend=backend)
+    if cache is not None:
+        raw_data = cache.get(cache_key)
+        if raw_data is not None:
+            return raw_data, True
+
+    if pdf_text is None:
+        if on_stage:
+            on_stage("extraccion")
+        pdf_text = extract_text_from_bytes(pdf_bytes, backend=backend)
+    if not pdf_text:
+        raise ValueError("No se pudo leer el texto del PDF.")
+
+    if on_stage:
+        on_stage("analisis")
+    usage = usage if usage is not None else LLMUsage()
+    try:
+        raw_data = extract_scomp_data(
+            pdf_text, api_key, on_llm_request=on_llm_request, on_section=on_section, usage=usage
+        )
+    except Exception:
+        record_document_usage(cache_key, "desconocido", usage)
+        raise
+    record_document_usage(cache_key, document_type(raw_data), usage)
+    if cache is not None:
+        cache.set(cache_key, raw_data)
+    return raw_data, False
+
+
+def analyze_scomp_job(pdf_bytes, api_key, cache=None):
+    """
+    analyze_scomp_pdf para la cola en segundo plano: publica el avance con
+    update_progress (etapa, reporte de la consulta a la IA y secciones ya listas).
+    Retorna {'raw_data', 'desde_cache', 'uso_ia', 'aviso_presupuesto'}.
+    """
+    secciones = {}
+
+    def on_section(clave, valor):
+        secciones[clave] = valor
+        update_progress(secciones=dict(secciones))
+
+    uso = LLMUsage()
+    raw_data, desde_cache = analyze_scomp_pdf(
+        pdf_bytes, api_key, cache=cache, usage=uso, on_section=on_section,
+        on_llm_request=lambda reporte: update_progress(reporte_llm=reporte),
+        on_stage=lambda etapa: update_progress(etapa=etapa),
+    )
+    totales = uso.totals()
+    return {
+        'raw_data': raw_data,
+        'desde_cache': desde_cache,
+        'uso_ia': totales,
+        'aviso_presupuesto': budget_warning(totales['total_tokens']) if uso.llamadas else None,
+    }
+
+
+def is_sobrevivencia(raw_data):
+    return "SOBREVIVENCIA" in (raw_data.get("header", {}).get("tipo_pension") or "").upper()
+
+
+def document_type(raw_data):
+    """
+    Tipo de documento para los reportes de consumo: "sobrevivencia", "vejez", "invalidez", etc.
+    """
+    tipo = normalize_text(raw_data.get("header", {}).get("tipo_pension") or "")
+    for nombre in ("SOBREVIVENCIA", "INVALIDEZ", "VEJEZ ANTICIPADA", "VEJEZ"):
+        if nombre in tipo:
+            return nombre.lower().replace(" ", "_")
+    return "desconocido"
+
+
+def build_scomp_base(raw_data):
+    """
+    Cálculos que no dependen de PGU/Bono (la parte cara): valida el JSON, arma y
+    ordena las tablas. En Sobrevivencia el resultado ya es el final.
+    Lanza ValueError si el JSON no tiene la forma esperada.
+    """
+    with get_metrics().stage("calculos") as medidas:
+        base = _build_scomp_base(raw_data)
+        medidas['tablas'] = len(base['tablas'])
+        medidas['filas'] = sum(len(item['tabla']) for item in base['tablas'])
+    return base
+
+
+def _build_scomp_base(raw_data):
+    header_data = dict(raw_data.get("header", {}))
+    scomp = ScompDocument.from_gemini_json(raw_data)
+
+    if scomp.header.es_sobrevivencia:
+        processed_tables, beneficiarios, warnings = process_data_sobrevivencia(scomp, header_data)
+        processed_tables.sort(key=get_sort_key_sobrevivencia)
+        return {
+            'header': header_data,
+            'tablas': processed_tables,
+            'beneficiarios': beneficiarios,
+            'warnings': warnings,
+            'es_sobrevivencia': True,
+        }
+
+    return {
+        'header': header_data,
+        'tablas': sort_tables_vejez(build_tables_vejez(scomp, header_data)),
+        'beneficiarios': [],
+        'warnings': [],
+        'es_sobrevivencia': False,
+    }
+
+
+def apply_scomp_params(base, include_pgu=True, pgu_amount=DEFAULT_PGU_AMOUNT, include_bono=True, bono_uf=0):
+    """
+    Aplica PGU/Bono sobre un resultado de build_scomp_base sin modificarlo:
+    sólo se recalcula la columna "Pensión + Bono".
+    """
+    if base['es_sobrevivencia']:
+        return base
+
+    # Detalle de PGU/Bono para el reporte
+    header_data = dict(base['header'])
+    if include_pgu:
+        header_data['pgu_monto'] = pgu_amount
+    if include_bono:
+        header_data['bono_monto_uf'] = bono_uf
+
+    tablas = apply_pension_bono(base['tablas'], header_data, include_pgu, pgu_amount, include_bono, bono_uf)
+    return {**base, 'header': header_data, 'tablas': tablas}
+
+
+def process_scomp(raw_data, include_pgu=True, pgu_amount=DEFAULT_PGU_AMOUNT, include_bono=True, bono_uf=0):
+    """
+    Aplica los cálculos de Vejez/Invalidez o Sobrevivencia y ordena las tablas.
+    Trabaja sobre una copia del header para no arrastrar datos entre ejecuciones.
+    Lanza ValueError si el JSON no tiene la forma esperada.
+    Retorna un dict con header, tablas, beneficiarios, warnings y es_sobrevivencia.
+    """
+    return apply_scomp_params(build_scomp_base(raw_data), include_pgu, pgu_amount, include_bono, bono_uf)
+
+
+def hash_raw_data(raw_data):
+    """
+    Hash estable del JSON de extracción (independiente del orden de las claves).
+    """
+    texto = json.dumps(raw_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CalculationCache:
+    """
+    Memoiza process_scomp entre reruns de la app. Guarda las tablas base por hash
+    del JSON y los resultados finales por (hash, parámetros PGU/Bono); si sólo
+    cambian los parámetros se reutiliza la base y se recalcula una columna.
+    Los resultados se comparten: quien los use no debe modificarlos.
+    """
+
+    def __init__(self, max_entries=CALCULOS_CACHE_MAX_ENTRADAS):
+        self.max_entries = max_entries
+        self._bases = OrderedDict()
+        self._resultados = OrderedDict()
+        self.hits = 0
+        self.base_hits = 0
+        self.misses = 0
+
+    def _guardar(self, tabla, clave, valor):
+        tabla[clave] = valor
+        tabla.move_to_end(clave)
+        while len(tabla) > self.max_entries:
+            tabla.popitem(last=False)
+
+    def process(self, raw_data, include_pgu=True, pgu_amount=DEFAULT_PGU_AMOUNT, include_bono=True, bono_uf=0,
+                raw_hash=None):
+        raw_hash = raw_hash or hash_raw_data(raw_data)
+        clave = (raw_hash, include_pgu, pgu_amount, include_bono, bono_uf)
+
+        resultado = self._resultados.get(clave)
+        if resultado is not None:
+            self._resultados.move_to_end(clave)
+            self.hits += 1
+            return resultado
+
+        base = self._bases.get(raw_hash)
+        if base is not None:
+            self._bases.move_to_end(raw_hash)
+            self.base_hits += 1
+        else:
+            self.misses += 1
+            base = build_scomp_base(raw_data)
+            self._guardar(self._bases, raw_hash, base)
+
+        resultado = apply_scomp_params(base, include_pgu, pgu_amount, include_bono, bono_uf)
+        self._guardar(self._resultados, clave, resultado)
+        return resultado
+
+
+def report_file_stem(resultado):
+    """
+    Nombre base (sin extensión) de los reportes, igual al usado en la app.
+    """
+    raw_name = resultado['header'].get("nombre") or "Afiliado"
+    clean_name = "".join(c for c in raw_name if c.isalnum() or c in (" ", "_", "-")).strip().replace(" ", "_")
+    sufijo = "Sobrevivencia" if resultado['es_sobrevivencia'] else "Vejez_Invalidez"
+    return f"Resultado_SCOMP_{clean_name}_{sufijo}"
+
+
+def build_pdf_report(resultado, tablas=None):
+    tablas = resultado['tablas'] if tablas is None else tablas
+    with get_metrics().stage("reporte_pdf") as medidas:
+        medidas['filas'] = sum(len(item['tabla']) for item in tablas)
+        if resultado['es_sobrevivencia']:
+            datos = build_pdf_sobrevivencia(resultado['header'], tablas, resultado['beneficiarios'])
+        else:
+            datos = build_pdf_vejez(resultado['header'], tablas)
+        medidas['bytes'] = len(datos)
+    return datos
+
+
+def build_excel_report(resultado, tablas=None):
+    tablas = resultado['tablas'] if tablas is None else tablas
+    with get_metrics().stage("reporte_excel") as medidas:
+        medidas['filas'] = sum(len(item['tabla']) for item in tablas)
+        if resultado['es_sobrevivencia']:
+            datos = create_formatted_excel_report(resultado['header'], tablas, resultado['beneficiarios'])
+        else:
+            datos = create_formatted_excel_report(resultado['header'], tablas)
+        medidas['bytes'] = len(datos)
+    return datos
+
+
+def build_consolidated_excel(raw_datas, destino=None, **params):
+    """
+    Libro consolidado (una hoja por cliente + resumen) a partir de varios JSON de
+    extracción. Cada documento se procesa recién cuando le toca su hoja.
+    `params` son los de process_scomp (include_pgu, pgu_amount, include_bono, bono_uf).
+    """
+    resultados = (process_scomp(raw_data, **params) for raw_data in raw_datas)
+    return create_consolidated_excel_report(resultados, destino=destino)
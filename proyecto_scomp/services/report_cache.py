@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+
+from config.settings import REPORTES_CACHE_MAX_BYTES
+
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+
+class ReportCache:
+    """
+    Cache en memoria (por proceso) de reportes ya generados (PDF/Excel en bytes).
+    Desaloja por LRU cuando el total supera `max_bytes`. Es seguro entre hilos:
+    Streamlit ejecuta la generación diferida de descargas en otro hilo.
+    """
+
+    def __init__(self, max_bytes=REPORTES_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, clave, builder):
+        """
+        Retorna los bytes guardados para `clave`, o los genera con builder() y los guarda.
+        """
+        with self._lock:
+            datos = self._entradas.get(clave)
+            if datos is not None:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return datos
+            self.misses += 1
+
+        # Se genera fuera del lock para no bloquear otras descargas
+        datos = builder()
+
+        with self._lock:
+            if clave not in self._entradas and len(datos) <= self.max_bytes:
+                self._entradas[clave] = datos
+                self._bytes += len(datos)
+                while self._bytes > self.max_bytes:
+                    _, viejo = self._entradas.popitem(last=False)
+                    self._bytes -= len(viejo)
+                    self.evictions += 1
+        return datos
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'entries': len(self._entradas),
+                'bytes': self._bytes,
+            }
+
+
+def get_report_cache():
+    """
+    Instancia compartida por el proceso.
+    """
+    global _report_cache
+    with _report_cache_lock:
+        if _report_cache is None:
+            _report_cache = ReportCache()
+        return _report_cache
+
+
+def report_cache_key(formato, raw_hash, tablas, params):
+    """
+    Clave de un reporte: formato, hash de los datos, modalidades incluidas y parámetros.
+    """
+    return (formato, raw_hash, tuple(item['titulo'] for item in tablas), tuple(params))
+
+
+def deferred_report(clave, builder, cache=None):
+    """
+    Retorna un callable sin argumentos (el formato que acepta st.download_button)
+    que genera el reporte sólo al pedirse la descarga, pasando por el cache.
+    """
+    cache = cache or get_report_cache()
+    return lambda: cache.get_or_build(clave, builder)
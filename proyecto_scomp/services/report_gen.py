@@ -1,10 +1,162 @@
-from fpdf import FPDF
+from fpdf import FPDF, XPos, YPos
 import io
 import re
+import numpy as np
+import pandas as pd
 import openpyxl
+from copy import copy
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 from utils.helpers import clean_number
+from utils.numbers import format_numbers
+from config.settings import PDF_FUENTE
+from services.pdf_fonts import register_fonts
+
+# --- Tablas PDF declarativas ---
+# Cada columna es (cabecera, columna del DataFrame, ancho relativo, formato, alineación).
+# Los formatos se aplican a la columna completa de una vez (ver FORMATOS_PDF).
+
+def _fmt_texto(serie):
+    return serie.astype(str).to_numpy(dtype=object)
+
+def _fmt_pesos(serie):
+    return format_numbers(serie.to_numpy(), decimals=0, chileno=False, prefijo="$")
+
+def _fmt_descuento(serie):
+    return "(" + _fmt_pesos(serie) + ")"
+
+def _fmt_comision(serie):
+    return np.where(serie.to_numpy() > 0, _fmt_descuento(serie), "($0)")
+
+FORMATOS_PDF = {
+    'texto': _fmt_texto,
+    'pesos': _fmt_pesos,
+    'descuento': _fmt_descuento,
+    'comision': _fmt_comision,
+}
+
+# Valor cuando a la tabla le falta una columna opcional
+VALORES_FALTANTES = {'texto': 'N/A', 'comision': 0}
+
+# En Vejez la columna None es la adicional (Pensión + PGU/Bono), cuyo nombre varía
+COLUMNAS_PDF_VEJEZ = {
+    'RP': (
+        ("Modalidad", 'Modalidad', 0.22, 'texto', 'L'),
+        ("Pensión UF", 'Pension_UF', 0.12, 'texto', 'R'),
+        ("Pensión Bruta", 'Pension_Bruta', 0.14, 'pesos', 'R'),
+        ("Dscto. 7% Salud", 'Descuento_Salud_7%', 0.14, 'descuento', 'R'),
+        ("Dscto. Comisión", 'Descuento_Comision', 0.14, 'comision', 'R'),
+        ("Pensión Líquida", 'Pension_Liquida', 0.14, 'pesos', 'R'),
+        (None, None, 0.10, 'pesos', 'R'),
+    ),
+    'RT': (
+        ("Compañía", 'Compania', 0.22, 'texto', 'L'),
+        ("Pensión UF", 'Pension_UF', 0.12, 'texto', 'R'),
+        ("Pensión Bruta", 'Pension_Bruta', 0.14, 'pesos', 'R'),
+        ("Dscto. 7% Salud", 'Descuento_Salud_7%', 0.14, 'descuento', 'R'),
+        ("Dscto. Comisión", 'Descuento_Comision', 0.14, 'comision', 'R'),
+        ("Pensión Líquida", 'Pension_Liquida', 0.14, 'pesos', 'R'),
+        (None, None, 0.10, 'pesos', 'R'),
+    ),
+}
+# RV, RVD, RV_Aumentada, RV_Base, REF
+COLUMNAS_PDF_VEJEZ_DEFAULT = (
+    ("Compañía", 'Compania', 0.28, 'texto', 'L'),
+    ("Pensión UF", 'Pension_UF', 0.12, 'texto', 'R'),
+    ("Pensión Bruta", 'Pension_Bruta', 0.15, 'pesos', 'R'),
+    ("Dscto. 7% Salud", 'Descuento_Salud_7%', 0.15, 'descuento', 'R'),
+    ("Pensión Líquida", 'Pension_Liquida', 0.15, 'pesos', 'R'),
+    (None, None, 0.15, 'pesos', 'R'),
+)
+
+COLUMNAS_PDF_RP_SOBREVIVENCIA = (
+    ("Beneficiario", 'Beneficiario', 0.30, 'texto', 'L'),
+    ("Pension_UF", 'Pension_UF', 0.14, 'texto', 'R'),
+    ("Pension_Bruta", 'Pension_Bruta', 0.14, 'pesos', 'R'),
+    ("Dscto_Salud_7%", 'Dscto_Salud_7%', 0.14, 'descuento', 'R'),
+    ("Dscto_Comision", 'Dscto_Comision', 0.14, 'descuento', 'R'),
+    ("Pension_Liquida", 'Pension_Liquida', 0.14, 'pesos', 'R'),
+)
+
+def columnas_rv_sobrevivencia(df, num_benef):
+    """
+    Columnas de la tabla RV de Sobrevivencia: compañía, UF y $ por beneficiario y
+    totales. Las columnas numéricas se imprimen como pesos.
+    """
+    cabeceras = ["Compañía"]
+    for i in range(num_benef):
+        cabeceras.extend([f"Benef. {i+1} UF", f"Benef. {i+1} $"])
+    cabeceras.extend(["Total Bruto", "Total Líquido"])
+
+    ancho_compania = 0.20
+    ancho_totales = 0.12
+    ancho_benef = (1 - ancho_compania - ancho_totales * 2) / (num_benef * 2) if num_benef else 0
+    anchos = [ancho_compania] + [ancho_benef] * (num_benef * 2) + [ancho_totales, ancho_totales]
+
+    columnas = []
+    for i, (cabecera, ancho, col) in enumerate(zip(cabeceras, anchos, df.columns)):
+        fmt = 'pesos' if pd.api.types.is_numeric_dtype(df[col].dtype) else 'texto'
+        columnas.append((cabecera, col, ancho, fmt, 'L' if i == 0 else 'R'))
+    return columnas
+
+def format_table_columns(columnas, df):
+    """
+    Formatea cada columna de `df` según su especificación, en bloque.
+    Retorna una lista de arrays de textos (uno por columna).
+    """
+    textos = []
+    for _, col, _, fmt, _ in columnas:
+        if col in df.columns:
+            serie = df[col]
+        else:
+            serie = pd.Series([VALORES_FALTANTES[fmt]] * len(df), index=df.index)
+        textos.append(FORMATOS_PDF[fmt](serie))
+    return textos
+
+def render_table(pdf, columnas, df, font_size=9, row_height=7, negritas=None):
+    """
+    Imprime cabeceras y filas de `df` según `columnas`. Los textos se formatean
+    antes por columna y las filas se recorren como tuplas. Las celdas se escriben
+    sin el parámetro `ln` (obsoleto en fpdf2, que emite un warning por celda).
+    `negritas` (opcional) marca por posición las filas que van en negrita.
+    """
+    usable_width = pdf.w - pdf.l_margin - pdf.r_margin
+    anchos = [usable_width * ancho for _, _, ancho, _, _ in columnas]
+    alineaciones = [align for _, _, _, _, align in columnas]
+
+    pdf.set_font(PDF_FUENTE, 'B', font_size)
+    for (cabecera, _, _, _, _), ancho in zip(columnas, anchos):
+        pdf.cell(ancho, row_height, cabecera, border=1, align='C')
+    pdf.ln()
+
+    pdf.set_font(PDF_FUENTE, '', font_size)
+    celdas = list(zip(anchos, alineaciones))
+    for i, fila in enumerate(zip(*format_table_columns(columnas, df))):
+        negrita = negritas is not None and negritas[i]
+        if negrita:
+            pdf.set_font(PDF_FUENTE, 'B', font_size)
+        for (ancho, align), texto in zip(celdas, fila):
+            pdf.cell(ancho, row_height, texto, border=1, align=align)
+        pdf.ln()
+        if negrita:
+            pdf.set_font(PDF_FUENTE, '', font_size)
+
+def print_label_rows(pdf, filas, row_height=7, font_size=11):
+    """
+    Imprime filas "Etiqueta: valor" con la etiqueta en negrita. El ancho de la
+    columna de etiquetas se mide con la fuente actual (DejaVu es más ancha que
+    las fuentes base), para que ninguna etiqueta se monte sobre su valor.
+    """
+    pdf.set_font(PDF_FUENTE, 'B', font_size)
+    ancho = max(40, max(pdf.get_string_width(etiqueta) for etiqueta, _ in filas) + 4)
+    for etiqueta, valor in filas:
+        pdf.set_font(PDF_FUENTE, 'B', font_size)
+        pdf.cell(ancho, row_height, etiqueta, border=0)
+        pdf.set_font(PDF_FUENTE, '', font_size)
+        pdf.cell(0, row_height, valor, border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
 
 class PDFReportVejez(FPDF):
     
@@ -14,6 +166,7 @@ class PDFReportVejez(FPDF):
         self.right_margin = 15
         self.top_margin = 15
         self.set_auto_page_break(auto=True, margin=15)
+        register_fonts(self)
         
     def add_page(self, orientation='', format='', same=False, rotation=0):
         super().add_page(orientation=orientation, format=format)
@@ -22,152 +175,40 @@ class PDFReportVejez(FPDF):
         self.set_top_margin(self.top_margin)
 
     def header(self):
-        self.set_font('Arial', 'B', 18)
-        self.cell(0, 10, 'ESTUDIO PRELIMINAR DE PENSIÓN', 0, 1, 'C')
+        self.set_font(PDF_FUENTE, 'B', 18)
+        self.cell(0, 10, 'ESTUDIO PRELIMINAR DE PENSIÓN', border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         self.ln(5)
 
     def print_header_data(self, data):
-        row_height = 7
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "Afiliado:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, data.get('nombre', 'No encontrado').encode('latin-1', 'replace').decode('latin-1'), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "RUT:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, str(data.get('rut', 'No encontrado')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "Saldo Acumulado:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, str(data.get('saldo_uf', 'No encontrado')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "N° SCOMP:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, str(data.get('n_scomp', 'No encontrado')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "Tipo Pensión:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, data.get('tipo_pension', 'No encontrado').encode('latin-1', 'replace').decode('latin-1'), 0, 1)
-
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, row_height, "Valor UF:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, row_height, str(data.get('valor_uf_str', 'No encontrado')), 0, 1)
-
+        filas = [
+            ("Afiliado:", data.get('nombre', 'No encontrado')),
+            ("RUT:", str(data.get('rut', 'No encontrado'))),
+            ("Saldo Acumulado:", str(data.get('saldo_uf', 'No encontrado'))),
+            ("N° SCOMP:", str(data.get('n_scomp', 'No encontrado'))),
+            ("Tipo Pensión:", data.get('tipo_pension', 'No encontrado')),
+            ("Valor UF:", str(data.get('valor_uf_str', 'No encontrado'))),
+        ]
         if data.get('pgu_monto'):
-             self.set_font('Arial', 'B', 11)
-             self.cell(40, row_height, "Monto PGU:", 0, 0)
-             self.set_font('Arial', '', 11)
-             self.cell(0, row_height, f"${data.get('pgu_monto'):,.0f}", 0, 1)
-        
+            filas.append(("Monto PGU:", f"${data.get('pgu_monto'):,.0f}"))
         if data.get('bono_monto_uf'):
-             self.set_font('Arial', 'B', 11)
-             self.cell(40, row_height, "Bono x Años:", 0, 0)
-             self.set_font('Arial', '', 11)
-             self.cell(0, row_height, f"{data.get('bono_monto_uf')} UF", 0, 1)
+            filas.append(("Bono x Años:", f"{data.get('bono_monto_uf')} UF"))
+        print_label_rows(self, filas)
 
         self.ln(8)
 
     def print_table(self, title, df, tipo, col_title_pdf, eld_info, valor_uf=0.0):
-        safe_title = title.encode('latin-1', 'replace').decode('latin-1')
-        
-        self.set_font('Arial', 'B', 12)
+        self.set_font(PDF_FUENTE, 'B', 12)
         self.set_fill_color(230, 230, 230)
-        self.cell(0, 8, safe_title, 1, 1, 'C', fill=True)
+        self.cell(0, 8, title, border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
         
-        self.set_font('Arial', 'B', 9)
-        row_height = 7
-        usable_width = self.w - self.l_margin - self.r_margin 
-        
-        if tipo == 'RP':
-            widths = {
-                'modalidad': usable_width * 0.22, 'uf': usable_width * 0.12, 'bruta': usable_width * 0.14,
-                'salud': usable_width * 0.14, 'comision': usable_width * 0.14, 'liquida': usable_width * 0.14,
-                'adicional': usable_width * 0.10
-            }
-            self.cell(widths['modalidad'], row_height, "Modalidad", 1, 0, 'C')
-            self.cell(widths['uf'], row_height, "Pensión UF", 1, 0, 'C')
-            self.cell(widths['bruta'], row_height, "Pensión Bruta", 1, 0, 'C')
-            self.cell(widths['salud'], row_height, "Dscto. 7% Salud", 1, 0, 'C')
-            self.cell(widths['comision'], row_height, "Dscto. Comisión", 1, 0, 'C')
-            self.cell(widths['liquida'], row_height, "Pensión Líquida", 1, 0, 'C')
-            self.cell(widths['adicional'], row_height, col_title_pdf, 1, 1, 'C')
-            
-        elif tipo == 'RT': # Renta Temporal
-            widths = {
-                'compania': usable_width * 0.22, 'uf': usable_width * 0.12, 'bruta': usable_width * 0.14,
-                'salud': usable_width * 0.14, 'comision': usable_width * 0.14, 'liquida': usable_width * 0.14,
-                'adicional': usable_width * 0.10
-            }
-            self.cell(widths['compania'], row_height, "Compañía", 1, 0, 'C')
-            self.cell(widths['uf'], row_height, "Pensión UF", 1, 0, 'C')
-            self.cell(widths['bruta'], row_height, "Pensión Bruta", 1, 0, 'C')
-            self.cell(widths['salud'], row_height, "Dscto. 7% Salud", 1, 0, 'C')
-            self.cell(widths['comision'], row_height, "Dscto. Comisión", 1, 0, 'C')
-            self.cell(widths['liquida'], row_height, "Pensión Líquida", 1, 0, 'C')
-            self.cell(widths['adicional'], row_height, col_title_pdf, 1, 1, 'C')
-
-        else: # RV, RVD, RV_Aumentada, RV_Base, REF
-            widths = {
-                'compania': usable_width * 0.28, 'uf': usable_width * 0.12, 'bruta': usable_width * 0.15,
-                'salud': usable_width * 0.15, 'liquida': usable_width * 0.15, 'adicional': usable_width * 0.15
-            }
-            self.cell(widths['compania'], row_height, "Compañía", 1, 0, 'C')
-            self.cell(widths['uf'], row_height, "Pensión UF", 1, 0, 'C')
-            self.cell(widths['bruta'], row_height, "Pensión Bruta", 1, 0, 'C')
-            self.cell(widths['salud'], row_height, "Dscto. 7% Salud", 1, 0, 'C')
-            self.cell(widths['liquida'], row_height, "Pensión Líquida", 1, 0, 'C')
-            self.cell(widths['adicional'], row_height, col_title_pdf, 1, 1, 'C')
-
-        self.set_font('Arial', '', 9)
-        for _, row in df.iterrows():
-            compania_safe = str(row.get('Compania', 'N/A')).encode('latin-1', 'replace').decode('latin-1')
-            modalidad_safe = str(row.get('Modalidad', 'N/A')).encode('latin-1', 'replace').decode('latin-1')
-            pension_uf_str = str(row.get('Pension_UF', 'N/A'))
-            
-            pension_bruta_str = f"${row['Pension_Bruta']:,.0f}"
-            descuento_salud_str = f"(${row['Descuento_Salud_7%']:,.0f})"
-            pension_liquida_str = f"${row['Pension_Liquida']:,.0f}"
-            pension_extra_str = f"${row[col_title_pdf]:,.0f}"
-
-            if tipo == 'RP':
-                comision_val = row.get('Descuento_Comision', 0)
-                comision_str = f"(${comision_val:,.0f})" if comision_val > 0 else "($0)"
-                
-                self.cell(widths['modalidad'], row_height, modalidad_safe, 1, 0)
-                self.cell(widths['uf'], row_height, pension_uf_str, 1, 0, 'R')
-                self.cell(widths['bruta'], row_height, pension_bruta_str, 1, 0, 'R')
-                self.cell(widths['salud'], row_height, descuento_salud_str, 1, 0, 'R')
-                self.cell(widths['comision'], row_height, comision_str, 1, 0, 'R')
-                self.cell(widths['liquida'], row_height, pension_liquida_str, 1, 0, 'R')
-                self.cell(widths['adicional'], row_height, pension_extra_str, 1, 1, 'R')
-            
-            elif tipo == 'RT': # Renta Temporal
-                comision_val = row.get('Descuento_Comision', 0)
-                comision_str = f"(${comision_val:,.0f})" if comision_val > 0 else "($0)"
-                
-                self.cell(widths['compania'], row_height, compania_safe, 1, 0)
-                self.cell(widths['uf'], row_height, pension_uf_str, 1, 0, 'R')
-                self.cell(widths['bruta'], row_height, pension_bruta_str, 1, 0, 'R')
-                self.cell(widths['salud'], row_height, descuento_salud_str, 1, 0, 'R')
-                self.cell(widths['comision'], row_height, comision_str, 1, 0, 'R')
-                self.cell(widths['liquida'], row_height, pension_liquida_str, 1, 0, 'R')
-                self.cell(widths['adicional'], row_height, pension_extra_str, 1, 1, 'R')
-
-            else: # RV, RVD, etc.
-                self.cell(widths['compania'], row_height, compania_safe, 1, 0)
-                self.cell(widths['uf'], row_height, pension_uf_str, 1, 0, 'R')
-                self.cell(widths['bruta'], row_height, pension_bruta_str, 1, 0, 'R')
-                self.cell(widths['salud'], row_height, descuento_salud_str, 1, 0, 'R')
-                self.cell(widths['liquida'], row_height, pension_liquida_str, 1, 0, 'R')
-                self.cell(widths['adicional'], row_height, pension_extra_str, 1, 1, 'R')
+        columnas = COLUMNAS_PDF_VEJEZ.get(tipo, COLUMNAS_PDF_VEJEZ_DEFAULT)
+        # La última columna (PGU/Bono) cambia de nombre según los parámetros
+        columnas = [(cab or col_title_pdf, col or col_title_pdf, ancho, fmt, align)
+                    for cab, col, ancho, fmt, align in columnas]
+        render_table(self, columnas, df, font_size=9)
         
         if eld_info and eld_info.get("monto_pesos") is not None and eld_info.get("monto_pesos", 0) > 0:
-            self.set_font('Arial', 'B', 10) 
+            self.set_font(PDF_FUENTE, 'B', 10) 
             self.ln(2)
             
             note_text = ""
@@ -181,17 +222,16 @@ class PDFReportVejez(FPDF):
                 p_pesos_str = f"${p_pesos_calculados:,.0f}"
                 
                 note_text = (
-                    f"Opcion de Excedente (ELD) en Retiro Programado:\n"
-                    f"Monto ELD: {monto_uf} UF ({monto_pesos_str}) con Pension resultante: {p_uf} UF ({p_pesos_str})"
+                    f"Opción de Excedente (ELD) en Retiro Programado:\n"
+                    f"Monto ELD: {monto_uf} UF ({monto_pesos_str}) con Pensión resultante: {p_uf} UF ({p_pesos_str})"
                 )
             
             elif tipo in ['RV', 'RV_Aumentada', 'REF', 'RT']:
                 compania = eld_info.get("compania", "N/A")
                 monto_str = f"${eld_info.get('monto_pesos', 0):,.0f}"
-                compania_safe = compania.encode('latin-1', 'replace').decode('latin-1')
-                note_text = f"Bajo esta modalidad, la compania que ofrece el mayor monto de Excedente de Libre Disposicion es {compania_safe} con {monto_str} pesos."
+                note_text = f"Bajo esta modalidad, la compañía que ofrece el mayor monto de Excedente de Libre Disposición es {compania} con {monto_str} pesos."
             
-            self.multi_cell(0, 5, note_text.encode('latin-1', 'replace').decode('latin-1'), 0, 'L')
+            self.multi_cell(0, 5, note_text, 0, 'L')
             self.ln(5) 
             
         else:
@@ -208,310 +248,435 @@ class PDFReportSobrevivencia(FPDF):
         self.r_margin = 15
         self.t_margin = 15
         self.set_auto_page_break(auto=True, margin=15)
+        register_fonts(self)
 
     def set_header_data(self, data, beneficiarios):
         self.header_data = data
         self.beneficiarios_ordenados = beneficiarios
 
     def header(self):
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'RESULTADO SCOMP', 0, 1, 'C')
-        self.set_font('Arial', 'B', 12)
+        self.set_font(PDF_FUENTE, 'B', 16)
+        self.cell(0, 10, 'RESULTADO SCOMP', border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        self.set_font(PDF_FUENTE, 'B', 12)
         
-        nombre_consultante = self.header_data.get('nombre', 'N/A').encode('latin-1', 'replace').decode('latin-1')
-        self.cell(0, 7, f"SRA. {nombre_consultante}", 0, 1, 'L')
+        nombre_consultante = self.header_data.get('nombre', 'N/A')
+        self.cell(0, 7, f"SRA. {nombre_consultante}", border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
         
         valor_uf = self.header_data.get('valor_uf_str', 'N/A')
-        self.cell(0, 7, f"VALOR UF: {valor_uf}", 0, 1, 'L')
+        self.cell(0, 7, f"VALOR UF: {valor_uf}", border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
         self.ln(5)
 
     def print_header_data_sobrevivencia(self):
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, 7, "Consultante:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, 7, self.header_data.get('nombre', 'N/A').encode('latin-1', 'replace').decode('latin-1'), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, 7, "RUT:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, 7, str(self.header_data.get('rut', 'N/A')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, 7, "Saldo Acumulado:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, 7, str(self.header_data.get('saldo_uf', 'No encontrado')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, 7, "N° SCOMP:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, 7, str(self.header_data.get('n_scomp', 'No encontrado')), 0, 1)
-        
-        self.set_font('Arial', 'B', 11)
-        self.cell(40, 7, "Tipo Pensión:", 0, 0)
-        self.set_font('Arial', '', 11)
-        self.cell(0, 7, self.header_data.get('tipo_pension', 'No encontrado').encode('latin-1', 'replace').decode('latin-1'), 0, 1)
+        print_label_rows(self, [
+            ("Consultante:", self.header_data.get('nombre', 'N/A')),
+            ("RUT:", str(self.header_data.get('rut', 'N/A'))),
+            ("Saldo Acumulado:", str(self.header_data.get('saldo_uf', 'No encontrado'))),
+            ("N° SCOMP:", str(self.header_data.get('n_scomp', 'No encontrado'))),
+            ("Tipo Pensión:", self.header_data.get('tipo_pension', 'No encontrado')),
+        ])
 
         # Imprimir Beneficiarios
         self.ln(5)
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 7, "Beneficiarios", 0, 1, 'L')
-        self.set_font('Arial', '', 10)
+        self.set_font(PDF_FUENTE, 'B', 12)
+        self.cell(0, 7, "Beneficiarios", border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
+        self.set_font(PDF_FUENTE, '', 10)
         
         for i, b in enumerate(self.beneficiarios_ordenados):
             line = f"{i + 1}) {b['nombre']} ({b['parentesco']})"
-            self.cell(0, 6, line.encode('latin-1', 'replace').decode('latin-1'), 0, 1)
+            self.cell(0, 6, line, border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         self.ln(8)
 
     def print_table_sobrevivencia(self, title, df, tipo):
-        safe_title = title.encode('latin-1', 'replace').decode('latin-1')
-        
-        self.set_font('Arial', 'B', 12)
+        self.set_font(PDF_FUENTE, 'B', 12)
         self.set_fill_color(230, 230, 230)
-        self.cell(0, 8, safe_title, 1, 1, 'C', fill=True)
-        
-        self.set_font('Arial', 'B', 8) 
-        row_height = 7
-        usable_width = self.w - self.l_margin - self.r_margin 
+        self.cell(0, 8, title, border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C', fill=True)
         
         if tipo == 'RP_SOBREVIVENCIA':
-            cols = ["Beneficiario", "Pension_UF", "Pension_Bruta", "Dscto_Salud_7%", "Dscto_Comision", "Pension_Liquida"]
-            widths = [usable_width * 0.30] + [usable_width * 0.14] * 5 
-            
-            for i, col_name in enumerate(cols):
-                self.cell(widths[i], row_height, col_name, 1, 0, 'C')
-            self.ln()
-            
-            self.set_font('Arial', '', 8)
-            for _, row in df.iterrows():
-                is_total = (row['Beneficiario'] == 'Pensión mensual total')
-                if is_total:
-                    self.set_font('Arial', 'B', 8) 
-                
-                self.cell(widths[0], row_height, str(row['Beneficiario']).encode('latin-1', 'replace').decode('latin-1'), 1, 0, 'L')
-                self.cell(widths[1], row_height, str(row['Pension_UF']), 1, 0, 'R')
-                self.cell(widths[2], row_height, f"${row['Pension_Bruta']:,.0f}", 1, 0, 'R')
-                self.cell(widths[3], row_height, f"(${row['Dscto_Salud_7%']:,.0f})", 1, 0, 'R')
-                self.cell(widths[4], row_height, f"(${row['Dscto_Comision']:,.0f})", 1, 0, 'R')
-                self.cell(widths[5], row_height, f"${row['Pension_Liquida']:,.0f}", 1, 1, 'R')
-                
-                if is_total:
-                    self.set_font('Arial', '', 8)
+            # La fila de totales va en negrita
+            negritas = (df['Beneficiario'] == 'Pensión mensual total').to_numpy()
+            render_table(self, COLUMNAS_PDF_RP_SOBREVIVENCIA, df, font_size=8, negritas=negritas)
 
         elif tipo == 'RV_SOBREVIVENCIA':
-            cols = ["Compañía"]
-            num_benef = len(self.beneficiarios_ordenados)
-            for i in range(num_benef):
-                cols.extend([f"Benef. {i+1} UF", f"Benef. {i+1} $"])
-            cols.extend(["Total Bruto", "Total Líquido"])
-
-            num_benef_cols = num_benef * 2
-            
-            width_compania = usable_width * 0.20
-            width_totales = usable_width * 0.12
-            width_benef_cols = (usable_width - width_compania - (width_totales * 2)) / num_benef_cols if num_benef_cols > 0 else 0
-            
-            widths = [width_compania]
-            for i in range(num_benef_cols):
-                widths.append(width_benef_cols)
-            widths.extend([width_totales, width_totales])
-            
-            # Imprimir cabeceras
-            for i, col_name in enumerate(cols):
-                self.cell(widths[i], row_height, col_name.encode('latin-1', 'replace').decode('latin-1'), 1, 0, 'C')
-            self.ln()
-            
-            # Imprimir filas
-            self.set_font('Arial', '', 8)
-            for _, row in df.iterrows():
-                for i, col_name in enumerate(df.columns): 
-                    align = 'L' if i == 0 else 'R'
-                    cell_value = row[col_name]
-                    
-                    if isinstance(cell_value, (int, float)):
-                        cell_text = f"${cell_value:,.0f}"
-                    else:
-                        cell_text = str(cell_value).encode('latin-1', 'replace').decode('latin-1')
-                        
-                    self.cell(widths[i], row_height, cell_text, 1, 0, align)
-                self.ln()
+            render_table(self, columnas_rv_sobrevivencia(df, len(self.beneficiarios_ordenados)), df, font_size=8)
         
         self.ln(10) 
 
-def create_formatted_excel_report(header_data, processed_tables, beneficiarios=None):
-    output = io.BytesIO()
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Reporte SCOMP"
-
-    # --- Definir Estilos ---
-    style_header_title = Font(name='Arial', size=14, bold=True)
-    style_table_title_fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-    style_table_title_font = Font(name='Arial', size=12, bold=True)
-    style_table_title_align = Alignment(horizontal='center', vertical='center')
-    style_table_header_font = Font(name='Arial', size=10, bold=True)
-    style_table_header_align = Alignment(horizontal='center')
-    style_bold_text = Font(name='Arial', size=10, bold=True)
-    
+def build_pdf_vejez(header_data, processed_tables):
+    """
+    Genera el PDF completo de Vejez/Invalidez y retorna sus bytes.
+    """
+    pdf = PDFReportVejez(orientation='L', unit='mm', format='A4')
+    pdf.add_page()
+    pdf.print_header_data(header_data)
+    for item in processed_tables:
+        if not item['tabla'].empty:
+            pdf.print_table(item['titulo'], item['tabla'], item['tipo'], item['col_title_pdf'], item.get('eld_info'), header_data.get('valor_uf_float', 0.0))
+    return bytes(pdf.output())
+
+def build_pdf_sobrevivencia(header_data, processed_tables, beneficiarios):
+    """
+    Genera el PDF completo de Sobrevivencia y retorna sus bytes.
+    """
+    pdf = PDFReportSobrevivencia(orientation='L', unit='mm', format='A4')
+    pdf.set_header_data(header_data, beneficiarios)
+    pdf.add_page()
+    pdf.print_header_data_sobrevivencia()
+    for item in processed_tables:
+        if not item['tabla'].empty:
+            pdf.print_table_sobrevivencia(item['titulo'], item['tabla'], item['tipo'])
+    return bytes(pdf.output())
+
+# --- Excel ---
+# Palabras en el nombre de una columna que indican montos en pesos
+CLAVES_COLUMNA_PESOS = ("$", "Bruta", "Líquida", "Dscto", "Total")
+EXCEL_ANCHO_MAXIMO = 40
+
+EXCEL_HEADER_MAP = {
+    "nombre": "Consultante/Afiliado",
+    "rut": "RUT",
+    "tipo_pension": "Tipo Pensión",
+    "saldo_uf": "Saldo Acumulado",
+    "n_scomp": "N° SCOMP",
+    "valor_uf_str": "Valor UF"
+}
+
+def _add_named_styles(wb):
+    """
+    Registra en el libro los estilos con nombre de moneda y UF (con bordes).
+    """
     thin_border_side = Side(border_style="thin", color="000000")
     style_table_border = Border(top=thin_border_side, left=thin_border_side, right=thin_border_side, bottom=thin_border_side)
 
     # Estilo de moneda CON bordes
-    style_currency = NamedStyle(name='currency_style', number_format='$#,##0') 
+    style_currency = NamedStyle(name='currency_style', number_format='$#,##0')
     style_currency.border = style_table_border
     if 'currency_style' not in wb.style_names:
         wb.add_named_style(style_currency)
-        
+
     # Estilo UF CON bordes
     style_uf = NamedStyle(name='uf_style', number_format='0.00')
     style_uf.border = style_table_border
     if 'uf_style' not in wb.style_names:
         wb.add_named_style(style_uf)
-    
-    current_row = 1
 
-    # --- 1. Escribir Header Data ---
-    ws[f'A{current_row}'] = "Resultado Resumen de Scomp"
-    ws[f'A{current_row}'].font = style_header_title
-    current_row += 2
-    
-    header_map = {
-        "nombre": "Consultante/Afiliado",
-        "rut": "RUT",
-        "tipo_pension": "Tipo Pensión",
-        "saldo_uf": "Saldo Acumulado",
-        "n_scomp": "N° SCOMP",
-        "valor_uf_str": "Valor UF"
-    }
-    
-    for key, label in header_map.items():
-        ws[f'A{current_row}'] = label
-        ws[f'A{current_row}'].font = style_bold_text
-        ws[f'B{current_row}'] = header_data.get(key, 'N/A')
-        current_row += 1
-    
-    current_row += 1 
+def excel_styles(ws):
+    """
+    Estilos compartidos del reporte. Cada uno se arma una vez como celda modelo;
+    las celdas del reporte copian su arreglo de estilo en vez de volver a asignar
+    (y registrar en el libro) fuentes, bordes y rellenos una por una.
+    Sirven para cualquier hoja del mismo libro.
+    """
+    _add_named_styles(ws.parent)
 
-    # --- 2. Escribir Beneficiarios (si existen) ---
-    if beneficiarios:
-        ws[f'A{current_row}'] = "Beneficiarios"
-        ws[f'A{current_row}'].font = style_header_title
-        current_row += 1
-        
-        headers = ["ID", "Nombre", "RUT", "Parentesco"]
-        for c_idx, header_title in enumerate(headers):
-            cell = ws.cell(row=current_row, column=c_idx + 1, value=header_title)
-            cell.font = style_table_header_font
-            cell.border = style_table_border
-            cell.alignment = style_table_header_align
-        current_row += 1
+    thin_border_side = Side(border_style="thin", color="000000")
+    style_table_border = Border(top=thin_border_side, left=thin_border_side, right=thin_border_side, bottom=thin_border_side)
 
+    definiciones = {
+        'titulo_reporte': {'font': Font(name='Arial', size=14, bold=True)},
+        'titulo_tabla': {
+            'fill': PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid"),
+            'font': Font(name='Arial', size=12, bold=True),
+            'alignment': Alignment(horizontal='center', vertical='center'),
+        },
+        'cabecera': {
+            'font': Font(name='Arial', size=10, bold=True),
+            'alignment': Alignment(horizontal='center'),
+            'border': style_table_border,
+        },
+        'negrita': {'font': Font(name='Arial', size=10, bold=True)},
+        'borde': {'border': style_table_border},
+        'pesos': {'style': 'currency_style'},
+        'uf': {'style': 'uf_style'},
+    }
+    estilos = {}
+    for nombre, atributos in definiciones.items():
+        modelo = WriteOnlyCell(ws)
+        for atributo, valor in atributos.items():
+            setattr(modelo, atributo, valor)
+        estilos[nombre] = modelo._style
+    return estilos
+
+def _celda(ws, valor, estilo):
+    cell = WriteOnlyCell(ws, value=valor)
+    cell._style = copy(estilo)
+    return cell
+
+def _excel_table_columns(item):
+    """
+    Columnas de una tabla tal como van al Excel: lista de (cabecera, valores).
+    En RP_SOBREVIVENCIA se incluye el índice (con la fila de totales) como
+    primera columna, sin cabecera.
+    """
+    df_table = item['tabla']
+    if 'Comision_Pct' in df_table.columns:
+        df_table = df_table.drop(columns=['Comision_Pct'])
+
+    columnas = [(nombre, df_table[nombre]) for nombre in df_table.columns]
+    if item.get('tipo') == 'RP_SOBREVIVENCIA':
+        columnas.insert(0, (None, pd.Series(df_table.index, index=df_table.index)))
+    return columnas
+
+def _es_numerica(valores):
+    return pd.api.types.is_numeric_dtype(valores.dtype) and not pd.api.types.is_bool_dtype(valores.dtype)
+
+def _excel_text_lengths(nombre, valores):
+    """
+    Largo máximo (en caracteres) de la columna formateada como se ve en el Excel.
+    """
+    if len(valores) == 0:
+        return 0
+    if _es_numerica(valores):
+        # El texto más largo es el del mayor o el del menor valor (por el signo):
+        # basta con reducir la columna y formatear esos dos
+        arr = valores.to_numpy(dtype="float64")
+        fmt = "{:.2f}" if "UF" in (nombre or "") else "${:,.0f}"
+        nulos = np.isnan(arr)
+        extremos = [] if nulos.all() else [np.nanmax(arr), np.nanmin(arr)]
+        if nulos.any():
+            extremos.append(np.nan)
+        return max(len(fmt.format(v)) for v in extremos)
+    return int(valores.astype(str).str.len().max())
+
+def excel_column_widths(processed_tables):
+    """
+    Ancho de cada columna (por letra) a partir de los valores de todas las tablas,
+    calculado por columna completa. Las columnas deben fijarse antes de escribir
+    filas en una hoja de sólo escritura.
+    """
+    largos = {}
+    for item in processed_tables:
+        for c_idx, (nombre, valores) in enumerate(_excel_table_columns(item)):
+            largo = max(len(str(nombre)), _excel_text_lengths(nombre, valores))
+            letra = get_column_letter(c_idx + 1)
+            largos[letra] = max(largos.get(letra, 0), largo)
+    return {letra: min((largo + 2) * 1.2, EXCEL_ANCHO_MAXIMO) for letra, largo in largos.items()}
+
+def _data_style(nombre, valores, estilos):
+    """
+    Estilo de las celdas de datos de una columna: moneda o UF para columnas
+    numéricas según su nombre, si no sólo el borde.
+    """
+    if _es_numerica(valores):
+        nombre = nombre or ""
+        if any(clave in nombre for clave in CLAVES_COLUMNA_PESOS):
+            return estilos['pesos']
+        if "UF" in nombre:
+            return estilos['uf']
+    return estilos['borde']
+
+def _eld_note(item, header_data):
+    eld_info = item.get('eld_info')
+    if not (eld_info and eld_info.get("monto_pesos") is not None and eld_info.get("monto_pesos", 0) > 0):
+        return None
+    if item.get('tipo') == 'RP':
+        monto_uf = eld_info.get("monto_uf", "N/A")
+        monto_pesos = eld_info.get("monto_pesos", 0)
+        p_uf = eld_info.get("pension_resultante_uf", "N/A")
+        p_uf_float = clean_number(p_uf)
+        p_pesos_calculados = p_uf_float * header_data.get('valor_uf_float', 0.0)
+        return f"Opción ELD: Monto {monto_uf} UF (${monto_pesos:,.0f}) con Pensión resultante: {p_uf} UF (${p_pesos_calculados:,.0f})"
+    if item.get('tipo') in ['RV', 'RV_Aumentada', 'REF', 'RT']:
+        compania = eld_info.get("compania", "N/A")
+        monto = eld_info.get("monto_pesos", 0)
+        return f"Mejor Oferta ELD: {compania} con ${monto:,.0f} pesos."
+    return ""
+
+def _report_rows(ws, header_data, processed_tables, beneficiarios, estilos):
+    """
+    Genera las filas del reporte de un cliente, en orden, para ws.append.
+    Las celdas combinadas de los títulos se registran en `ws` a medida que avanza.
+    """
+    fila_actual = 1
+
+    # --- 1. Header Data ---
+    yield [_celda(ws, "Resultado Resumen de Scomp", estilos['titulo_reporte'])]
+    yield []
+    fila_actual += 2
+
+    for key, label in EXCEL_HEADER_MAP.items():
+        yield [_celda(ws, label, estilos['negrita']), header_data.get(key, 'N/A')]
+        fila_actual += 1
+    yield []
+    fila_actual += 1
+
+    # --- 2. Beneficiarios (si existen) ---
+    if beneficiarios:
+        yield [_celda(ws, "Beneficiarios", estilos['titulo_reporte'])]
+        yield [_celda(ws, titulo, estilos['cabecera']) for titulo in ("ID", "Nombre", "RUT", "Parentesco")]
+        fila_actual += 2
         for i, b in enumerate(beneficiarios):
-            cellA = ws.cell(row=current_row, column=1, value=f"Benef. {i+1}")
-            cellB = ws.cell(row=current_row, column=2, value=b.get('nombre'))
-            cellC = ws.cell(row=current_row, column=3, value=b.get('rut'))
-            cellD = ws.cell(row=current_row, column=4, value=b.get('parentesco'))
-            
-            for cell in [cellA, cellB, cellC, cellD]:
-                cell.border = style_table_border
-            current_row += 1
-        current_row += 1 
+            valores = (f"Benef. {i+1}", b.get('nombre'), b.get('rut'), b.get('parentesco'))
+            yield [_celda(ws, valor, estilos['borde']) for valor in valores]
+            fila_actual += 1
+        yield []
+        fila_actual += 1
 
-    # --- 3. Escribir cada tabla de modalidad ---
-    column_widths = {}
-    
+    # --- 3. Tablas de modalidad ---
     for item in processed_tables:
-        df_table = item['tabla']
-        title = item['titulo']
-        
-        if 'Comision_Pct' in df_table.columns:
-            df_table = df_table.drop(columns=['Comision_Pct'])
-        
-        # Escribir Título de la tabla y Combinar Celdas
-        num_cols = len(df_table.columns)
-        if item.get('tipo') == 'RP_SOBREVIVENCIA':
-             num_cols += 1
-            
-        ws[f'A{current_row}'] = title
-        ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=num_cols)
-        cell_title = ws[f'A{current_row}']
-        cell_title.fill = style_table_title_fill
-        cell_title.font = style_table_title_font
-        cell_title.alignment = style_table_title_align
-        current_row += 1
-        
-        # Escribir filas de la tabla (con cabeceras)
-        include_index = (item.get('tipo') == 'RP_SOBREVIVENCIA')
-        
-        rows = list(dataframe_to_rows(df_table, index=include_index, header=True))
-        
-        header_names = rows[0]
-
-        for r_idx, row in enumerate(rows):
-            for c_idx, value in enumerate(row):
-                cell = ws.cell(row=current_row + r_idx, column=c_idx + 1, value=value)
-                
-                cell.border = style_table_border
-                
-                col_letter = cell.column_letter
-                current_width = column_widths.get(col_letter, 0)
-                
-                value_str = ""
-                if isinstance(value, (int, float)):
-                    if "UF" in (header_names[c_idx] or ""):
-                        value_str = f"{value:.2f}"
-                    else:
-                        value_str = f"${value:,.0f}"
-                else:
-                    value_str = str(value)
-                
-                value_length = len(value_str)
-                header_length = len(str(header_names[c_idx]))
-                
-                column_widths[col_letter] = max(current_width, value_length, header_length)
-                
-                if r_idx == 0: # Cabecera
-                    cell.font = style_table_header_font
-                    cell.alignment = style_table_header_align
-                else: # Datos
-                    if isinstance(value, (int, float)):
-                        col_name = header_names[c_idx] if c_idx < len(header_names) else ""
-                        if col_name is None: col_name = ""
-                        
-                        if "$" in col_name or "Bruta" in col_name or "Líquida" in col_name or "Dscto" in col_name or "Total" in col_name:
-                            cell.style = 'currency_style'
-                        elif "UF" in col_name:
-                            cell.style = 'uf_style'
-        
-        current_row += len(rows) 
+        columnas = _excel_table_columns(item)
 
-        # 4. Escribir nota ELD si existe
-        eld_info = item.get('eld_info')
-        if eld_info and eld_info.get("monto_pesos") is not None and eld_info.get("monto_pesos", 0) > 0:
-            note_text = ""
-            if item.get('tipo') == 'RP':
-                monto_uf = eld_info.get("monto_uf", "N/A")
-                monto_pesos = eld_info.get("monto_pesos", 0)
-                p_uf = eld_info.get("pension_resultante_uf", "N/A")
-                p_uf_float = clean_number(p_uf)
-                p_pesos_calculados = p_uf_float * header_data.get('valor_uf_float', 0.0)
-                note_text = f"Opcion ELD: Monto {monto_uf} UF (${monto_pesos:,.0f}) con Pension resultante: {p_uf} UF (${p_pesos_calculados:,.0f})"
-            
-            elif item.get('tipo') in ['RV', 'RV_Aumentada', 'REF', 'RT']:
-                compania = eld_info.get("compania", "N/A")
-                monto = eld_info.get("monto_pesos", 0)
-                note_text = f"Mejor Oferta ELD: {compania} con ${monto:,.0f} pesos."
+        # Título de la tabla en celdas combinadas
+        yield [_celda(ws, item['titulo'], estilos['titulo_tabla'])]
+        ws.merged_cells.add(CellRange(min_col=1, min_row=fila_actual, max_col=len(columnas), max_row=fila_actual))
+        fila_actual += 1
 
-            current_row += 1 
-            ws[f'A{current_row}'] = note_text
-            ws[f'A{current_row}'].font = style_bold_text
-            current_row += 1
+        yield [_celda(ws, nombre, estilos['cabecera']) for nombre, _ in columnas]
+        fila_actual += 1
+        if item.get('tipo') == 'RP_SOBREVIVENCIA':
+            # Fila con el nombre del índice (vacía), igual que dataframe_to_rows
+            yield [_celda(ws, None, estilos['borde'])]
+            fila_actual += 1
+
+        estilos_datos = [_data_style(nombre, valores, estilos) for nombre, valores in columnas]
+        for fila in zip(*(valores.tolist() for _, valores in columnas)):
+            yield [_celda(ws, valor, estilo) for valor, estilo in zip(fila, estilos_datos)]
+            fila_actual += 1
+
+        # --- 4. Nota ELD si existe ---
+        note_text = _eld_note(item, header_data)
+        if note_text is not None:
+            yield []
+            yield [_celda(ws, note_text, estilos['negrita'])]
+            fila_actual += 2
+
+        yield []
+        yield []
+        fila_actual += 2
+
+def write_scomp_sheet(ws, header_data, processed_tables, beneficiarios=None, estilos=None):
+    """
+    Escribe el reporte de un cliente en una hoja de sólo escritura: fija los
+    anchos de columna y luego envía las filas a medida que se generan.
+    """
+    estilos = estilos or excel_styles(ws)
+    for letra, ancho in excel_column_widths(processed_tables).items():
+        ws.column_dimensions[letra].width = ancho
+    for fila in _report_rows(ws, header_data, processed_tables, beneficiarios, estilos):
+        ws.append(fila)
 
-        current_row += 2 
+def create_formatted_excel_report(header_data, processed_tables, beneficiarios=None):
+    output = io.BytesIO()
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Reporte SCOMP")
+    write_scomp_sheet(ws, header_data, processed_tables, beneficiarios)
+    wb.save(output)
+    return output.getvalue()
 
-    # --- 5. Auto-ajustar columnas ---
-    for col_letter, max_length in column_widths.items():
-        adjusted_width = (max_length + 2) * 1.2
-        ws.column_dimensions[col_letter].width = min(adjusted_width, 40) 
+# --- Libro consolidado (varios clientes) ---
+RESUMEN_CABECERAS = (
+    "Cliente", "RUT", "N° SCOMP", "Tipo Pensión", "Hoja", "Modalidad", "Compañía",
+    "Pensión UF", "Pensión Bruta", "Pensión Líquida", "Pensión + PGU/Bono",
+)
+# Columnas con montos en pesos dentro del resumen
+RESUMEN_COLUMNAS_PESOS = ("Pensión Bruta", "Pensión Líquida", "Pensión + PGU/Bono")
+# Caracteres que Excel no admite en el nombre de una hoja
+RE_HOJA_INVALIDA = re.compile(r'[\[\]:*?/\\]')
+EXCEL_LARGO_HOJA = 31
+
+def _sheet_title(nombre, usados):
+    """
+    Nombre de hoja válido y único (máx. 31 caracteres) a partir del nombre del cliente.
+    """
+    base = RE_HOJA_INVALIDA.sub(" ", str(nombre or "Cliente")).strip() or "Cliente"
+    titulo = base[:EXCEL_LARGO_HOJA]
+    n = 2
+    while titulo.lower() in usados:
+        sufijo = f" ({n})"
+        titulo = base[:EXCEL_LARGO_HOJA - len(sufijo)] + sufijo
+        n += 1
+    usados.add(titulo.lower())
+    return titulo
+
+def best_offer(item, header_data):
+    """
+    Mejor oferta (mayor pensión líquida) de una tabla procesada, como dict con
+    compañía, pensión UF, bruta, líquida y con PGU/Bono. None si la tabla está vacía.
+    """
+    df = item['tabla']
+    if df.empty:
+        return None
+    tipo = item.get('tipo')
+
+    if tipo == 'RP_SOBREVIVENCIA':
+        # La fila de totales resume la pensión del grupo familiar
+        totales = df[df['Beneficiario'] == 'Pensión mensual total']
+        fila = (totales if not totales.empty else df).iloc[-1]
+        compania = header_data.get('afp_origen', '')
+        bruta, liquida, extra = fila['Pension_Bruta'], fila['Pension_Liquida'], None
+    elif tipo == 'RV_SOBREVIVENCIA':
+        fila = df.loc[df['Total Líquido'].idxmax()]
+        compania = fila['Compañía']
+        bruta, liquida, extra = fila['Total Bruto'], fila['Total Líquido'], None
+    else:
+        fila = df.loc[df['Pension_Liquida'].idxmax()]
+        compania = fila.get('Compania', fila.get('Modalidad', ''))
+        col_extra = item.get('col_title_pdf')
+        bruta, liquida = fila['Pension_Bruta'], fila['Pension_Liquida']
+        extra = fila[col_extra] if col_extra in df.columns else None
+
+    return {
+        'compania': compania,
+        'pension_uf': fila.get('Pension_UF'),
+        'pension_bruta': float(bruta),
+        'pension_liquida': float(liquida),
+        'pension_extra': None if extra is None else float(extra),
+    }
 
+def _summary_rows(header_data, processed_tables, hoja):
+    filas = []
+    for item in processed_tables:
+        oferta = best_offer(item, header_data)
+        if oferta is None:
+            continue
+        filas.append((
+            header_data.get('nombre', 'N/A'), header_data.get('rut', 'N/A'), header_data.get('n_scomp', 'N/A'),
+            header_data.get('tipo_pension', 'N/A'), hoja, item['titulo'], oferta['compania'], oferta['pension_uf'],
+            oferta['pension_bruta'], oferta['pension_liquida'], oferta['pension_extra'],
+        ))
+    return filas
+
+def _write_summary_sheet(ws, filas, estilos):
+    anchos = [len(c) for c in RESUMEN_CABECERAS]
+    for fila in filas:
+        anchos = [max(a, len(str(v)) if v is not None else 0) for a, v in zip(anchos, fila)]
+    for c_idx, largo in enumerate(anchos):
+        ws.column_dimensions[get_column_letter(c_idx + 1)].width = min((largo + 2) * 1.2, EXCEL_ANCHO_MAXIMO)
+
+    ws.append([_celda(ws, "Mejores ofertas por modalidad", estilos['titulo_reporte'])])
+    ws.append([])
+    ws.append([_celda(ws, titulo, estilos['cabecera']) for titulo in RESUMEN_CABECERAS])
+    estilos_fila = [estilos['pesos'] if c in RESUMEN_COLUMNAS_PESOS else estilos['borde'] for c in RESUMEN_CABECERAS]
+    for fila in filas:
+        ws.append([_celda(ws, valor, estilo) for valor, estilo in zip(fila, estilos_fila)])
+
+def create_consolidated_excel_report(resultados, destino=None):
+    """
+    Libro con una hoja por cliente (mismo formato que create_formatted_excel_report)
+    y una hoja "Resumen" al inicio con la mejor oferta de cada modalidad.
+    `resultados` puede ser un generador de resultados de process_scomp (dicts con
+    header, tablas y beneficiarios): cada cliente se escribe y se descarta antes
+    de pedir el siguiente, así la memoria no crece con la cantidad de clientes.
+    Si se entrega `destino` (ruta o archivo) se guarda ahí; si no, retorna los bytes.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    usados = {"resumen"}
+    resumen = []
+    estilos = None
+
+    for resultado in resultados:
+        header_data = resultado['header']
+        ws = wb.create_sheet(_sheet_title(header_data.get('nombre'), usados))
+        estilos = estilos or excel_styles(ws)
+        write_scomp_sheet(ws, header_data, resultado['tablas'], resultado.get('beneficiarios'), estilos)
+        resumen.extend(_summary_rows(header_data, resultado['tablas'], ws.title))
+
+    # El resumen se arma al final (sólo guarda una fila por modalidad) y queda primero
+    ws_resumen = wb.create_sheet("Resumen", 0)
+    _write_summary_sheet(ws_resumen, resumen, estilos or excel_styles(ws_resumen))
+
+    if destino is not None:
+        wb.save(destino)
+        return None
+    output = io.BytesIO()
     wb.save(output)
     return output.getvalue()
@@ -0,0 +1,456 @@
+import re
+
+from config.settings import (
+    PORCENTAJES_SOBREVIVENCIA, GEMINI_EXTRACCION_PARALELA, GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO
+)
+from services.gemini_api import analyze_scomp_with_gemini
+from services.metrics import get_metrics
+from services.page_filter import prepare_text_for_llm
+from utils.helpers import clean_number, normalize_text
+
+AFP_NOMBRES = ("CAPITAL", "CUPRUM", "HABITAT", "MODELO", "PLANVITAL", "PROVIDA", "UNO")
+
+RE_PAGINA = re.compile(r'^--- PÁGINA \d+ ---$')
+RE_NUMERO = re.compile(r'^\$?-?\d[\d.]*(?:,\d+)?%?$')
+RE_RUT = re.compile(r'\d{1,2}\.\d{3}\.\d{3}-[\dkK]')
+RE_MONTO = re.compile(r'\d,\d{2}\b|\d\.\d{3}\b')
+
+
+def _to_int(token):
+    return int(round(clean_number(token.replace(" ", ""))))
+
+
+def _split_fila(linea):
+    """
+    Separa una línea de tabla en (etiqueta, [tokens numéricos]).
+    Los números se leen desde el final; el resto es la etiqueta.
+    """
+    tokens = linea.split()
+    numeros = []
+    while tokens and (RE_NUMERO.match(tokens[-1]) or tokens[-1] == "$"):
+        tok = tokens.pop()
+        if tok != "$":
+            numeros.insert(0, tok)
+    # Quitar número de ranking al inicio ("1 CONSORCIO VIDA ...")
+    if len(tokens) > 1 and re.fullmatch(r'\d+[.)]?', tokens[0]):
+        tokens = tokens[1:]
+    return " ".join(tokens).strip(), numeros
+
+
+def _parse_oferta(linea):
+    """
+    Fila simple de ofertas: Compañía, Pensión UF, Pensión $.
+    """
+    compania, numeros = _split_fila(linea)
+    if not compania or len(numeros) != 2 or "," not in numeros[0]:
+        return None
+    return [compania, numeros[0].lstrip("$"), _to_int(numeros[1])]
+
+
+def _parse_oferta_beneficiarios(linea, n_benef, con_total):
+    """
+    Fila de Sobrevivencia: Compañía, pares (UF, $) por beneficiario y total opcional.
+    """
+    compania, numeros = _split_fila(linea)
+    esperado = n_benef * 2 + (1 if con_total else 0)
+    if not compania or n_benef == 0 or len(numeros) != esperado:
+        return None
+    oferta = {
+        "compania": compania,
+        "ofertas_beneficiarios": [
+            [numeros[i], _to_int(numeros[i + 1])] for i in range(0, n_benef * 2, 2)
+        ]
+    }
+    if con_total:
+        oferta["pension_total_pesos"] = _to_int(numeros[-1])
+    return oferta
+
+
+def _lineas(text):
+    return [l.strip() for l in text.splitlines() if l.strip() and not RE_PAGINA.match(l.strip())]
+
+
+def _clasificar_titulo(norm):
+    if "INFORMACION BENEFICIARIOS" in norm or "INFORMACION DE BENEFICIARIOS" in norm:
+        return "BENEF"
+    if "PENSION DE REFERENCIA GARANTIZADA POR LEY" in norm:
+        return "REF"
+    if "MONTO DE PENSION MENSUAL DURANTE EL PRIMER ANO" in norm:
+        return "RP"
+    if "RENTA TEMPORAL CON RENTA VITALICIA DIFERIDA" in norm:
+        return "RT"
+    if "RENTA VITALICIA INMEDIATA" in norm:
+        return "RV_ELD" if "CON RETIRO DE EXCEDENTE" in norm else "RV"
+    if "RENTA VITALICIA DIFERIDA" in norm:
+        return "RVD_ELD" if "CON RETIRO DE EXCEDENTE" in norm else "RVD"
+    if "EXCEDENTE DE LIBRE DISPOSICION" in norm and "RETIRO DE EXCEDENTE" not in norm:
+        return "ELD_RP"
+    return None
+
+
+def _dividir_secciones(lineas):
+    """
+    Retorna una lista de (tipo, titulo_original, [lineas_cuerpo]) en orden de aparición.
+    Los títulos de renta vitalicia que vienen cortados en dos líneas se unen.
+    """
+    bloques = []
+    actual = ("INICIO", "", [])
+    i = 0
+    while i < len(lineas):
+        linea = lineas[i]
+        norm = normalize_text(linea)
+        if "RENTA VITALICIA" in norm and "RETIRO DE EXCEDENTE" not in norm and "RENTA TEMPORAL" not in norm:
+            for j in range(i + 1, min(i + 3, len(lineas))):
+                if "RETIRO DE EXCEDENTE" in normalize_text(lineas[j]):
+                    linea = " ".join(lineas[i:j + 1])
+                    norm = normalize_text(linea)
+                    i = j
+                    break
+        tipo = _clasificar_titulo(norm)
+        if tipo:
+            bloques.append(actual)
+            actual = (tipo, linea, [])
+        else:
+            actual[2].append(linea)
+        i += 1
+    bloques.append(actual)
+    return bloques
+
+
+def _buscar(patron, texto):
+    m = re.search(patron, texto, re.IGNORECASE | re.MULTILINE)
+    return m.group(1).strip() if m else None
+
+
+def _parse_header(text, norm_text):
+    header = {
+        "nombre": _buscar(r'^(?:Nombre|Datos del (?:afiliado|consultante))\s*:\s*(.+?)(?:\s+R\.?U\.?T\.?\s*:.*)?$', text),
+        "rut": _buscar(r'R\.?U\.?T\.?\s*:?\s*(' + RE_RUT.pattern + ')', text),
+        "tipo_pension": None,
+        "n_scomp": _buscar(r'C[óo]digo (?:de )?consulta\s*:?\s*([\w-]+)', text),
+        "saldo_uf": _buscar(r'EL SALDO DESTINADO A PENSI[ÓO]N ES\s*:?\s*(?:UF\s*)?([\d.]+,\d+)', text),
+        "valor_uf_str": _buscar(r'Valor UF a fecha emisi[óo]n\s*:?\s*(\$?\s*[\d.]+,\d+)', text),
+        "valor_uf_float": 0,
+        "afp_origen": None,
+    }
+    tipo = re.search(r'PENSION DE (VEJEZ ANTICIPADA|VEJEZ|INVALIDEZ|SOBREVIVENCIA)', norm_text)
+    if tipo:
+        header["tipo_pension"] = "PENSIÓN DE " + tipo.group(1)
+    if header["valor_uf_str"]:
+        header["valor_uf_float"] = clean_number(header["valor_uf_str"])
+    afp = re.search(r'AFP(?: DE ORIGEN| DEL (?:AFILIADO|CAUSANTE))?\s*:\s*(?:AFP\s+)?(' + "|".join(AFP_NOMBRES) + r')\b', norm_text)
+    if afp:
+        header["afp_origen"] = "AFP " + afp.group(1)
+
+    requeridos = ("nombre", "rut", "tipo_pension", "saldo_uf", "valor_uf_str", "afp_origen")
+    return header, all(header[k] for k in requeridos)
+
+
+def _parse_beneficiarios(bloques):
+    beneficiarios = []
+    for tipo, _, cuerpo in bloques:
+        if tipo != "BENEF":
+            continue
+        for linea in cuerpo:
+            m = RE_RUT.search(linea)
+            if not m:
+                continue
+            nombre = linea[:m.start()].strip()
+            parentesco = linea[m.end():].strip()
+            if nombre and parentesco:
+                beneficiarios.append({"nombre": nombre, "rut": m.group(0), "parentesco": parentesco})
+    parentescos = {normalize_text(p) for p in PORCENTAJES_SOBREVIVENCIA}
+    confiable = bool(beneficiarios) and all(normalize_text(b["parentesco"]) in parentescos for b in beneficiarios)
+    return beneficiarios, confiable
+
+
+def _columnas_afp(cuerpo):
+    for linea in cuerpo:
+        nombres = [t for t in normalize_text(linea).replace("AFP", " ").split() if t in AFP_NOMBRES]
+        if len(nombres) >= 3:
+            return nombres
+    return []
+
+
+def _fila_afp(cuerpo, prefijo, columnas, idx, ancho=1):
+    """
+    Busca la fila cuya etiqueta empieza con `prefijo` y retorna los `ancho`
+    valores de la columna `idx`.
+    """
+    for linea in cuerpo:
+        etiqueta, numeros = _split_fila(linea)
+        if normalize_text(etiqueta).startswith(prefijo) and len(numeros) == len(columnas) * ancho:
+            return numeros[idx * ancho:(idx + 1) * ancho]
+    return None
+
+
+def _parse_retiro_programado(bloques, afp_origen, es_sobrevivencia, beneficiarios):
+    cuerpo = [l for tipo, _, c in bloques if tipo in ("RP", "ELD_RP") for l in c]
+    tiene_eld = any(tipo == "ELD_RP" for tipo, _, _ in bloques)
+    columnas = _columnas_afp(cuerpo)
+    afp = normalize_text(afp_origen or "").replace("AFP", "").strip()
+    if not cuerpo or afp not in columnas:
+        return {}, False
+    idx = columnas.index(afp)
+
+    comision = _fila_afp(cuerpo, "COMISION", columnas, idx)
+    if comision is None:
+        nota = next((l for l in cuerpo if l.startswith("(a)")), "")
+        m = re.search(r'(\d+,\d+)\s*%', nota)
+        comision = [m.group(1)] if m else None
+    if comision is None:
+        return {}, False
+    rp = {"comision_pct": clean_number(comision[0].rstrip("%"))}
+
+    if es_sobrevivencia:
+        total = _fila_afp(cuerpo, "PENSION MENSUAL TOTAL", columnas, idx, ancho=2)
+        filas = []
+        for b in beneficiarios:
+            valores = _fila_afp(cuerpo, normalize_text(b["nombre"]), columnas, idx, ancho=2)
+            if valores:
+                filas.append([b["nombre"], valores[0], _to_int(valores[1])])
+        if total is None or len(filas) != len(beneficiarios):
+            return {}, False
+        rp.update({
+            "pension_total_uf": total[0],
+            "pension_total_pesos": _to_int(total[1]),
+            "pensiones_beneficiarios": filas,
+        })
+        return rp, True
+
+    uf = _fila_afp(cuerpo, "PENSION MENSUAL (UF)", columnas, idx)
+    pesos = _fila_afp(cuerpo, "PENSION MENSUAL ($)", columnas, idx)
+    if uf is None or pesos is None:
+        return {}, False
+    rp.update({"pension_uf": uf[0], "pension_bruta": _to_int(pesos[0]), "eld_oferta": None})
+
+    if tiene_eld:
+        eld_uf = _fila_afp(cuerpo, "MONTO EXCEDENTE (UF)", columnas, idx)
+        eld_pesos = _fila_afp(cuerpo, "MONTO EXCEDENTE ($)", columnas, idx)
+        res_uf = _fila_afp(cuerpo, "PENSION RESULTANTE (UF)", columnas, idx)
+        res_pesos = _fila_afp(cuerpo, "PENSION RESULTANTE ($)", columnas, idx)
+        if None in (eld_uf, eld_pesos, res_uf, res_pesos):
+            return {}, False
+        rp["eld_oferta"] = {
+            "monto_uf": eld_uf[0],
+            "monto_pesos": _to_int(eld_pesos[0]),
+            "pension_resultante_uf": res_uf[0],
+            "pension_resultante_pesos": _to_int(res_pesos[0]),
+        }
+    return rp, True
+
+
+def _parse_tabla_ofertas(cuerpo, es_sobrevivencia, n_benef, con_total=True, permitir_vacia=False):
+    """
+    Lee las filas de ofertas de un bloque. Retorna (ofertas, confiable).
+    Una fila con texto y números que no calza con el formato esperado
+    invalida el bloque completo. Un bloque sin filas sólo es confiable
+    con `permitir_vacia` (el título de la sección sí se encontró).
+    """
+    ofertas = []
+    for linea in cuerpo:
+        # Encabezados/pies de página repetidos ("Código consulta: ...", RUT, fechas)
+        if ":" in linea or RE_RUT.search(linea):
+            continue
+        etiqueta, numeros = _split_fila(linea)
+        if not numeros or not etiqueta:
+            # Una línea con montos que no se pudo separar es una fila mal leída
+            if RE_MONTO.search(linea):
+                return ofertas, False
+            continue
+        if es_sobrevivencia:
+            oferta = _parse_oferta_beneficiarios(linea, n_benef, con_total)
+        else:
+            oferta = _parse_oferta(linea)
+        if oferta is None:
+            return ofertas, False
+        ofertas.append(oferta)
+    return ofertas, bool(ofertas) or permitir_vacia
+
+
+def _mejor_eld(cuerpo):
+    """
+    Tabla CON RETIRO DE EXCEDENTE: Compañía, Pensión UF, Pensión $, Excedente UF, Excedente $.
+    Retorna la oferta con mayor excedente en pesos.
+    """
+    mejor = None
+    for linea in cuerpo:
+        # Encabezados/pies de página repetidos, igual que en _parse_tabla_ofertas
+        if ":" in linea or RE_RUT.search(linea):
+            continue
+        compania, numeros = _split_fila(linea)
+        if not compania or not numeros:
+            continue
+        if len(numeros) != 4:
+            return None, False
+        eld = {
+            "compania": compania,
+            "pension_uf": numeros[0],
+            "pension_pesos": _to_int(numeros[1]),
+            "monto_uf": numeros[2],
+            "monto_pesos": _to_int(numeros[3]),
+        }
+        if mejor is None or eld["monto_pesos"] > mejor["monto_pesos"]:
+            mejor = eld
+    return mejor, mejor is not None
+
+
+def _int_titulo(patron, norm):
+    m = re.search(patron, norm)
+    return int(m.group(1)) if m else 0
+
+
+def _parse_rentas_vitalicias(bloques, es_sobrevivencia, n_benef):
+    modalidades = []
+    confiable = True
+    for tipo, titulo, cuerpo in bloques:
+        norm = normalize_text(titulo)
+        if tipo == "RV":
+            ofertas, ok = _parse_tabla_ofertas(cuerpo, es_sobrevivencia, n_benef)
+            confiable = confiable and ok
+            modalidades.append({
+                "titulo": titulo,
+                "porcentaje_aumento": _int_titulo(r'AUMENTO\D*?(\d+)\s*%', norm),
+                "meses_aumento": _int_titulo(r'AUMENTO.*?(\d+)\s*MESES', norm),
+                "meses_garantizados": _int_titulo(r'GARANTIZADO\D*?(\d+)\s*MESES', norm),
+                "ofertas": ofertas,
+                "eld_info": None,
+            })
+        elif tipo == "RV_ELD" and modalidades and not es_sobrevivencia:
+            eld, ok = _mejor_eld(cuerpo)
+            confiable = confiable and ok
+            modalidades[-1]["eld_info"] = eld
+    return modalidades, confiable and bool(modalidades)
+
+
+def _parse_renta_temporal(bloques, es_sobrevivencia, n_benef):
+    modalidades = []
+    confiable = True
+    diferido = 0
+    factor = None
+    for tipo, titulo, cuerpo in bloques:
+        norm = normalize_text(titulo)
+        if tipo == "RT":
+            contexto = normalize_text(" ".join([titulo] + cuerpo))
+            diferido = _int_titulo(r'DIFERID[OA]\D*?(\d+)\s*MESES', contexto)
+            m = re.search(r'FACTOR[^\d]*(\d+(?:,\d+)?)', contexto)
+            factor = clean_number(m.group(1)) if m else None
+        elif tipo == "RVD":
+            ofertas, ok = _parse_tabla_ofertas(cuerpo, es_sobrevivencia, n_benef)
+            confiable = confiable and ok and factor is not None
+            modalidades.append({
+                "titulo": titulo,
+                "periodo_diferido_meses": _int_titulo(r'DIFERID[OA]\D*?(\d+)\s*MESES', norm) or diferido,
+                "factor_renta_temporal": factor if factor is not None else 1.0,
+                "meses_garantizados": _int_titulo(r'GARANTIZADO\D*?(\d+)\s*MESES', norm),
+                "ofertas_rvd": ofertas,
+                "eld_info": None,
+            })
+        elif tipo == "RVD_ELD" and modalidades and not es_sobrevivencia:
+            eld, ok = _mejor_eld(cuerpo)
+            confiable = confiable and ok
+            modalidades[-1]["eld_info"] = eld
+    tiene_rt = any(tipo == "RT" for tipo, _, _ in bloques)
+    if tiene_rt and not modalidades:
+        confiable = False
+    return modalidades, confiable
+
+
+def parse_scomp_text(text):
+    """
+    Parser determinístico del texto de un SCOMP (salida de extract_text_from_pdf).
+    Retorna (datos, secciones_pendientes): `datos` tiene la misma forma que el JSON
+    de PROMPT_EXTRACCION y `secciones_pendientes` lista las secciones que no se
+    pudieron leer con confianza y deben pedirse a la IA.
+    """
+    lineas = _lineas(text)
+    norm_text = normalize_text(text)
+    bloques = _dividir_secciones(lineas)
+
+    header, ok_header = _parse_header(text, norm_text)
+    es_sobrevivencia = "SOBREVIVENCIA" in (header.get("tipo_pension") or "")
+    pendientes = [] if ok_header else ["header"]
+
+    beneficiarios = []
+    if es_sobrevivencia:
+        beneficiarios, ok = _parse_beneficiarios(bloques)
+        if not ok:
+            pendientes.append("beneficiarios")
+    n_benef = len(beneficiarios)
+
+    # Si el título de la sección está pero no trae filas, no hay pensión de referencia que pedir a la IA
+    ref_bloques = [c for tipo, _, c in bloques if tipo == "REF"]
+    ref_cuerpo = [l for c in ref_bloques for l in c]
+    pension_referencia, ok = _parse_tabla_ofertas(ref_cuerpo, es_sobrevivencia, n_benef, con_total=False,
+                                                  permitir_vacia=bool(ref_bloques))
+    if not ok:
+        pendientes.append("pension_referencia")
+
+    retiro_programado, ok = _parse_retiro_programado(bloques, header.get("afp_origen"), es_sobrevivencia, beneficiarios)
+    if not ok:
+        pendientes.append("retiro_programado")
+
+    rentas_vitalicias, ok = _parse_rentas_vitalicias(bloques, es_sobrevivencia, n_benef)
+    if not ok:
+        pendientes.append("rentas_vitalicias")
+
+    renta_temporal, ok = _parse_renta_temporal(bloques, es_sobrevivencia, n_benef)
+    if not ok:
+        pendientes.append("renta_temporal_rv_diferida")
+
+    datos = {
+        "header": header,
+        "beneficiarios": beneficiarios,
+        "pension_referencia": pension_referencia,
+        "retiro_programado": retiro_programado,
+        "rentas_vitalicias": rentas_vitalicias,
+        "renta_temporal_rv_diferida": renta_temporal,
+    }
+    return datos, pendientes
+
+
+def extract_scomp_data(text, api_key, on_llm_request=None, on_section=None, usage=None):
+    """
+    Obtiene el JSON del SCOMP usando primero el parser local y recurriendo a
+    Gemini sólo si alguna sección no se pudo leer con confianza.
+    Antes de llamar a la IA el texto se reduce con prepare_text_for_llm; si se
+    entrega `on_llm_request`, se llama con el reporte (páginas omitidas, tokens
+    y si la estimación ya supera el presupuesto por documento).
+    `on_section(clave, valor)` recibe cada sección apenas está disponible.
+    `usage` (LLMUsage) acumula los tokens y la latencia de las consultas a la IA.
+    """
+    with get_metrics().stage("parser_local") as medidas:
+        medidas['caracteres'] = len(text)
+        datos, pendientes = parse_scomp_text(text)
+    if not pendientes:
+        return datos
+
+    if on_section and "header" not in pendientes:
+        for seccion, valor in datos.items():
+            if seccion not in pendientes:
+                on_section(seccion, valor)
+
+    texto_llm, reporte = prepare_text_for_llm(text)
+    reporte['secciones_pendientes'] = pendientes
+    reporte['excede_presupuesto'] = reporte['tokens_estimados'] > GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO
+    if on_llm_request:
+        on_llm_request(reporte)
+
+    # Sin header confiable tampoco sabemos si el formato es Vejez o Sobrevivencia
+    if "header" in pendientes:
+        with get_metrics().stage("gemini") as medidas:
+            medidas['caracteres'] = len(texto_llm)
+            return analyze_scomp_with_gemini(
+                texto_llm, api_key, parallel=GEMINI_EXTRACCION_PARALELA, on_section=on_section, usage=usage
+            )
+
+    with get_metrics().stage("gemini") as medidas:
+        medidas['caracteres'] = len(texto_llm)
+        respuesta_ia = analyze_scomp_with_gemini(
+            texto_llm, api_key, parallel=GEMINI_EXTRACCION_PARALELA, secciones=pendientes, on_section=on_section,
+            usage=usage
+        )
+    for seccion in pendientes:
+        if seccion in respuesta_ia:
+            datos[seccion] = respuesta_ia[seccion]
+    return datos
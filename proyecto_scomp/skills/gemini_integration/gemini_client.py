@@ -1,7 +1,24 @@
+import asyncio
 import os
+import queue
+import random
+import threading
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.generativeai import client as genai_client
 from dotenv import load_dotenv
 
+# Errores que vale la pena reintentar (cuota, sobrecarga, timeouts, red)
+TRANSIENT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
 class GeminiClient:
     def __init__(self, api_key=None, model_name='gemini-2.0-flash'):
         load_dotenv()
@@ -36,3 +53,147 @@ class GeminiClient:
     def get_model_list(self):
         """Lists available models."""
         return [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+
+
+_loop = None
+_loop_lock = threading.Lock()
+_configure_lock = threading.Lock()
+
+
+def get_shared_loop():
+    """Returns the process-wide event loop (running in a daemon thread) used by every async client."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-client-loop", daemon=True).start()
+        return _loop
+
+
+class AsyncGeminiClient(GeminiClient):
+    """
+    Async client meant to be created once per process and shared.
+
+    All calls run on a single background event loop, so the gRPC transport is
+    created once and reused. Transient errors are retried with jittered
+    exponential backoff and at most `max_concurrency` requests are in flight.
+    Sync code can use `run()` / `generate_content_blocking()`.
+    Passing `model` uses that object instead of a genai model (e.g. an offline
+    stand-in): genai is not configured and no API key is needed.
+    """
+
+    def __init__(self, api_key=None, model_name='gemini-2.0-flash', max_concurrency=4,
+                 max_retries=3, base_delay=1.0, max_delay=30.0, model=None):
+        if model is None:
+            super().__init__(api_key=api_key, model_name=model_name)
+        else:
+            self.api_key = api_key
+            self.model_name = model_name
+            self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._loop = get_shared_loop()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        if model is None:
+            self.run(self._bind_transport())
+
+    async def _bind_transport(self):
+        # genai keeps one global configuration; give this model its own async
+        # transport (bound to the shared loop) so other keys can't replace it.
+        with _configure_lock:
+            genai.configure(api_key=self.api_key)
+            self.model._async_client = genai_client.get_default_generative_async_client()
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None, stream=False):
+        """Generates content, retrying transient errors. Safe to await from any event loop."""
+        if asyncio.get_running_loop() is not self._loop:
+            future = asyncio.run_coroutine_threadsafe(
+                self.generate_content_async(prompt, generation_config, request_options, stream), self._loop
+            )
+            return await asyncio.wrap_future(future)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await self.model.generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options=request_options,
+                        stream=stream,
+                    )
+            except TRANSIENT_ERRORS:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def stream_content_async(self, prompt, generation_config=None, request_options=None, usage=None):
+        """
+        Async generator of text chunks. Must be consumed on the shared loop (see `iterate`).
+        Transient errors are retried only until the first chunk has arrived.
+        If `usage` is a dict, the last `usage_metadata` seen is stored under its "usage_metadata" key.
+        """
+        for attempt in range(self.max_retries + 1):
+            received = False
+            try:
+                async with self._semaphore:
+                    response = await self.model.generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options=request_options,
+                        stream=True,
+                    )
+                    async for chunk in response:
+                        if usage is not None and getattr(chunk, "usage_metadata", None):
+                            usage["usage_metadata"] = chunk.usage_metadata
+                        if chunk.parts:
+                            received = True
+                            yield chunk.text
+                return
+            except TRANSIENT_ERRORS:
+                if received or attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+
+    def iterate(self, agen):
+        """Consumes an async generator on the shared loop and yields its items in the calling thread."""
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except BaseException as e:
+                items.put((done, e))
+                return
+            items.put((done, None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def stream_blocking(self, prompt, generation_config=None, request_options=None, usage=None):
+        """Sync iterator over the streamed text chunks."""
+        return self.iterate(self.stream_content_async(prompt, generation_config, request_options, usage))
+
+    def run(self, coro):
+        """Runs a coroutine on the shared loop and blocks until it finishes."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def generate_content_blocking(self, prompt, generation_config=None, request_options=None):
+        """Sync wrapper over generate_content_async; returns the full response object."""
+        return self.run(self.generate_content_async(prompt, generation_config, request_options))
@@ -0,0 +1,112 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from api_server import ScompAPIServer, parse_job_params, process_pdf_job
+from benchmarks.synthetic_pdf import make_scomp_pdf
+from services.job_queue import JobQueue
+
+# Retiene al worker en las pruebas de back-pressure
+liberar = threading.Event()
+
+
+@pytest.fixture
+def servidor(request):
+    opciones = getattr(request, "param", {})
+    cola = JobQueue(workers=1, max_pendientes=opciones.get('max_pendientes', 5)).start()
+    srv = ScompAPIServer(("127.0.0.1", 0), cola, api_key=None, token=opciones.get('token', ""),
+                         procesar=opciones.get('procesar', process_pdf_job))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+    cola.stop(timeout=5)
+
+
+def _request(url, datos=None, headers=None):
+    req = urllib.request.Request(url, data=datos, headers=headers or {}, method="POST" if datos else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=30) as respuesta:
+            return respuesta.status, dict(respuesta.headers), respuesta.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_parse_job_params():
+    params, usar_cache = parse_job_params({'pgu': ["0"], 'bono_uf': ["3"], 'cache': ["false"]})
+    assert params['include_pgu'] is False and params['bono_uf'] == 3.0
+    assert usar_cache is False
+    with pytest.raises(ValueError):
+        parse_job_params({'pgu_monto': ["mucho"]})
+
+
+def test_submit_poll_and_fetch_reports(servidor):
+    _, base = servidor
+    pdf_bytes, esperado = make_scomp_pdf("vejez", n_companias=4, n_modalidades=1, paginas_anexo=0, seed=1)
+
+    estado, headers, cuerpo = _request(f"{base}/jobs?cache=0&bono_uf=2", pdf_bytes)
+    assert estado == 202
+    trabajo = json.loads(cuerpo)
+    assert headers["Location"] == f"/jobs/{trabajo['id']}"
+
+    for _ in range(300):
+        trabajo = json.loads(_request(f"{base}/jobs/{trabajo['id']}")[2])
+        if trabajo['estado'] in ("listo", "error"):
+            break
+        time.sleep(0.1)
+    assert trabajo['estado'] == "listo", trabajo['error']
+
+    estado, _, cuerpo = _request(f"{base}{trabajo['enlaces']['resultado']}")
+    resultado = json.loads(cuerpo)
+    assert estado == 200
+    assert resultado['header']['n_scomp'] == esperado['header']['n_scomp']
+    assert resultado['tablas'] and all('filas' in t for t in resultado['tablas'])
+
+    estado, headers, cuerpo = _request(f"{base}{trabajo['enlaces']['pdf']}")
+    assert estado == 200 and cuerpo.startswith(b"%PDF")
+    estado, _, cuerpo = _request(f"{base}{trabajo['enlaces']['xlsx']}")
+    assert estado == 200 and cuerpo.startswith(b"PK")
+
+
+def test_rejects_invalid_requests(servidor):
+    _, base = servidor
+    assert _request(f"{base}/jobs", b"no es un pdf")[0] == 400
+    assert _request(f"{base}/jobs?pgu=quizas", b"%PDF-1.4")[0] == 400
+    assert _request(f"{base}/jobs/{'0' * 32}")[0] == 404
+    assert _request(f"{base}/otra")[0] == 404
+    assert json.loads(_request(f"{base}/health")[2])['workers'] == 1
+
+
+@pytest.mark.parametrize("servidor", [{'max_pendientes': 1, 'procesar': lambda *a: liberar.wait(10)}],
+                         indirect=True)
+def test_back_pressure_and_pending_results(servidor):
+    srv, base = servidor
+    liberar.clear()
+    primero = json.loads(_request(f"{base}/jobs", b"%PDF-1")[2])
+    while srv.cola.get(primero['id']).estado != "procesando":
+        time.sleep(0.01)
+    assert _request(f"{base}/jobs", b"%PDF-2")[0] == 202
+    estado, headers, _ = _request(f"{base}/jobs", b"%PDF-3")
+    assert estado == 503
+    assert int(headers["Retry-After"]) >= 1
+    assert _request(f"{base}/jobs/{primero['id']}/report.pdf")[0] == 409
+    liberar.set()
+
+
+@pytest.mark.parametrize("servidor", [{'token': "secreto"}], indirect=True)
+def test_token_is_required_when_configured(servidor):
+    _, base = servidor
+    assert _request(f"{base}/health")[0] == 401
+    assert _request(f"{base}/health", headers={"Authorization": "Bearer secreto"})[0] == 200
+
+
+def test_negative_content_length_is_rejected(servidor):
+    srv, _ = servidor
+    with socket.create_connection(srv.server_address, timeout=5) as conexion:
+        conexion.sendall(b"POST /jobs HTTP/1.1\r\nHost: x\r\nContent-Length: -1\r\n\r\n")
+        assert conexion.recv(64).startswith(b"HTTP/1.0 400")
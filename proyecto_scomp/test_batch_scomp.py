@@ -0,0 +1,44 @@
+import batch_scomp
+from benchmarks.synthetic_pdf import make_scomp_pdf
+from services.extraction_cache import ExtractionCache
+from services.metrics import get_metrics
+
+
+def _extraer_prohibido(path, backend=None):
+    raise AssertionError("no debió extraerse")
+
+
+def test_cached_documents_skip_extraction(tmp_path, monkeypatch):
+    entrada = tmp_path / "pdfs"
+    entrada.mkdir()
+    pdf_bytes, _ = make_scomp_pdf("vejez", n_companias=3, n_modalidades=1, paginas_anexo=0, seed=4)
+    (entrada / "cliente.pdf").write_bytes(pdf_bytes)
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(batch_scomp, "get_extraction_cache", lambda: cache)
+
+    primera = batch_scomp.run_batch(str(entrada), str(tmp_path / "salida1"), api_key=None, workers=1)
+    assert primera['ok'] == 1 and primera['aciertos_cache'] == 0
+
+    monkeypatch.setattr(batch_scomp, "_extraer", _extraer_prohibido)
+    segunda = batch_scomp.run_batch(str(entrada), str(tmp_path / "salida2"), api_key=None, workers=1)
+    assert segunda['errores'] == {}
+    assert segunda['ok'] == 1 and segunda['aciertos_cache'] == 1
+
+
+def test_worker_metrics_reach_the_parent(tmp_path, monkeypatch):
+    entrada = tmp_path / "pdfs"
+    entrada.mkdir()
+    for seed in (5, 6):
+        pdf_bytes, _ = make_scomp_pdf("vejez", n_companias=3, n_modalidades=1, paginas_anexo=0, seed=seed)
+        (entrada / f"cliente{seed}.pdf").write_bytes(pdf_bytes)
+    monkeypatch.setattr(batch_scomp, "get_extraction_cache", lambda: ExtractionCache(str(tmp_path / "c.sqlite3")))
+    metrics = get_metrics()
+    metrics.reset()
+
+    resumen = batch_scomp.run_batch(str(entrada), str(tmp_path / "salida"), api_key=None, workers=2)
+    assert resumen['ok'] == 2
+
+    etapas = metrics.snapshot()['etapas']
+    for etapa in ("extraccion", "calculos", "reporte_pdf", "reporte_excel"):
+        assert etapas[etapa]['segundos']['n'] == 2, etapa
+    assert etapas['parser_local']['segundos']['n'] == 2
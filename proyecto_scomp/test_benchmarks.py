@@ -0,0 +1,91 @@
+from benchmarks.synthetic import make_vejez_json, make_sobrevivencia_json, make_number_strings
+from benchmarks.run_benchmarks import run_benchmarks, compare_results
+from benchmarks.synthetic_pdf import make_scomp_pdf
+import services.gemini_api as gemini_api
+import services.llm_backends as llm_backends
+from benchmarks.e2e_benchmark import build_corpus, run_e2e, percentiles, analyze_replay, configure_replay
+from services.pipeline import extract_text_from_bytes
+from services.scomp_parser import parse_scomp_text
+from services.pipeline import process_scomp
+from utils.numbers import parse_numbers
+
+
+def test_synthetic_vejez_processes():
+    resultado = process_scomp(make_vejez_json(n_modalidades=2, n_companias=6, n_rentas_temporales=1))
+    tipos = [t['tipo'] for t in resultado['tablas']]
+    assert not resultado['es_sobrevivencia']
+    # La modalidad con aumento temporal genera sus tablas Aumentada/Base
+    assert tipos == ['RP', 'REF', 'RV', 'RV_Aumentada', 'RV_Base', 'RT', 'RVD']
+    # Los cálculos dejan sólo las 4 mejores ofertas
+    assert all(len(t['tabla']) == 4 for t in resultado['tablas'] if t['tipo'].startswith('RV'))
+
+
+def test_synthetic_sobrevivencia_processes():
+    resultado = process_scomp(make_sobrevivencia_json(n_beneficiarios=3, n_modalidades=1, n_companias=5))
+    assert resultado['es_sobrevivencia']
+    assert len(resultado['beneficiarios']) == 3
+    assert {t['tipo'] for t in resultado['tablas']} == {'RP_SOBREVIVENCIA', 'RV_SOBREVIVENCIA'}
+
+
+def test_synthetic_is_deterministic():
+    assert make_vejez_json(seed=7) == make_vejez_json(seed=7)
+    assert make_vejez_json(seed=7) != make_vejez_json(seed=8)
+    valores = make_number_strings(500)
+    assert len(parse_numbers(valores)) == 500
+
+
+def test_run_benchmarks_and_compare():
+    resultados = run_benchmarks(filtro='parse_numbers', tamanos={'numeros': 100}, repeticiones=2,
+                                tiempo_minimo=0.001, salida=lambda *_: None)
+    assert list(resultados) == ['parse_numbers']
+    assert resultados['parse_numbers']['min_ms'] > 0
+
+    base = {'resultados': {'a': {'mediana_ms': 10.0}, 'b': {'mediana_ms': 10.0}, 'c': {'mediana_ms': 10.0}}}
+    nuevo = {'resultados': {'a': {'mediana_ms': 12.0}, 'b': {'mediana_ms': 10.5}, 'c': {'mediana_ms': 5.0},
+                            'd': {'mediana_ms': 1.0}}}
+    estados = {nombre: estado for nombre, *_, estado in compare_results(base, nuevo)}
+    assert estados == {'a': 'REGRESIÓN', 'b': '=', 'c': 'mejora'}
+
+
+def test_synthetic_pdf_roundtrip_vejez():
+    # Más ofertas que las que caben en una página y anexos que la extracción omite
+    pdf_bytes, raw = make_scomp_pdf("vejez", n_companias=30, n_modalidades=3, n_rentas_temporales=1,
+                                    paginas_anexo=2, seed=1)
+    texto = extract_text_from_bytes(pdf_bytes)
+    datos, pendientes = parse_scomp_text(texto)
+    assert pendientes == []
+    assert datos == raw
+
+
+def test_synthetic_pdf_roundtrip_sobrevivencia():
+    pdf_bytes, raw = make_scomp_pdf("sobrevivencia", n_beneficiarios=4, n_modalidades=2, n_companias=14, seed=2)
+    datos, pendientes = parse_scomp_text(extract_text_from_bytes(pdf_bytes))
+    assert pendientes == []
+    assert datos == raw
+
+
+def test_run_e2e():
+    corpus = build_corpus(2, proporcion_sobrevivencia=0.5, companias=(4, 6), modalidades=(1, 2), anexos=(0, 1))
+    resumen = run_e2e(corpus)
+    assert resumen['ok'] == 2 and not resumen['errores']
+    assert resumen['documentos_con_ia'] == 0
+    assert set(resumen['etapas_ms']) == {'extraccion', 'analisis', 'calculos', 'reportes', 'total'}
+    assert resumen['etapas_ms']['total']['p50'] >= resumen['etapas_ms']['reportes']['p50'] > 0
+
+
+def test_percentiles():
+    assert percentiles([4, 1, 3, 2, 5], ps=(0, 50, 100)) == {0: 1, 50: 3, 100: 5}
+    assert percentiles([10, 20], ps=(50,)) == {50: 15}
+    assert percentiles([], ps=(90,)) == {90: 0.0}
+
+
+def test_e2e_replay_backend_reproduces_expected_json(monkeypatch):
+    monkeypatch.setattr(gemini_api, "_clientes", {})
+    monkeypatch.setattr(llm_backends, "_configuracion", None)
+    pdf_bytes, esperado = make_scomp_pdf("vejez", n_companias=4, n_modalidades=2, paginas_anexo=0, seed=5)
+    configure_replay({esperado['header']['n_scomp']: esperado}, {'latencia': "fija:0", 'grabaciones': "/nonexistent"})
+
+    datos, pendientes, totales = analyze_replay(extract_text_from_bytes(pdf_bytes))
+    for seccion, valor in esperado.items():
+        assert datos[seccion] == valor
+    assert totales['llamadas'] >= 1
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from services.calculations import process_data_vejez
+from services.pipeline import CalculationCache, process_scomp
+
+RAW_VEJEZ = {
+    "header": {"afp_origen": "AFP HABITAT", "valor_uf_float": 40000.0},
+    "retiro_programado": {"comision_pct": 1.0, "pension_uf": "10,00", "pension_bruta": 400000},
+    "pension_referencia": [["CONSORCIO VIDA", "9,00", 360000]],
+    "rentas_vitalicias": [
+        {"ofertas": [["A", "11,00", 440000], ["B", "12,00", "480.000"], ["C", "10,00", 400000],
+                     ["D", "9,00", 360000], ["E", "13,00", 520000]]},
+        {"porcentaje_aumento": 50, "meses_aumento": 12, "meses_garantizados": 0,
+         "ofertas": [["A", "10,00", 400000]]},
+    ],
+    "renta_temporal_rv_diferida": [
+        {"periodo_diferido_meses": 24, "factor_renta_temporal": 1.5, "meses_garantizados": 0,
+         "ofertas_rvd": [["B", "8,00", 320000]]},
+    ],
+}
+
+
+def test_vejez_views_and_derived_columns():
+    tablas = process_data_vejez(RAW_VEJEZ, dict(RAW_VEJEZ["header"]), True, 200000, True, 1.0)
+    assert [t['tipo'] for t in tablas] == ['RP', 'REF', 'RV', 'RV_Aumentada', 'RV_Base', 'RT', 'RVD']
+
+    rp = tablas[0]['tabla'].iloc[0]
+    assert rp['Modalidad'] == "AFP HABITAT"
+    assert rp['Descuento_Comision'] == 4000
+    assert rp['Pension_Liquida'] == 400000 - 28000 - 4000
+    assert rp['Pensión + Bono'] == 400000 + 200000 + 40000
+
+    # Top 4 ordenado por pensión
+    assert list(tablas[2]['tabla']['Compania']) == ["E", "B", "A", "C"]
+
+    aumentada, base = tablas[3]['tabla'].iloc[0], tablas[4]['tabla'].iloc[0]
+    assert aumentada['Pension_UF'] == "15,00"
+    assert aumentada['Pension_Bruta'] == 600000
+    assert base['Pension_Bruta'] == 400000
+    assert tablas[4]['linked_to_title'] == tablas[3]['titulo']
+
+    rt = tablas[5]['tabla'].iloc[0]
+    assert rt['Pension_Bruta'] == 480000
+    assert rt['Descuento_Comision'] == 4800
+    assert list(tablas[6]['tabla'].columns) == [
+        'Compania', 'Pension_UF', 'Pension_Bruta', 'Descuento_Salud_7%', 'Pension_Liquida', 'Pensión + Bono'
+    ]
+
+
+def test_cached_params_only_recompute_pension_bono():
+    cache = CalculationCache()
+    r1 = cache.process(RAW_VEJEZ, True, 200000, True, 1.0)
+    r2 = cache.process(RAW_VEJEZ, True, 200000, True, 1.0)
+    r3 = cache.process(RAW_VEJEZ, False, 200000, True, 2.0)
+    assert r1 is r2
+    assert (cache.misses, cache.hits, cache.base_hits) == (1, 1, 1)
+
+    esperado = process_scomp(RAW_VEJEZ, False, 200000, True, 2.0)
+    for a, b in zip(r3['tablas'], esperado['tablas']):
+        assert a['titulo'] == b['titulo']
+        assert a['col_title_display'] == "Pensión + Bono"
+        pd.testing.assert_frame_equal(a['tabla'], b['tabla'])
+    # La base en cache no se modifica al cambiar parámetros
+    assert r1['tablas'][0]['tabla'].iloc[0]['Pensión + Bono'] == 400000 + 200000 + 40000
+    assert 'pgu_monto' not in r3['header']
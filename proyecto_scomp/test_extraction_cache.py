@@ -0,0 +1,61 @@
+import time
+from services.extraction_cache import ExtractionCache, build_cache_key
+
+
+def test_cache_key_depends_on_pdf_prompt_and_model():
+    base = build_cache_key(b"%PDF-1", prompt="A", model_name="m1")
+    assert base == build_cache_key(b"%PDF-1", prompt="A", model_name="m1")
+    assert base != build_cache_key(b"%PDF-2", prompt="A", model_name="m1")
+    assert base != build_cache_key(b"%PDF-1", prompt="B", model_name="m1")
+    assert base != build_cache_key(b"%PDF-1", prompt="A", model_name="m2")
+
+
+def test_cache_key_depends_on_section_prompt_mode_and_parser():
+    base = build_cache_key(b"%PDF-1", prompt="A", section_prompt="S", paralela=True, parser_version=1)
+    assert base != build_cache_key(b"%PDF-1", prompt="A", section_prompt="T", paralela=True, parser_version=1)
+    assert base != build_cache_key(b"%PDF-1", prompt="A", section_prompt="S", paralela=False, parser_version=1)
+    assert base != build_cache_key(b"%PDF-1", prompt="A", section_prompt="S", paralela=True, parser_version=2)
+
+
+def test_cache_key_depends_on_text_extraction():
+    base = build_cache_key(b"%PDF-1", pdf_backend="pdfplumber", corte_anticipado=True, filtro_version=1)
+    assert base != build_cache_key(b"%PDF-1", pdf_backend="pdfium", corte_anticipado=True, filtro_version=1)
+    assert base != build_cache_key(b"%PDF-1", pdf_backend="pdfplumber", corte_anticipado=False, filtro_version=1)
+    assert base != build_cache_key(b"%PDF-1", pdf_backend="pdfplumber", corte_anticipado=True, filtro_version=2)
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = ExtractionCache(db_path=str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k1") is None
+
+    data = {"header": {"nombre": "JUAN PÉREZ"}, "rentas_vitalicias": []}
+    cache.set("k1", data)
+    assert cache.get("k1") == data
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+
+
+def test_evicts_least_recently_used_when_full(tmp_path):
+    cache = ExtractionCache(db_path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.set("a", {"n": 1})
+    time.sleep(0.01)
+    cache.set("b", {"n": 2})
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ExtractionCache(db_path=str(tmp_path / "cache.sqlite3"), max_age_days=0)
+    cache.set("a", {"n": 1})
+    time.sleep(0.01)
+    assert cache.get("a") is None
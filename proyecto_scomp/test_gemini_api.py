@@ -0,0 +1,86 @@
+import services.gemini_api as gemini_api
+from services.gemini_api import split_scomp_sections, build_section_prompt, analyze_scomp_with_gemini
+
+TEXTO = """
+--- PÁGINA 1 ---
+
+PENSIÓN DE VEJEZ
+Datos del afiliado: JUAN PEREZ
+
+--- PÁGINA 2 ---
+
+MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO
+tabla rp
+
+--- PÁGINA 3 ---
+
+PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA SIMPLE
+tabla rv
+
+--- PÁGINA 4 ---
+
+continuación tabla rv
+
+--- PÁGINA 5 ---
+
+RENTA TEMPORAL CON RENTA VITALICIA DIFERIDA
+tabla rt
+"""
+
+
+def test_split_assigns_pages_and_continuations():
+    fragmentos = split_scomp_sections(TEXTO)
+    assert set(fragmentos) == {"header", "retiro_programado", "rentas_vitalicias", "renta_temporal_rv_diferida"}
+
+    rv = fragmentos["rentas_vitalicias"]
+    assert "--- PÁGINA 1 ---" in rv  # portada como contexto
+    assert "continuación tabla rv" in rv
+    assert "tabla rp" not in rv
+    assert "tabla rt" not in rv
+    assert "tabla rv" not in fragmentos["renta_temporal_rv_diferida"]
+
+
+def test_section_prompt_only_includes_requested_instructions():
+    prompt = build_section_prompt(["rentas_vitalicias"], "texto")
+    assert "RENTAS_VITALICIAS" in prompt
+    assert "RETIRO_PROGRAMADO" not in prompt
+    assert "{TEXTO_PDF}" not in prompt
+
+
+def test_parallel_mode_merges_sub_responses(monkeypatch):
+    async def fake_generate(prompt, api_key, usage=None):
+        if "ÚNICAMENTE estas claves: header, beneficiarios" in prompt:
+            return {"header": {"nombre": "JUAN PEREZ"}, "beneficiarios": []}
+        if "claves: pension_referencia, retiro_programado" in prompt:
+            return {"pension_referencia": [], "retiro_programado": {"pension_bruta": 1}}
+        if "claves: rentas_vitalicias" in prompt:
+            return {"rentas_vitalicias": [{"titulo": "RV"}], "header": {"nombre": "IGNORADO"}}
+        return {"renta_temporal_rv_diferida": [{"titulo": "RT"}]}
+
+    monkeypatch.setattr(gemini_api, "_generate_json_async", fake_generate)
+    datos = analyze_scomp_with_gemini(TEXTO, "key", parallel=True)
+
+    assert datos["header"] == {"nombre": "JUAN PEREZ"}
+    assert datos["retiro_programado"] == {"pension_bruta": 1}
+    assert datos["rentas_vitalicias"] == [{"titulo": "RV"}]
+    assert datos["renta_temporal_rv_diferida"] == [{"titulo": "RT"}]
+
+
+def test_page_starting_with_heading_is_not_a_continuation():
+    fragmentos = split_scomp_sections(TEXTO)
+    assert "tabla rv" not in fragmentos["retiro_programado"]
+
+
+def test_missing_sections_get_fresh_empty_values(monkeypatch):
+    async def fake_generate(prompt, api_key, usage=None):
+        return {}
+
+    monkeypatch.setattr(gemini_api, "_generate_json_async", fake_generate)
+    primero = analyze_scomp_with_gemini(TEXTO, "key", parallel=True)
+    primero["header"]["nombre"] = "JUAN PEREZ"
+    primero["rentas_vitalicias"].append({"titulo": "RV"})
+
+    segundo = analyze_scomp_with_gemini(TEXTO, "key", parallel=True)
+    assert segundo["header"] == {}
+    assert segundo["rentas_vitalicias"] == []
+    assert gemini_api.VALORES_VACIOS["header"] == {}
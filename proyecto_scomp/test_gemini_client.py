@@ -0,0 +1,84 @@
+import asyncio
+
+from google.api_core import exceptions as google_exceptions
+
+from skills.gemini_integration.gemini_client import AsyncGeminiClient
+
+
+def _cliente(**kwargs):
+    return AsyncGeminiClient(api_key="key", base_delay=0.0, max_delay=0.0, **kwargs)
+
+
+def test_retries_transient_errors_then_succeeds():
+    client = _cliente(max_retries=3)
+    intentos = []
+
+    async def fake_generate(prompt, **kwargs):
+        intentos.append(prompt)
+        if len(intentos) < 3:
+            raise google_exceptions.ServiceUnavailable("sobrecarga")
+        return "ok"
+
+    client.model.generate_content_async = fake_generate
+    assert client.generate_content_blocking("hola") == "ok"
+    assert len(intentos) == 3
+
+
+def test_non_transient_errors_are_not_retried():
+    client = _cliente(max_retries=3)
+    intentos = []
+
+    async def fake_generate(prompt, **kwargs):
+        intentos.append(prompt)
+        raise google_exceptions.InvalidArgument("prompt inválido")
+
+    client.model.generate_content_async = fake_generate
+    try:
+        client.generate_content_blocking("hola")
+        assert False, "debió propagar el error"
+    except google_exceptions.InvalidArgument:
+        pass
+    assert len(intentos) == 1
+
+
+def test_concurrency_limit_and_calls_from_other_loops():
+    client = _cliente(max_concurrency=2)
+    activos = [0]
+    maximo = [0]
+
+    async def fake_generate(prompt, **kwargs):
+        activos[0] += 1
+        maximo[0] = max(maximo[0], activos[0])
+        await asyncio.sleep(0.01)
+        activos[0] -= 1
+        return prompt
+
+    client.model.generate_content_async = fake_generate
+
+    async def varias():
+        # Se llama desde un loop distinto al del cliente
+        return await asyncio.gather(*(client.generate_content_async(str(i)) for i in range(6)))
+
+    assert asyncio.run(varias()) == [str(i) for i in range(6)]
+    assert maximo[0] == 2
+
+
+def test_stream_blocking_yields_chunks_in_order():
+    client = _cliente()
+
+    class Trozo:
+        def __init__(self, texto):
+            self.text = texto
+            self.parts = [texto]
+
+    async def fake_generate(prompt, stream=False, **kwargs):
+        assert stream
+
+        async def trozos():
+            for texto in ('{"header": ', '{"nombre": "A"}', '}'):
+                await asyncio.sleep(0)
+                yield Trozo(texto)
+        return trozos()
+
+    client.model.generate_content_async = fake_generate
+    assert "".join(client.stream_blocking("hola")) == '{"header": {"nombre": "A"}}'
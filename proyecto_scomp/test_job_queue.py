@@ -0,0 +1,109 @@
+import queue
+import threading
+
+import pytest
+
+from benchmarks.synthetic_pdf import make_scomp_pdf
+from services.job_queue import JobQueue, update_progress
+from services.pipeline import analyze_scomp_job
+
+
+def test_jobs_run_and_report_errors():
+    cola = JobQueue(workers=2, max_pendientes=10).start()
+    ok = cola.submit(lambda a, b=0: a + b, 2, b=3)
+    falla = cola.submit(lambda: 1 / 0)
+    assert ok.wait(5) and falla.wait(5)
+    cola.stop(timeout=5)
+
+    assert (ok.estado, ok.resultado) == ("listo", 5)
+    assert falla.estado == "error" and "division" in falla.error
+    assert cola.get(ok.id) is ok
+    assert cola.stats()['trabajos']['listo'] == 1
+
+
+def test_full_queue_rejects_new_jobs():
+    liberar = threading.Event()
+    cola = JobQueue(workers=1, max_pendientes=2).start()
+    primero = cola.submit(liberar.wait)
+    while primero.estado != "procesando":
+        threading.Event().wait(0.01)
+    cola.submit(liberar.wait)
+    cola.submit(liberar.wait)
+    with pytest.raises(queue.Full):
+        cola.submit(liberar.wait)
+    assert cola.stats()['pendientes'] == 2
+    assert cola.retry_after() >= 1
+
+    liberar.set()
+    cola.stop(timeout=5)
+    assert cola.stats()['trabajos']['listo'] == 3
+
+
+def test_finished_jobs_expire_after_ttl():
+    cola = JobQueue(workers=1, max_pendientes=5, ttl=0.5).start()
+    viejo = cola.submit(lambda: 1)
+    viejo.wait(5)
+    threading.Event().wait(0.6)
+    nuevo = cola.submit(lambda: 2)
+    nuevo.wait(5)
+    cola.stop(timeout=5)
+    assert cola.get(viejo.id) is None
+    assert cola.get(nuevo.id) is nuevo
+
+
+def test_submit_once_reuses_active_and_finished_jobs():
+    liberar = threading.Event()
+    cola = JobQueue(workers=1, max_pendientes=5).start()
+    llamadas = []
+
+    def analizar(nombre):
+        llamadas.append(nombre)
+        update_progress(etapa="analisis")
+        liberar.wait(5)
+        return nombre.upper()
+
+    primero = cola.submit_once("hash-a", analizar, "a")
+    assert cola.submit_once("hash-a", analizar, "a") is primero
+    while primero.estado != "procesando":
+        threading.Event().wait(0.01)
+    otro = cola.submit_once("hash-b", analizar, "b")
+    assert cola.position(otro) == 0 and otro.estado == "en_cola"
+    liberar.set()
+    assert primero.wait(5) and otro.wait(5)
+    assert primero.progreso == {'etapa': "analisis"}
+    assert cola.submit_once("hash-a", analizar, "a") is primero
+    assert llamadas == ["a", "b"]
+
+    falla = cola.submit_once("hash-c", lambda: 1 / 0)
+    falla.wait(5)
+    reintento = cola.submit_once("hash-c", lambda: 3)
+    assert reintento is not falla
+    reintento.wait(5)
+    cola.stop(timeout=5)
+    assert reintento.resultado == 3
+
+
+def test_update_progress_outside_worker_is_a_noop():
+    update_progress(etapa="extraccion")
+
+
+def test_analyze_scomp_job_publishes_progress():
+    pdf_bytes, esperado = make_scomp_pdf("vejez", n_companias=3, n_modalidades=1, paginas_anexo=0, seed=2)
+    cola = JobQueue(workers=1, max_pendientes=2).start()
+    job = cola.submit_once("pdf", analyze_scomp_job, pdf_bytes, None)
+    assert job.wait(60)
+    cola.stop(timeout=5)
+
+    assert job.estado == "listo", job.error
+    assert job.resultado['raw_data']['header'] == esperado['header']
+    assert job.progreso['etapa'] == "analisis"
+    assert job.resultado['aviso_presupuesto'] is None
+
+
+def test_finished_jobs_are_capped():
+    cola = JobQueue(workers=1, max_pendientes=10, max_terminados=2).start()
+    trabajos = [cola.submit(lambda n=n: n) for n in range(4)]
+    for job in trabajos:
+        job.wait(5)
+    cola.stop(timeout=5)
+    assert [cola.get(job.id) for job in trabajos] == [None, None, trabajos[2], trabajos[3]]
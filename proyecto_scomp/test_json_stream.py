@@ -0,0 +1,36 @@
+import json
+
+from utils.json_stream import IncrementalJSONParser
+
+DOCUMENTO = {
+    "header": {"nombre": "JUAN \"PEPE\" PEREZ", "saldo_uf": "3.250,40"},
+    "retiro_programado": {"pension_uf": "14,20", "eld_oferta": None},
+    "rentas_vitalicias": [{"titulo": "RV, SIMPLE {1}", "ofertas": [["CN LIFE", "15,37", 577480]]}],
+}
+
+
+def test_members_are_emitted_as_soon_as_they_complete():
+    texto = json.dumps(DOCUMENTO, ensure_ascii=False, indent=2)
+    parser = IncrementalJSONParser()
+
+    emitidos = []
+    for i in range(0, len(texto), 7):
+        for clave, valor in parser.feed(texto[i:i + 7]).items():
+            emitidos.append((clave, i))
+            assert valor == DOCUMENTO[clave]
+
+    assert [c for c, _ in emitidos] == list(DOCUMENTO)
+    # El header queda listo mucho antes del final del documento
+    assert emitidos[0][1] < len(texto) // 2
+    assert parser.result() == DOCUMENTO
+
+
+def test_invalid_json_raises_value_error():
+    parser = IncrementalJSONParser()
+    parser.feed('{"header": {"nombre": "X"}, "retiro')
+    assert parser.completos == {"header": {"nombre": "X"}}
+    try:
+        parser.result()
+        assert False, "debió fallar"
+    except ValueError:
+        pass
@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import services.gemini_api as gemini_api
+import services.llm_backends as llm_backends
+from services.llm_backends import (
+    LatencyModel, RecordingModel, ReplayModel, ResponseStore, parse_error_rates, prompt_hash
+)
+from services.llm_usage import LLMUsage
+from skills.gemini_integration.gemini_client import AsyncGeminiClient
+
+
+def _cliente(modelo_factory, **kwargs):
+    client = AsyncGeminiClient(api_key="key", base_delay=0.0, max_delay=0.0, **kwargs)
+    client.model = modelo_factory(client.model_name)
+    return client
+
+
+def _store(tmp_path, prompt="hola", model_name="gemini-2.0-flash", texto='{"header": {"nombre": "JUAN"}}'):
+    store = ResponseStore(str(tmp_path / "grabaciones"))
+    store.put(prompt_hash(prompt, model_name),
+              {'texto': texto, 'prompt_tokens': 120, 'output_tokens': 30, 'latencia': 0.0})
+    return store
+
+
+def test_latency_model_specs():
+    assert LatencyModel("grabada").sample(1.5) == 1.5
+    assert LatencyModel("fija:0.2").sample(9) == 0.2
+    assert all(1 <= LatencyModel("uniforme:1,2").sample() <= 2 for _ in range(50))
+    assert [LatencyModel("lognormal:1,0.5", seed=3).sample() for _ in range(3)] == \
+        [LatencyModel("lognormal:1,0.5", seed=3).sample() for _ in range(3)]
+    for spec in ("normal:1", "fija", "uniforme:1", "fija:x"):
+        with pytest.raises(ValueError):
+            LatencyModel(spec)
+
+
+def test_parse_error_rates():
+    assert parse_error_rates("503:0.05, json:0.01") == {"503": 0.05, "json": 0.01}
+    assert parse_error_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_error_rates("418:0.1")
+    with pytest.raises(ValueError):
+        parse_error_rates("503:0.7,429:0.5")
+
+
+def test_replay_returns_recorded_response_with_usage(tmp_path):
+    store = _store(tmp_path)
+    client = _cliente(lambda nombre: ReplayModel(store, nombre, latencia=LatencyModel("fija:0")))
+    respuesta = client.generate_content_blocking("hola")
+    assert respuesta.text == '{"header": {"nombre": "JUAN"}}'
+    assert respuesta.usage_metadata.prompt_token_count == 120
+
+    with pytest.raises(ValueError):
+        client.generate_content_blocking("prompt sin grabar")
+
+
+def test_replay_streaming_reports_usage(tmp_path):
+    texto = '{"rentas_vitalicias": [' + ", ".join(['{"compania": "X"}'] * 100) + ']}'
+    store = _store(tmp_path, texto=texto)
+    client = _cliente(lambda nombre: ReplayModel(store, nombre, latencia=LatencyModel("fija:0")))
+    uso = {}
+    trozos = list(client.stream_blocking("hola", usage=uso))
+    assert len(trozos) > 1
+    assert "".join(trozos) == texto
+    assert uso["usage_metadata"].candidates_token_count == 30
+
+
+def test_injected_transient_errors_are_retried_by_the_client(tmp_path):
+    store = _store(tmp_path)
+    modelos = []
+
+    def factory(nombre):
+        modelos.append(ReplayModel(store, nombre, latencia=LatencyModel("fija:0"), errores={"503": 1.0}))
+        return modelos[0]
+
+    client = _cliente(factory, max_retries=2)
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        client.generate_content_blocking("hola")
+    assert modelos[0].estadisticas['errores'] == {"503": 3}
+
+
+def test_error_injection_is_deterministic_per_seed(tmp_path):
+    store = _store(tmp_path)
+
+    def secuencia(seed):
+        modelo = ReplayModel(store, "m", errores={"503": 0.3, "json": 0.2}, seed=seed)
+        return [modelo._sortear_error() for _ in range(40)]
+
+    assert secuencia(7) == secuencia(7)
+    assert {"503", "json", None} <= set(secuencia(7))
+
+
+def test_recording_then_replay(tmp_path):
+    class FakeModel:
+        async def generate_content_async(self, prompt, **kwargs):
+            return SimpleNamespace(text='{"header": {}}', usage_metadata=None)
+
+    store = ResponseStore(str(tmp_path / "grabaciones"))
+    grabador = _cliente(lambda nombre: RecordingModel(FakeModel(), store, nombre))
+    grabador.generate_content_blocking("consulta")
+    assert len(store) == 1
+
+    reproductor = _cliente(lambda nombre: ReplayModel(store, nombre, latencia=LatencyModel("grabada")))
+    assert reproductor.generate_content_blocking("consulta").text == '{"header": {}}'
+
+
+def test_analyze_scomp_with_gemini_on_replay_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(gemini_api, "_clientes", {})
+    monkeypatch.setattr(llm_backends, "_configuracion", None)
+    llm_backends.configure_backend(
+        "replay", grabaciones=str(tmp_path), latencia="fija:0",
+        respaldo=lambda prompt: '{"header": {"nombre": "JUAN"}, "beneficiarios": []}'
+    )
+    uso = LLMUsage()
+    datos = gemini_api.analyze_scomp_with_gemini("texto", "key", usage=uso)
+    assert datos["header"] == {"nombre": "JUAN"}
+    assert uso.totals()['llamadas'] == 1
+    assert not uso.llamadas[0]['estimado']
+
+    with pytest.raises(ValueError):
+        llm_backends.configure_backend("otro")
+
+
+def test_configure_backend_replaces_cached_clients(monkeypatch):
+    monkeypatch.setattr(gemini_api, "_clientes", {})
+    monkeypatch.setattr(llm_backends, "_configuracion", None)
+
+    def sin_red(**kwargs):
+        raise AssertionError("el replay no debe configurar genai")
+
+    llm_backends.configure_backend("replay", latencia="fija:0", respaldo=lambda prompt: '{"header": {"n": 1}}')
+    monkeypatch.setattr("skills.gemini_integration.gemini_client.genai.configure", sin_red)
+    assert gemini_api.analyze_scomp_with_gemini("texto", "key")["header"] == {"n": 1}
+
+    llm_backends.configure_backend("replay", latencia="fija:0", respaldo=lambda prompt: '{"header": {"n": 2}}')
+    assert gemini_api.analyze_scomp_with_gemini("texto", "key")["header"] == {"n": 2}
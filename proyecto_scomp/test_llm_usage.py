@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.gemini_api as gemini_api
+from services.llm_usage import LLMUsage, UsageLedger, budget_warning, estimate_cost, record_document_usage
+
+
+def test_totals_and_cost():
+    uso = LLMUsage()
+    uso.add("gemini-2.5-flash", 1_000_000, 0, 1.5)
+    uso.add("gemini-2.5-flash", 0, 1_000_000, 3.0, ok=False)
+    totales = uso.totals()
+    assert totales['llamadas'] == 2
+    assert totales['errores'] == 1
+    assert totales['total_tokens'] == 2_000_000
+    assert totales['latencia_max'] == 3.0
+    assert totales['costo'] == pytest.approx(0.30 + 2.50)
+    assert estimate_cost("modelo-sin-precio", 1000, 1000) == 0
+
+
+def test_budget_warning():
+    assert budget_warning(500, presupuesto=1000) is None
+    assert "1,500" in budget_warning(1500, presupuesto=1000)
+    assert budget_warning(10**9, presupuesto=0) is None
+
+
+def test_ledger_reports_by_group(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "uso.sqlite3"))
+    vejez = LLMUsage()
+    vejez.add("gemini-2.5-flash", 100, 10, 1.0)
+    vejez.add("gemini-2.5-pro", 200, 20, 3.0, ok=False)
+    sobrevivencia = LLMUsage()
+    sobrevivencia.add("gemini-2.5-flash", 50, 5, 2.0)
+    ledger.record("doc1", "vejez", vejez, creado=1_700_000_000)
+    ledger.record("doc2", "sobrevivencia", sobrevivencia, creado=1_700_000_000)
+
+    por_modelo = {f['grupo']: f for f in ledger.report("modelo")}
+    assert por_modelo["gemini-2.5-flash"]['prompt_tokens'] == 150
+    assert por_modelo["gemini-2.5-flash"]['documentos'] == 2
+    assert por_modelo["gemini-2.5-pro"]['errores'] == 1
+
+    por_tipo = {f['grupo']: f for f in ledger.report("tipo_documento")}
+    assert por_tipo["vejez"]['llamadas'] == 2
+    assert por_tipo["vejez"]['latencia_media'] == pytest.approx(2.0)
+
+    assert len(ledger.report("dia")) == 1
+    assert ledger.report("dia", desde=1_800_000_000) == []
+    assert ledger.document_usage("doc1")['total_tokens'] == 330
+
+    with pytest.raises(ValueError):
+        ledger.report("semana")
+
+
+def test_record_document_usage_warns_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.llm_usage.GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO", 100)
+    ledger = UsageLedger(str(tmp_path / "uso.sqlite3"))
+    uso = LLMUsage()
+    assert record_document_usage("doc", "vejez", uso, ledger=ledger) is None
+
+    uso.add("gemini-2.5-flash", 90, 20, 1.0)
+    assert record_document_usage("doc", "vejez", uso, ledger=ledger)
+    assert ledger.document_usage("doc")['llamadas'] == 1
+
+
+class FakeClient:
+    model_name = "gemini-2.5-flash"
+
+    def __init__(self, meta):
+        self.meta = meta
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return SimpleNamespace(text='{"header": {}}', usage_metadata=self.meta)
+
+    def run(self, coro):
+        return asyncio.run(coro)
+
+
+def test_generate_json_records_usage_metadata(monkeypatch):
+    meta = SimpleNamespace(prompt_token_count=1200, candidates_token_count=300)
+    monkeypatch.setattr(gemini_api, "get_gemini_client", lambda api_key: FakeClient(meta))
+    uso = LLMUsage()
+    assert gemini_api._generate_json("prompt", "key", usage=uso) == {"header": {}}
+    llamada = uso.llamadas[0]
+    assert (llamada['prompt_tokens'], llamada['output_tokens']) == (1200, 300)
+    assert not llamada['estimado']
+
+
+def test_generate_json_estimates_without_usage_metadata(monkeypatch):
+    monkeypatch.setattr(gemini_api, "get_gemini_client", lambda api_key: FakeClient(None))
+    uso = LLMUsage()
+    gemini_api._generate_json("x" * 4000, "key", usage=uso)
+    llamada = uso.llamadas[0]
+    assert llamada['estimado']
+    assert llamada['prompt_tokens'] > 0
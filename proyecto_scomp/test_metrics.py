@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from benchmarks.synthetic import make_vejez_json
+from services.metrics import Histogram, MetricsRegistry, get_metrics
+from services.pipeline import process_scomp, build_pdf_report, build_excel_report
+
+
+def test_histogram_quantiles():
+    h = Histogram((1, 2, 5))
+    for valor in (0.5, 1.5, 1.5, 4):
+        h.observe(valor)
+    assert h.cumulative()[:3] == [(1, 1), (2, 3), (5, 4)]
+    assert h.quantile(0.5) == pytest.approx(1.5)
+    assert h.quantile(1.0) == 4  # No pasa del máximo observado
+    assert h.to_dict()['buckets'] == {"1": 1, "2": 3, "5": 4, "+Inf": 4}
+
+
+def test_stage_records_errors():
+    metrics = MetricsRegistry(buckets_segundos=(0.1, 1), buckets_tamano=(10, 100), export_path="")
+    with metrics.stage("extraccion") as medidas:
+        medidas['paginas'] = 5
+    with pytest.raises(ValueError):
+        with metrics.stage("extraccion"):
+            raise ValueError("PDF ilegible")
+
+    etapa = metrics.snapshot()['etapas']['extraccion']
+    assert etapa['segundos']['n'] == 2
+    assert etapa['errores'] == 1
+    assert etapa['medidas']['paginas']['n'] == 1
+
+    texto = metrics.to_prometheus()
+    assert 'scomp_etapa_segundos_count{etapa="extraccion"} 2' in texto
+    assert 'scomp_etapa_errores_total{etapa="extraccion"} 1' in texto
+    assert 'scomp_etapa_paginas_bucket{etapa="extraccion",le="10"} 1' in texto
+
+
+def test_write_formats(tmp_path):
+    metrics = MetricsRegistry(export_path="")
+    metrics.observe("calculos", 0.2, filas=40)
+    metrics.write(str(tmp_path / "m.prom"))
+    metrics.write(str(tmp_path / "m.json"))
+    assert (tmp_path / "m.prom").read_text(encoding="utf-8").startswith("# HELP scomp_etapa_segundos")
+    datos = json.loads((tmp_path / "m.json").read_text(encoding="utf-8"))
+    assert datos['etapas']['calculos']['medidas']['filas']['suma'] == 40
+
+
+def test_pipeline_stages_are_measured():
+    metrics = get_metrics()
+    metrics.reset()
+    resultado = process_scomp(make_vejez_json(n_modalidades=1, n_companias=5, n_rentas_temporales=0))
+    pdf_bytes = build_pdf_report(resultado)
+    build_excel_report(resultado)
+
+    etapas = metrics.snapshot()['etapas']
+    assert list(etapas) == ["calculos", "reporte_pdf", "reporte_excel"]
+    assert etapas['reporte_pdf']['medidas']['bytes']['suma'] == len(pdf_bytes)
+    assert etapas['calculos']['medidas']['filas']['suma'] == sum(len(t['tabla']) for t in resultado['tablas'])
+
+
+def test_take_and_merge_between_registries():
+    worker = MetricsRegistry(buckets_segundos=(0.1, 1), buckets_tamano=(10, 100), export_path="")
+    principal = MetricsRegistry(buckets_segundos=(0.1, 1), buckets_tamano=(10, 100), export_path="")
+    principal.observe("extraccion", 0.05, paginas=2)
+    worker.observe("extraccion", 0.5, paginas=20)
+    worker.observe("reporte_pdf", 2, error=True, bytes=50)
+
+    principal.merge(worker.take())
+    assert worker.snapshot()['etapas'] == {}
+
+    etapas = principal.snapshot()['etapas']
+    assert etapas['extraccion']['segundos']['n'] == 2
+    assert etapas['extraccion']['segundos']['max'] == 0.5
+    assert etapas['extraccion']['medidas']['paginas']['suma'] == 22
+    assert etapas['reporte_pdf']['errores'] == 1
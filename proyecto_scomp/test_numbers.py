@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.helpers import clean_number
+from utils.numbers import parse_numbers, format_numbers
+
+VALORES = ["$ 1.234.567", "14,20", 5, 3.5, None, "abc", np.int64(7), "-1.000,5", " 577.480 "]
+
+
+def test_parse_numbers_matches_clean_number():
+    esperado = [clean_number(v) for v in VALORES]
+    assert list(parse_numbers(VALORES)) == esperado
+
+    serie = pd.Series(VALORES, index=list("abcdefghi"))
+    resultado = parse_numbers(serie)
+    assert list(resultado.index) == list("abcdefghi")
+    assert resultado.dtype == "float64"
+    assert list(resultado) == esperado
+
+
+def test_format_numbers_matches_python_formatting():
+    valores = [1234567.891, 0.005, -1234.5, 12, 999.999, 0]
+    chileno = [f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for x in valores]
+    assert list(format_numbers(valores)) == chileno
+    assert list(format_numbers(valores, decimals=0, chileno=False, prefijo="$")) == [f"${x:,.0f}" for x in valores]
+    ingles = [12345.67, 1234567.891, -98765.4] + valores
+    assert list(format_numbers(ingles, chileno=False)) == [f"{x:,.2f}" for x in ingles]
+
+    serie = pd.Series(valores, index=range(10, 16))
+    assert list(format_numbers(serie).index) == list(range(10, 16))
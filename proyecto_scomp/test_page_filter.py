@@ -0,0 +1,42 @@
+from services.page_filter import prepare_text_for_llm, classify_page, estimate_tokens, split_pages
+
+PIE = "Superintendencia de Pensiones - Página {n} de 5"
+
+
+def _documento():
+    paginas = [
+        "CERTIFICADO DE OFERTAS\nCódigo consulta: 900123\nDatos del afiliado: JUAN PEREZ",
+        "MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO\nPensión mensual ($) 533.520",
+        "1 CN LIFE 15,37 577.480\n2 PENTA VIDA 15,11 567.710",
+        "GLOSARIO\nRenta Vitalicia: modalidad de pensión contratada con una compañía de seguros.",
+        "INFORMACIÓN IMPORTANTE\nDe acuerdo al D.L. 3.500 el afiliado declara...",
+    ]
+    return "".join(
+        f"\n\n--- PÁGINA {n} ---\n\n{contenido}\n{PIE.format(n=n)}"
+        for n, contenido in enumerate(paginas, start=1)
+    )
+
+
+def test_classify_page():
+    assert classify_page("1 CN LIFE 15,37 577.480") == "datos"
+    assert classify_page("GLOSARIO\nTérminos usados") == "glosario"
+    assert classify_page("Según el D.L. 3.500 ...") == "legal"
+    assert classify_page("Superintendencia de Pensiones", numero=1) == "portada"
+
+
+def test_prepare_text_drops_boilerplate_and_repeated_footers():
+    texto = _documento()
+    reducido, reporte = prepare_text_for_llm(texto)
+
+    assert reporte['paginas_totales'] == 5
+    assert reporte['paginas_omitidas'] == [(4, "glosario"), (5, "legal")]
+    assert [n for n, _ in split_pages(reducido)] == [1, 2, 3]
+    assert "GLOSARIO" not in reducido
+    assert reducido.count("Superintendencia de Pensiones") == 1
+    assert "577.480" in reducido
+    assert reporte['tokens_estimados'] < reporte['tokens_estimados_original']
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
@@ -0,0 +1,103 @@
+from fpdf import FPDF
+
+from config.settings import PDF_SECCIONES_REQUERIDAS
+import services.pdf_parser as pdf_parser
+from benchmarks.synthetic_pdf import make_scomp_pdf
+from services.pdf_parser import (
+    PDF_BACKENDS, PdfiumBackend, extract_text_from_pdf, iter_pages_until_sections, register_backend
+)
+
+
+def _pdf_de_prueba(n_paginas):
+    pdf = FPDF()
+    pdf.set_font("helvetica", size=10)
+    for i in range(1, n_paginas + 1):
+        pdf.add_page()
+        pdf.multi_cell(0, 5, f"PAGINA DE PRUEBA {i}\nCN LIFE 15,37 577.480")
+    return bytes(pdf.output())
+
+
+def test_parallel_extraction_matches_serial():
+    pdf_bytes = _pdf_de_prueba(6)
+    serial = extract_text_from_pdf(pdf_bytes, workers=1)
+    paralelo = extract_text_from_pdf(pdf_bytes, workers=3)
+
+    assert paralelo == serial
+    assert serial.index("--- PÁGINA 1 ---") < serial.index("--- PÁGINA 6 ---")
+    assert "PAGINA DE PRUEBA 6" in serial
+
+
+class _BackendEtiquetado(PdfiumBackend):
+    def extract_pages(self, pdf_bytes, numeros):
+        return [(n, f"{texto} [etiquetado]") for n, texto in super().extract_pages(pdf_bytes, numeros)]
+
+
+def test_runtime_backend_in_parallel():
+    # Registrado sólo en este proceso: los hijos del pool no lo tienen en PDF_BACKENDS
+    register_backend("etiquetado", _BackendEtiquetado)
+    try:
+        texto = extract_text_from_pdf(_pdf_de_prueba(6), backend="etiquetado", workers=2)
+    finally:
+        del PDF_BACKENDS["etiquetado"]
+    assert texto is not None
+    assert texto.count("[etiquetado]") == 6
+
+
+def test_pdfium_backend():
+    texto = extract_text_from_pdf(_pdf_de_prueba(2), backend="pdfium", workers=1)
+    assert "--- PÁGINA 2 ---" in texto
+    assert "CN LIFE 15,37 577.480" in texto
+    assert "\r" not in texto
+
+
+def test_lazy_extraction_stops_at_annexes():
+    paginas = [
+        (1, "PENSIÓN DE VEJEZ\nDatos del afiliado: JUAN PEREZ"),
+        (2, "MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO\nPensión mensual (UF) 14,10 14,02"),
+        (3, "PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA SIMPLE\n1 CN LIFE 15,37 577.480"),
+        (4, "RENTA TEMPORAL CON RENTA VITALICIA DIFERIDA\n1 CN LIFE 15,37 577.480\n2 BICE 15,30 574.850"),
+        (5, "GLOSARIO\nRenta Vitalicia: modalidad de pensión..."),
+        (6, "ANEXO que no debería extraerse"),
+    ]
+    pedidas = []
+
+    def perezoso():
+        for pagina in paginas:
+            pedidas.append(pagina[0])
+            yield pagina
+
+    entregadas = list(iter_pages_until_sections(perezoso(), PDF_SECCIONES_REQUERIDAS))
+    assert [n for n, _ in entregadas] == [1, 2, 3, 4]
+    assert pedidas == [1, 2, 3, 4, 5]
+
+
+def test_lazy_extraction_in_parallel_matches_serial(monkeypatch):
+    pedidas = []
+    original = pdf_parser._iter_pdf_pages_parallel
+
+    def contar(*args):
+        for pagina in original(*args):
+            pedidas.append(pagina[0])
+            yield pagina
+
+    monkeypatch.setattr(pdf_parser, "_iter_pdf_pages_parallel", contar)
+    pdf_bytes, _ = make_scomp_pdf("vejez", n_companias=4, n_modalidades=2, paginas_anexo=4, seed=3)
+    completo = extract_text_from_pdf(pdf_bytes, workers=1)
+    serial = extract_text_from_pdf(pdf_bytes, workers=1, hasta_secciones=PDF_SECCIONES_REQUERIDAS)
+    paralelo = extract_text_from_pdf(pdf_bytes, workers=2, hasta_secciones=PDF_SECCIONES_REQUERIDAS)
+
+    assert paralelo == serial
+    assert len(serial) < len(completo)
+    # Se detuvo en la tanda de los anexos, sin extraer el resto del documento
+    assert pedidas and max(pedidas) < completo.count("--- PÁGINA")
+
+
+def test_lazy_extraction_waits_for_beneficiarios_in_sobrevivencia():
+    paginas = [
+        (1, "PENSIÓN DE SOBREVIVENCIA\nDatos del consultante: ANA"),
+        (2, "MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO\nRENTA VITALICIA INMEDIATA 1,00 2,00\n3,00 4,00"),
+        (3, "INFORMACIÓN IMPORTANTE\nDeclaro haber recibido"),
+        (4, "Información Beneficiarios\nANA 11.090.315-4 Hijo"),
+    ]
+    entregadas = list(iter_pages_until_sections(iter(paginas), PDF_SECCIONES_REQUERIDAS))
+    assert [n for n, _ in entregadas] == [1, 2, 3, 4]
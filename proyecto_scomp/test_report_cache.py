@@ -0,0 +1,40 @@
+from services.report_cache import ReportCache, deferred_report, report_cache_key
+
+
+def test_builds_once_and_evicts_by_bytes():
+    cache = ReportCache(max_bytes=10)
+    llamadas = []
+
+    def builder(contenido):
+        def construir():
+            llamadas.append(contenido)
+            return contenido
+        return construir
+
+    assert cache.get_or_build("a", builder(b"12345")) == b"12345"
+    assert cache.get_or_build("a", builder(b"otro")) == b"12345"
+    assert llamadas == [b"12345"]
+
+    cache.get_or_build("b", builder(b"1234"))
+    cache.get_or_build("a", builder(b"x"))  # "a" pasa a ser el más reciente
+    cache.get_or_build("c", builder(b"123"))  # excede 10 bytes: sale "b"
+
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['bytes'] == 8
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2
+
+
+def test_deferred_report_only_builds_on_call():
+    cache = ReportCache()
+    llamadas = []
+    tablas = [{'titulo': "RP"}, {'titulo': "RV"}]
+    clave = report_cache_key("pdf", "hash", tablas, (True, 1, False, 0))
+    assert clave == ("pdf", "hash", ("RP", "RV"), (True, 1, False, 0))
+
+    descarga = deferred_report(clave, lambda: llamadas.append(1) or b"pdf", cache=cache)
+    assert llamadas == []
+    assert descarga() == b"pdf"
+    assert descarga() == b"pdf"
+    assert llamadas == [1]
@@ -1,5 +1,12 @@
+import io
+
+import openpyxl
 import pandas as pd
-from services.report_gen import PDFReportVejez, PDFReportSobrevivencia
+import pdfplumber
+from services.report_gen import (
+    PDFReportVejez, PDFReportSobrevivencia, COLUMNAS_PDF_VEJEZ, columnas_rv_sobrevivencia, format_table_columns,
+    create_formatted_excel_report, create_consolidated_excel_report
+)
 
 def test_vejez_report():
     print("Testing PDFReportVejez...")
@@ -77,6 +84,101 @@ def test_sobrevivencia_report():
         import traceback
         traceback.print_exc()
 
+def test_fuente_unicode_compartida():
+    a = PDFReportVejez()
+    b = PDFReportVejez()
+    # Las métricas se leen una vez por proceso; el subconjunto de glifos es por documento
+    assert a.fonts['dejavu'].cmap is b.fonts['dejavu'].cmap
+    assert a.fonts['dejavu'].ttfont is not b.fonts['dejavu'].ttfont
+
+    a.add_page()
+    a.print_header_data({'nombre': 'JOSÉ ÑUÑEZ – Ωmega', 'tipo_pension': 'VEJEZ'})
+    b.add_page()
+    b.print_header_data({'nombre': 'ANA', 'tipo_pension': 'INVALIDEZ'})
+    with pdfplumber.open(io.BytesIO(bytes(a.output()))) as pdf:
+        assert 'JOSÉ ÑUÑEZ – Ωmega' in pdf.pages[0].extract_text()
+    with pdfplumber.open(io.BytesIO(bytes(b.output()))) as pdf:
+        assert 'INVALIDEZ' in pdf.pages[0].extract_text()
+
+def test_formato_columnas_en_bloque():
+    df = pd.DataFrame({
+        'Compania': ['CN LIFE', 'BICE'], 'Pension_UF': ['10,00', '9,50'],
+        'Pension_Bruta': [1234567.4, 350000], 'Descuento_Salud_7%': [86420, 24500],
+        'Descuento_Comision': [0.0, 4321.6], 'Pension_Liquida': [1148147, 325500], 'Extra': [1, 2],
+    })
+    columnas = [(c or 'Extra', col or 'Extra', a, f, al) for c, col, a, f, al in COLUMNAS_PDF_VEJEZ['RT']]
+    filas = list(zip(*format_table_columns(columnas, df)))
+    assert filas[0] == ('CN LIFE', '10,00', '$1,234,567', '($86,420)', '($0)', '$1,148,147', '$1')
+    assert filas[1][4] == '($4,322)'
+
+    # Sin columna Modalidad se imprime N/A
+    columnas_rp = [(c or 'Extra', col or 'Extra', a, f, al) for c, col, a, f, al in COLUMNAS_PDF_VEJEZ['RP']]
+    assert format_table_columns(columnas_rp, df)[0].tolist() == ['N/A', 'N/A']
+
+    rv = pd.DataFrame({'Compañía': ['CN LIFE'], 'Benef. 1 UF': ['13,96'], 'Benef. 1 $': [509075.0],
+                       'Total Bruto': [509075.0], 'Total Líquido': [473440]})
+    columnas_rv = columnas_rv_sobrevivencia(rv, 1)
+    assert [c[0] for c in columnas_rv] == ["Compañía", "Benef. 1 UF", "Benef. 1 $", "Total Bruto", "Total Líquido"]
+    assert list(zip(*format_table_columns(columnas_rv, rv)))[0] == ('CN LIFE', '13,96', '$509,075', '$509,075', '$473,440')
+
+def test_excel_en_streaming():
+    df = pd.DataFrame({
+        'Compania': ['CN LIFE', 'PENTA VIDA'], 'Pension_UF': ['15,37', '15,11'],
+        'Pension_Bruta': [577480.0, 567710.0], 'Descuento_Salud_7%': [40424.0, 39740.0],
+        'Pension_Liquida': [537056.0, 527970.0], 'Pensión + Bono': [631988.0, 622902.0],
+    })
+    item = {'titulo': 'Renta Vitalicia', 'tipo': 'RV', 'tabla': df,
+            'eld_info': {'compania': 'PENTA VIDA', 'monto_pesos': 27239599}}
+    excel = create_formatted_excel_report({'nombre': 'JUAN PEREZ', 'rut': '12.345.678-9'}, [item])
+
+    ws = openpyxl.load_workbook(io.BytesIO(excel))["Reporte SCOMP"]
+    assert ws['A3'].value == "Consultante/Afiliado" and ws['B3'].value == "JUAN PEREZ"
+    assert ws['A10'].value == "Renta Vitalicia"
+    assert [str(r) for r in ws.merged_cells.ranges] == ["A10:F10"]
+    assert [c.value for c in ws[11]] == list(df.columns)
+    assert ws['C12'].value == 577480 and ws['C12'].style == 'currency_style'
+    assert ws['B12'].border.left.style == 'thin'
+    assert ws['A15'].value == "Mejor Oferta ELD: PENTA VIDA con $27,239,599 pesos."
+    # Ancho de columna según el texto más largo ("Descuento_Salud_7%"), con tope
+    assert ws.column_dimensions['D'].width == (len("Descuento_Salud_7%") + 2) * 1.2
+
+def test_excel_consolidado():
+    df = pd.DataFrame({
+        'Compania': ['CN LIFE', 'PENTA VIDA'], 'Pension_UF': ['15,37', '15,40'],
+        'Pension_Bruta': [577480.0, 578600.0], 'Descuento_Salud_7%': [40424.0, 40502.0],
+        'Pension_Liquida': [537056.0, 538098.0], 'Pensión + Bono': [631988.0, 633030.0],
+    })
+    item = {'titulo': 'Renta Vitalicia', 'tipo': 'RV', 'tabla': df, 'col_title_pdf': 'Pensión + Bono'}
+    generados = []
+
+    def resultados():
+        # Mismo nombre dos veces y un caracter no permitido en hojas
+        for nombre in ("ANA/SOTO", "ANA/SOTO", "LUIS"):
+            generados.append(nombre)
+            yield {'header': {'nombre': nombre, 'rut': '1-9'}, 'tablas': [item], 'beneficiarios': []}
+
+    wb = openpyxl.load_workbook(io.BytesIO(create_consolidated_excel_report(resultados())))
+    assert wb.sheetnames == ["Resumen", "ANA SOTO", "ANA SOTO (2)", "LUIS"]
+    assert len(generados) == 3
+    assert wb["LUIS"]['A10'].value == "Renta Vitalicia"
+
+    filas = list(wb["Resumen"].iter_rows(min_row=4, values_only=True))
+    assert [f[4] for f in filas] == ["ANA SOTO", "ANA SOTO (2)", "LUIS"]
+    # La mejor oferta es la de mayor pensión líquida, no la primera fila
+    assert filas[0][6:] == ('PENTA VIDA', '15,40', 578600, 538098, 633030)
+
+def test_etiquetas_del_encabezado_no_se_montan_sobre_el_valor():
+    pdf = PDFReportVejez(orientation='L', unit='mm', format='A4')
+    pdf.add_page()
+    pdf.print_header_data({
+        'nombre': 'JUAN PEREZ', 'rut': '12.345.678-9', 'saldo_uf': '5.583,73', 'n_scomp': '12345',
+        'tipo_pension': 'VEJEZ', 'valor_uf_str': '39.000', 'pgu_monto': 231732, 'bono_monto_uf': 2.5,
+    })
+    with pdfplumber.open(io.BytesIO(bytes(pdf.output()))) as doc:
+        palabras = [p['text'] for p in doc.pages[0].extract_words()]
+    for etiqueta, valor in (("Acumulado:", "5.583,73"), ("Años:", "2.5"), ("SCOMP:", "12345")):
+        assert palabras[palabras.index(etiqueta) + 1] == valor
+
 if __name__ == "__main__":
     test_vejez_report()
     test_sobrevivencia_report()
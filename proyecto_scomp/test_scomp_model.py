@@ -0,0 +1,51 @@
+import numpy as np
+
+from models.scomp import ScompDocument, ProcessedTable
+from services.scomp_parser import parse_scomp_text
+from test_scomp_parser import TEXTO_VEJEZ, TEXTO_SOBREVIVENCIA
+
+
+def test_from_gemini_json_builds_column_arrays():
+    datos, _ = parse_scomp_text(TEXTO_VEJEZ)
+    doc = ScompDocument.from_gemini_json(datos)
+
+    assert doc.header.valor_uf_float == 37571.86
+    assert not doc.header.es_sobrevivencia
+    simple = doc.rentas_vitalicias[0]
+    assert simple.companias == ("CN LIFE", "CONSORCIO VIDA", "PENTA VIDA")
+    assert simple.pension_bruta.dtype == np.float64
+    assert list(simple.pension_bruta) == [577480.0, 574850.0, 567710.0]
+    assert simple.eld_info['compania'] == "PENTA VIDA"
+    assert doc.rentas_vitalicias[1].porcentaje_aumento == 100
+    assert doc.retiro_programado.comision_pct == 1.27
+
+
+def test_sobrevivencia_offers_keep_beneficiary_pairs():
+    datos, _ = parse_scomp_text(TEXTO_SOBREVIVENCIA)
+    doc = ScompDocument.from_gemini_json(datos)
+    assert doc.header.es_sobrevivencia
+    assert [b.parentesco for b in doc.beneficiarios] == ["Cónyuge con hijos con derecho a pensión", "Hijo"]
+    oferta = next(doc.rentas_vitalicias[0].offers())
+    assert oferta.compania == "CN LIFE"
+    assert oferta.pension_bruta == 661870.0
+    assert oferta.beneficiarios == (("13,96", 509075.0), ("4,19", 152795.0))
+
+
+def test_invalid_json_reports_path():
+    datos, _ = parse_scomp_text(TEXTO_VEJEZ)
+    datos['rentas_vitalicias'][1]['ofertas'][1] = ["BICE", "13,80"]
+    try:
+        ScompDocument.from_gemini_json(datos)
+        assert False, "debió fallar"
+    except ValueError as e:
+        assert "rentas_vitalicias[1].ofertas[1]" in str(e)
+
+
+def test_processed_table_behaves_like_dict():
+    tabla = ProcessedTable(titulo="RV", tipo="RV", eld_info=None)
+    assert tabla['titulo'] == "RV"
+    assert 'linked_to_title' not in tabla
+    assert tabla.get('meses_aumento', 0) == 0
+    tabla['sort_key'] = (1, 0, 0, 0)
+    assert tabla.sort_key == (1, 0, 0, 0)
+    assert set(tabla) == {'titulo', 'tipo', 'eld_info', 'sort_key'}
@@ -0,0 +1,168 @@
+from services.scomp_parser import parse_scomp_text, extract_scomp_data
+import services.scomp_parser as scomp_parser
+
+TEXTO_VEJEZ = """
+--- PÁGINA 1 ---
+
+CERTIFICADO DE OFERTAS - PENSIÓN DE VEJEZ
+Código consulta: 90012345678
+Datos del afiliado: JUAN PEREZ SOTO RUT: 12.345.678-9
+AFP de origen: AFP HABITAT
+Valor UF a fecha emisión: $ 37.571,86
+EL SALDO DESTINADO A PENSIÓN ES: UF 3.250,40
+
+--- PÁGINA 2 ---
+
+Código consulta: 90012345678
+MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO
+AFP CAPITAL CUPRUM HABITAT MODELO PLANVITAL PROVIDA UNO
+Pensión mensual (UF) (a) 14,10 14,02 14,20 14,31 14,05 14,11 14,40
+Pensión mensual ($) 529.764 526.758 533.520 537.653 527.885 530.139 541.035
+Comisión (%) 1,44% 1,44% 1,27% 0,58% 1,16% 1,45% 0,49%
+(a) Monto calculado con la comisión vigente.
+PENSIÓN DE REFERENCIA GARANTIZADA POR LEY:
+Compañía Pensión UF Pensión $
+1 CONSORCIO VIDA 12,09 454.245
+
+--- PÁGINA 3 ---
+
+PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA SIMPLE
+SIN RETIRO DE EXCEDENTE
+Compañía Pensión UF Pensión $
+1 CN LIFE 15,37 577.480
+2 CONSORCIO VIDA 15,30 574.850
+3 PENTA VIDA 15,11 567.710
+PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA SIMPLE CON RETIRO DE EXCEDENTE MÁXIMO
+Compañía Pensión UF Pensión $ Excedente UF Excedente $
+1 CN LIFE 12,00 450.862 710,20 26.683.535
+2 PENTA VIDA 11,90 447.105 725,00 27.239.599
+PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA CON AUMENTO TEMPORAL DEL 100% POR 12 MESES
+Y PERIODO GARANTIZADO DE 120 MESES SIN RETIRO DE EXCEDENTE
+Compañía Pensión UF Pensión $
+1 BICE VIDA 13,80 518.492
+2 CN LIFE 13,75 516.613
+"""
+
+TEXTO_SOBREVIVENCIA = """
+--- PÁGINA 1 ---
+
+CERTIFICADO DE OFERTAS - PENSIÓN DE SOBREVIVENCIA
+Código consulta: 90098765432
+Datos del consultante: DORILA SOTO ISLA RUT: 11.090.315-4
+AFP del causante: AFP MODELO
+Valor UF a fecha emisión: $ 36.468,40
+EL SALDO DESTINADO A PENSIÓN ES: UF 2.100,00
+Información Beneficiarios
+SOTO ISLA DORILA 11.090.315-4 Cónyuge con hijos con derecho a pensión
+PEREZ SOTO ANA 22.333.444-5 Hijo
+
+--- PÁGINA 2 ---
+
+MONTO DE PENSIÓN MENSUAL DURANTE EL PRIMER AÑO
+AFP CAPITAL CUPRUM HABITAT MODELO PLANVITAL PROVIDA UNO
+SOTO ISLA DORILA 16,00 583.494 16,00 583.494 16,10 587.141 16,20 590.760 16,00 583.494 16,00 583.494 16,30 594.435
+PEREZ SOTO ANA 4,80 175.048 4,80 175.048 4,83 176.142 4,86 177.228 4,80 175.048 4,80 175.048 4,89 178.330
+Pensión mensual total 20,80 758.542 20,80 758.542 20,93 763.283 21,06 767.988 20,80 758.542 20,80 758.542 21,19 772.765
+Comisión (%) 1,44% 1,44% 1,27% 0,58% 1,16% 1,45% 0,49%
+PENSIÓN DE REFERENCIA GARANTIZADA POR LEY:
+CONSORCIO VIDA 13,82 503.970 4,15 151.337
+
+--- PÁGINA 3 ---
+
+PENSIÓN MENSUAL EN RENTA VITALICIA INMEDIATA SIMPLE SIN RETIRO DE EXCEDENTE
+Compañía BENEF. 1 UF BENEF. 1 $ BENEF. 2 UF BENEF. 2 $ Pensión mensual total $
+CN LIFE 13,96 509.075 4,19 152.795 661.870
+PENTA VIDA 13,90 506.887 4,17 152.073 658.960
+"""
+
+
+def test_parse_vejez_sin_pendientes():
+    datos, pendientes = parse_scomp_text(TEXTO_VEJEZ)
+    assert pendientes == []
+
+    header = datos['header']
+    assert header['nombre'] == "JUAN PEREZ SOTO"
+    assert header['rut'] == "12.345.678-9"
+    assert header['tipo_pension'] == "PENSIÓN DE VEJEZ"
+    assert header['afp_origen'] == "AFP HABITAT"
+    assert header['valor_uf_float'] == 37571.86
+
+    rp = datos['retiro_programado']
+    assert rp['pension_uf'] == "14,20"
+    assert rp['pension_bruta'] == 533520
+    assert rp['comision_pct'] == 1.27
+
+    assert datos['pension_referencia'] == [["CONSORCIO VIDA", "12,09", 454245]]
+
+    simple, aumento = datos['rentas_vitalicias']
+    assert simple['ofertas'][0] == ["CN LIFE", "15,37", 577480]
+    assert simple['eld_info']['compania'] == "PENTA VIDA"
+    assert simple['eld_info']['monto_pesos'] == 27239599
+    assert aumento['porcentaje_aumento'] == 100
+    assert aumento['meses_aumento'] == 12
+    assert aumento['meses_garantizados'] == 120
+    assert len(aumento['ofertas']) == 2
+
+    assert datos['renta_temporal_rv_diferida'] == []
+
+
+def test_parse_sobrevivencia():
+    datos, pendientes = parse_scomp_text(TEXTO_SOBREVIVENCIA)
+    assert pendientes == []
+    assert [b['parentesco'] for b in datos['beneficiarios']] == [
+        "Cónyuge con hijos con derecho a pensión", "Hijo"
+    ]
+
+    rp = datos['retiro_programado']
+    assert rp['pension_total_pesos'] == 767988
+    assert rp['pensiones_beneficiarios'][0] == ["SOTO ISLA DORILA", "16,20", 590760]
+    assert rp['comision_pct'] == 0.58
+
+    oferta = datos['rentas_vitalicias'][0]['ofertas'][0]
+    assert oferta == {
+        "compania": "CN LIFE",
+        "ofertas_beneficiarios": [["13,96", 509075], ["4,19", 152795]],
+        "pension_total_pesos": 661870,
+    }
+
+
+def test_eld_con_encabezado_de_pagina():
+    # La tabla con retiro de excedente cortada por un salto de página
+    texto = TEXTO_VEJEZ.replace(
+        "1 CN LIFE 12,00 450.862 710,20 26.683.535",
+        "1 CN LIFE 12,00 450.862 710,20 26.683.535\n\n--- PÁGINA 4 ---\n\nCódigo consulta: 90012345678",
+    )
+    datos, pendientes = parse_scomp_text(texto)
+    assert pendientes == []
+    assert datos['rentas_vitalicias'][0]['eld_info']['compania'] == "PENTA VIDA"
+
+
+def test_pension_referencia_sin_filas():
+    # Con el título de la sección pero sin filas, la sección está leída (vacía)
+    texto = TEXTO_VEJEZ.replace("1 CONSORCIO VIDA 12,09 454.245\n", "")
+    datos, pendientes = parse_scomp_text(texto)
+    assert pendientes == []
+    assert datos['pension_referencia'] == []
+
+    # Sin el título no se sabe si faltaba: se pide a la IA
+    texto = texto.replace("PENSIÓN DE REFERENCIA GARANTIZADA POR LEY:\n", "")
+    datos, pendientes = parse_scomp_text(texto)
+    assert pendientes == ["pension_referencia"]
+
+
+def test_fallback_solo_para_secciones_pendientes(monkeypatch):
+    texto = TEXTO_VEJEZ.replace("1 CN LIFE 15,37 577.480", "1 CN LIFE 15,37 577.480 (ver nota 3)")
+    _, pendientes = parse_scomp_text(texto)
+    assert pendientes == ["rentas_vitalicias"]
+
+    llamadas = []
+
+    def fake_gemini(text, api_key, parallel=False, secciones=None, on_section=None, usage=None):
+        llamadas.append(text)
+        return {"header": {"nombre": "OTRO"}, "rentas_vitalicias": [{"titulo": "IA"}]}
+
+    monkeypatch.setattr(scomp_parser, "analyze_scomp_with_gemini", fake_gemini)
+    datos = extract_scomp_data(texto, "key")
+    assert len(llamadas) == 1
+    assert datos['rentas_vitalicias'] == [{"titulo": "IA"}]
+    assert datos['header']['nombre'] == "JUAN PEREZ SOTO"
@@ -0,0 +1,55 @@
+"""
+Reportes de consumo de la IA: tokens, costo y latencia de las consultas a Gemini.
+
+Uso:
+    python uso_llm.py                                # por día, últimos 30 días
+    python uso_llm.py --por modelo --dias 7
+    python uso_llm.py --por documento --sobre-presupuesto
+"""
+import argparse
+import sys
+import time
+
+from config.settings import GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO
+from services.llm_usage import AGRUPACIONES, get_usage_ledger
+
+
+def print_report(filas, agrupar):
+    print(f"{agrupar:<24} {'docs':>5} {'llamadas':>8} {'tokens entrada':>15} {'tokens salida':>14} "
+          f"{'US$':>9} {'lat. media':>10} {'lat. máx':>9} {'errores':>7}")
+    for f in filas:
+        grupo = str(f['grupo'])
+        if agrupar == "documento":
+            grupo = grupo[:16]
+        print(f"{grupo:<24} {f['documentos']:>5} {f['llamadas']:>8} {f['prompt_tokens']:>15,} "
+              f"{f['output_tokens']:>14,} {f['costo']:>9.4f} {f['latencia_media']:>9.1f}s "
+              f"{f['latencia_max']:>8.1f}s {f['errores']:>7}")
+    if filas:
+        print(f"{'TOTAL':<24} {'':>5} {sum(f['llamadas'] for f in filas):>8} "
+              f"{sum(f['prompt_tokens'] for f in filas):>15,} {sum(f['output_tokens'] for f in filas):>14,} "
+              f"{sum(f['costo'] for f in filas):>9.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consumo de tokens y costo de la IA.")
+    parser.add_argument("--por", choices=sorted(AGRUPACIONES), default="dia", help="Agrupación del reporte")
+    parser.add_argument("--dias", type=int, default=30, help="Sólo los últimos N días (0 = todo)")
+    parser.add_argument("--sobre-presupuesto", action="store_true",
+                        help=f"Sólo documentos sobre {GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO:,} tokens (implica --por documento)")
+    args = parser.parse_args(argv)
+
+    agrupar = "documento" if args.sobre_presupuesto else args.por
+    desde = time.time() - args.dias * 24 * 3600 if args.dias else None
+    filas = get_usage_ledger().report(agrupar, desde=desde)
+    if args.sobre_presupuesto:
+        filas = [f for f in filas if f['prompt_tokens'] + f['output_tokens'] > GEMINI_PRESUPUESTO_TOKENS_DOCUMENTO]
+
+    if not filas:
+        print("Sin consultas registradas en el período.")
+        return 0
+    print_report(filas, agrupar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
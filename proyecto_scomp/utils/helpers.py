@@ -1,15 +1,20 @@
+import unicodedata
+
+from utils.numbers import parse_number
 
 def clean_number(s):
     """
     Convierte de forma robusta un string, int o float a un float.
+    Para Series/arrays completos usar utils.numbers.parse_numbers.
+    """
+    return parse_number(s)
+
+def normalize_text(texto):
+    """
+    Pasa un texto a mayúsculas y sin tildes, para comparar títulos de forma robusta.
     """
-    if isinstance(s, (int, float)):
-        return float(s)
-    try:
-        cleaned_s = str(s).replace('$', '').replace('.', '').replace(',', '.').strip()
-        return float(cleaned_s)
-    except (ValueError, AttributeError, TypeError):
-        return 0.0
+    sin_tildes = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in sin_tildes if not unicodedata.combining(c)).upper()
 
 def get_sort_key_vejez(item):
     """
@@ -77,3 +82,21 @@ def get_sort_key_sobrevivencia(item):
         return (5, 0)
     
     return (100, 0) # Fallback
+
+def sort_tables_vejez(processed_tables):
+    """
+    Ordena las tablas de Vejez/Invalidez dejando cada tabla vinculada
+    (Pensión Base, RVD) inmediatamente después de su tabla principal.
+    """
+    parent_sort_keys = {}
+    for item in processed_tables:
+        if 'linked_to_title' not in item:
+            key = get_sort_key_vejez(item) + (0,) 
+            item['sort_key'] = key
+            parent_sort_keys[item['titulo']] = key
+    for item in processed_tables:
+        if 'linked_to_title' in item:
+            parent_key = parent_sort_keys.get(item['linked_to_title'])
+            item['sort_key'] = (parent_key[0], parent_key[1], parent_key[2], 1) if parent_key else (99,0,0,0)
+    processed_tables.sort(key=lambda x: x.get('sort_key', (100, 0, 0, 0)))
+    return processed_tables
@@ -0,0 +1,78 @@
+import json
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental para una respuesta JSON que llega en trozos (streaming).
+    Sólo sigue el objeto de primer nivel: cada vez que un miembro "clave": valor
+    queda completo se decodifica y se entrega, sin esperar al resto del documento.
+
+        parser = IncrementalJSONParser()
+        for trozo in stream:
+            for clave, valor in parser.feed(trozo).items():
+                ...
+        datos = parser.result()
+    """
+
+    def __init__(self):
+        self._texto = ""
+        self._pos = 0
+        self._profundidad = 0
+        self._en_string = False
+        self._escape = False
+        self._inicio_miembro = None
+        self.completos = {}
+
+    def feed(self, trozo):
+        """
+        Agrega un trozo de texto. Retorna un dict con los miembros de primer nivel
+        que quedaron completos con este trozo (vacío si ninguno).
+        """
+        self._texto += trozo
+        nuevos = {}
+        texto = self._texto
+        for i in range(self._pos, len(texto)):
+            c = texto[i]
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._en_string = False
+            elif c == '"':
+                self._en_string = True
+            elif c in '{[':
+                self._profundidad += 1
+                if self._profundidad == 1:
+                    self._inicio_miembro = i + 1
+            elif c in '}]':
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    self._cerrar_miembro(i, nuevos)
+            elif c == ',' and self._profundidad == 1:
+                self._cerrar_miembro(i, nuevos)
+                self._inicio_miembro = i + 1
+        self._pos = len(texto)
+        return nuevos
+
+    def _cerrar_miembro(self, fin, nuevos):
+        miembro = self._texto[self._inicio_miembro:fin].strip()
+        if not miembro:
+            return
+        try:
+            par = json.loads("{" + miembro + "}")
+        except json.JSONDecodeError:
+            # Se reintenta completo en result(), que informa el error
+            return
+        self.completos.update(par)
+        nuevos.update(par)
+
+    def result(self):
+        """
+        Decodifica el documento completo (lanza ValueError si no es JSON válido).
+        """
+        try:
+            return json.loads(self._texto)
+        except json.JSONDecodeError:
+            raise ValueError(f"La IA no devolvió un JSON válido. Respuesta: {self._texto[:200]}...")
@@ -0,0 +1,81 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Inserta el separador de miles en la parte entera (antes del punto decimal o del final)
+RE_MILES = r'(\d)(?=(\d{3})+(?!\d))'
+
+
+def parse_number(s):
+    """
+    Convierte de forma robusta un string, int o float a un float.
+    Los strings usan formato chileno: "$ 1.234.567", "14,20". Lo que no se
+    pueda leer vale 0.0.
+    """
+    if isinstance(s, (int, float)):
+        return float(s)
+    try:
+        cleaned_s = str(s).replace('$', '').replace('.', '').replace(',', '.').strip()
+        return float(cleaned_s)
+    except (ValueError, AttributeError, TypeError):
+        return 0.0
+
+
+def parse_numbers(values):
+    """
+    Versión vectorizada de parse_number para Series, arrays o listas (mezcla de
+    strings con separador de miles/coma decimal/"$", ints y floats).
+    Retorna una Series float64 si recibe una Series (mismo índice), si no un ndarray.
+    """
+    es_series = isinstance(values, pd.Series)
+    s = values if es_series else pd.Series(values)
+
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_numeric_dtype(s.dtype):
+        resultado = s.astype("float64")
+    else:
+        s = s.astype(object)
+        try:
+            # .str devuelve NaN para los elementos que no son strings
+            es_texto = s.str.len().notna().to_numpy(dtype=bool)
+        except AttributeError:
+            # Ningún elemento es string
+            es_texto = np.zeros(len(s), dtype=bool)
+        resultado = pd.Series(np.zeros(len(s)), index=s.index)
+        if es_texto.any():
+            limpio = (
+                s[es_texto].astype(str)
+                .str.replace('$', '', regex=False)
+                .str.replace('.', '', regex=False)
+                .str.replace(',', '.', regex=False)
+                .str.strip()
+            )
+            # Igual que parse_number: lo ilegible vale 0
+            resultado[es_texto] = pd.to_numeric(limpio, errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+        if not es_texto.all():
+            otros = s[~es_texto].map(lambda v: float(v) if isinstance(v, (int, float, np.number)) else 0.0)
+            resultado[~es_texto] = otros.to_numpy(dtype="float64")
+
+    return resultado if es_series else resultado.to_numpy()
+
+
+def format_numbers(values, decimals=2, chileno=True, prefijo=""):
+    """
+    Formatea números en bloque como "{:,.Nf}". Con `chileno=True` usa punto de
+    miles y coma decimal ("1.234,56"); si no, el formato inglés ("1,234.56").
+    Retorna una Series de strings si recibe una Series (mismo índice), si no un ndarray.
+    """
+    es_series = isinstance(values, pd.Series)
+    arr = np.asarray(values, dtype="float64")
+    texto = pd.Series(np.char.mod(f"%.{decimals}f", arr), index=values.index if es_series else None)
+
+    sep_miles, sep_decimal = (".", ",") if chileno else (",", ".")
+    if decimals > 0:
+        texto = texto.str.replace(".", sep_decimal, regex=False)
+        texto = texto.str.replace(RE_MILES.replace("(?!\\d)", f"(?={re.escape(sep_decimal)})"), rf"\1{sep_miles}", regex=True)
+    else:
+        texto = texto.str.replace(RE_MILES, rf"\1{sep_miles}", regex=True)
+    if prefijo:
+        texto = prefijo + texto
+
+    return texto if es_series else texto.to_numpy(dtype=object)